@@ -0,0 +1,290 @@
+"""Audit insert latency benchmark.
+
+Seeds the auth database with a synthetic request history and measures
+the latency of `AuthService.save_request`, `identify` and `save_response`
+(or `save_audit` in the consolidated audit mode) on top of it. Seed the
+history once, before migrating, and measure the later runs without
+`--history`, so the runs before and after the migration see the same rows:
+
+    AUTH_DB_URL=postgresql://... python benchmarks/audit_inserts.py \
+        --history 1000000 --samples 20000
+
+History seeded after partitioning lands in the default partition. The
+p99 of a few thousand samples varies a lot between runs, repeat them
+before comparing it.
+
+The pool is initialized like the application's one. A low
+`--max-queries` replaces the connection often, so the cost of setting up
+fresh connections shows up in the timings.
+
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Sequence
+
+import asyncpg
+import orjson
+from environs import Env
+
+from vertical.app.auth import AuditMode, AuthService
+from vertical.app.utils import make_uuid
+
+
+class FakeRequest:
+
+    def __init__(self) -> None:
+        self.identifier = make_uuid()
+        self.remote_addr = "127.0.0.1"
+        self.method = "POST"
+        self.path = "/api/v1/verify"
+        self.content = b'{"number": "79001234567"}'
+        self.body = self.content.decode("utf-8")
+
+
+class FakeResponse:
+
+    content = b'{"data": {"score": 0.5}}'
+
+    def __init__(self, request: FakeRequest) -> None:
+        self.request = request
+        self.body = self.content.decode("utf-8")
+        self.code = 200
+
+
+def make_response_content(size: int) -> bytes:
+    items = []
+    while len(orjson.dumps(items)) < size:
+        items.append({
+            "registered_at": f"2020.{random.randint(1, 12):02}.01",
+            "score": round(random.random(), 4),
+            "status": random.choice([True, False]),
+        })
+    return orjson.dumps({"data": items, "message": "OK"})
+
+
+SEED_HISTORY = """
+    WITH history AS (
+        SELECT
+            gen_random_uuid() AS request_id
+            , now() - random() * $2::TEXT::INTERVAL AS created_at
+        FROM
+            generate_series(1, $1::INTEGER)
+    ), seeded AS (
+        INSERT INTO requests
+            (request_id, remote, method, path, body, created_at)
+        SELECT
+            request_id, '127.0.0.1', 'POST', '/api/v1/verify',
+            '{"number": "79001234567"}', created_at
+        FROM
+            history
+        RETURNING
+            request_id, created_at
+    ), responded AS (
+        INSERT INTO responses
+            (request_id, code, body, created_at)
+        SELECT
+            request_id, 200, '{"data": {"score": 0.5}}', created_at
+        FROM
+            seeded
+    )
+    SELECT count(*) FROM seeded
+    ;
+"""
+
+
+def percentile(samples: Sequence[float], rank: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * rank))]
+
+
+ROW_SIZE = """
+    SELECT
+        COALESCE(avg(pg_column_size({table}.*)), 0)
+    FROM
+        {table}
+    WHERE
+        created_at >= $1::TIMESTAMP
+    ;
+"""
+
+SPLIT_TABLES = ("requests", "identifications", "responses")
+CONSOLIDATED_TABLES = ("audits", )
+
+
+async def rows_size(
+    pool: asyncpg.pool.Pool,
+    tables: Sequence[str],
+    since: datetime,
+) -> float:
+    size = 0
+    for table in tables:
+        size += await pool.fetchval(ROW_SIZE.format(table=table), since)
+    return size
+
+
+def report(timings: Dict[str, List[float]]) -> None:
+    print(f"{'query':<16}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, samples in timings.items():
+        print(
+            f"{name:<16}"
+            f"{statistics.mean(samples):>10.3f}"
+            f"{percentile(samples, 0.50):>10.3f}"
+            f"{percentile(samples, 0.95):>10.3f}"
+            f"{percentile(samples, 0.99):>10.3f}"
+        )
+    print("(milliseconds)")
+
+
+async def run(
+    url: str,
+    history: int,
+    samples: int,
+    period: str,
+    audit_mode: str,
+    compress: Optional[int],
+    max_queries: int,
+) -> None:
+    pool_factory = partial(
+        asyncpg.create_pool,
+        url,
+        min_size=1,
+        max_size=1,
+        max_queries=max_queries,
+    )
+    logger = logging.getLogger("benchmark")
+    service = AuthService(pool_factory, logger, audit_mode, compress)
+    await service.setup()
+    pool = service._pool
+
+    try:
+        if history:
+            seeded = await pool.fetchval(SEED_HISTORY, history, period)
+            print(f"Seeded {seeded} requests over the last {period}")
+
+        contract_id = await pool.fetchval(
+            "SELECT contract_id FROM contracts LIMIT 1;",
+        )
+        if contract_id is None:
+            raise SystemExit("At least one contract is required")
+
+        if service.is_consolidated():
+            tables = CONSOLIDATED_TABLES
+            measure = measure_consolidated
+        else:
+            tables = SPLIT_TABLES
+            measure = measure_split
+
+        since = await pool.fetchval("SELECT now()::TIMESTAMP;")
+        timings = await measure(service, contract_id, samples)
+        size = await rows_size(pool, tables, since)
+
+        report({
+            name: [value * 1000 for value in values]
+            for name, values in timings.items()
+        })
+
+        elapsed = sum(timings["total"])
+        print(f"{samples / elapsed:.0f} calls/s, {size:.0f} bytes per call")
+    finally:
+        await pool.close()
+
+
+async def measure_split(
+    service: AuthService,
+    contract_id: str,
+    samples: int,
+) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {
+        "save_request": [],
+        "identify": [],
+        "save_response": [],
+        "total": [],
+    }
+
+    for _ in range(samples):
+        request = FakeRequest()
+        total = time.perf_counter()
+
+        started = time.perf_counter()
+        await service.save_request(request)
+        timings["save_request"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await service.identify(request.identifier, contract_id)
+        timings["identify"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await service.save_response(FakeResponse(request))
+        timings["save_response"].append(time.perf_counter() - started)
+
+        timings["total"].append(time.perf_counter() - total)
+
+    return timings
+
+
+async def measure_consolidated(
+    service: AuthService,
+    contract_id: str,
+    samples: int,
+) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {
+        "total": [],
+    }
+
+    for _ in range(samples):
+        request = FakeRequest()
+
+        started = time.perf_counter()
+        await service.save_audit(request, FakeResponse(request), contract_id)
+        timings["total"].append(time.perf_counter() - started)
+
+    return timings
+
+
+def main() -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=env.str("AUTH_DB_URL", None))
+    parser.add_argument("--history", type=int, default=0,
+                        help="synthetic requests to seed before measuring")
+    parser.add_argument("--period", default="2 years",
+                        help="time span of the synthetic history")
+    parser.add_argument("--samples", type=int, default=5000,
+                        help="measured request/identify/response rounds")
+    parser.add_argument("--audit-mode", default=AuditMode.SPLIT.value,
+                        choices=[mode.value for mode in AuditMode])
+    parser.add_argument("--compress", type=int, default=None,
+                        help="zstd threshold for consolidated audit bodies")
+    parser.add_argument("--response-size", type=int, default=0,
+                        help="approximate size of the response body")
+    parser.add_argument("--max-queries", type=int, default=1000,
+                        help="queries before a pool connection is replaced")
+    args = parser.parse_args()
+
+    if args.response_size:
+        FakeResponse.content = make_response_content(args.response_size)
+
+    if not args.url:
+        parser.error("auth database url is required")
+
+    asyncio.run(run(
+        args.url,
+        args.history,
+        args.samples,
+        args.period,
+        args.audit_mode,
+        args.compress,
+        args.max_queries,
+    ))
+
+
+if __name__ == "__main__":
+    main()
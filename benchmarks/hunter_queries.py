@@ -0,0 +1,120 @@
+"""Hunter statements benchmark.
+
+Compares the Python cost of building and compiling the Hunter queries on
+every call against executing the statements compiled once by
+`HunterService`. The SQLite driver is replaced with a stub connection that
+returns an empty row, so only SQLAlchemy's work is measured:
+
+    python benchmarks/hunter_queries.py --calls 20000
+
+"""
+
+import argparse
+import logging
+import time
+from typing import Any, Callable, List, Sequence
+
+import sqlalchemy as sa
+
+from vertical.app.hunter import HunterService
+
+PHONE_HASH = "00FF" * 16
+
+
+class StubCursor:
+
+    description = [
+        ("registered_at", None, None, None, None, None, None),
+        ("updated_at", None, None, None, None, None, None),
+    ]
+    rowcount = 1
+
+    def __init__(self):
+        self.row = (None, None)
+
+    def execute(self, statement: str, parameters: Any = None) -> None:
+        # Dialect initialization reads the isolation level.
+        if statement.startswith("PRAGMA"):
+            self.row = (0, )
+
+    def fetchone(self) -> Any:
+        return self.row
+
+    def fetchall(self) -> List:
+        return [self.row]
+
+    def close(self) -> None:
+        pass
+
+
+class StubConnection:
+
+    def cursor(self) -> StubCursor:
+        return StubCursor()
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def make_service() -> HunterService:
+    bind = sa.create_engine("sqlite://", creator=StubConnection)
+
+    return HunterService(
+        days=180,
+        bind=bind,
+        schema="yavert",
+        table="hundata",
+        timeout=10,
+        logger=logging.getLogger("hunter"),
+    )
+
+
+def measure(call: Callable[[], Any], calls: int) -> float:
+    call()
+
+    started_at = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started_at) / calls
+
+
+def report(name: str, elapsed: float) -> None:
+    print(f"{name:<32} {elapsed * 1e6:>8.1f} us/call")
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    service = make_service()
+    bind = service.metadata().bind
+
+    def compile_status() -> Any:
+        query = service.status_query()
+        return bind.execute(query, phone_hash=PHONE_HASH).scalar()
+
+    def compile_period() -> Any:
+        query = service.period_query()
+        return bind.execute(query, phone_hash=PHONE_HASH).fetchone()
+
+    report("status: compile + execute", measure(compile_status, args.calls))
+    report("status: cached", measure(
+        lambda: service.get_status(PHONE_HASH),
+        args.calls,
+    ))
+    report("period: compile + execute", measure(compile_period, args.calls))
+    report("period: cached", measure(
+        lambda: service.get_period(PHONE_HASH),
+        args.calls,
+    ))
+
+
+if __name__ == "__main__":
+    main()
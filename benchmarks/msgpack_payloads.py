@@ -0,0 +1,95 @@
+"""MessagePack payloads benchmark.
+
+Compares the size and the encode/decode time of the API payloads in
+JSON (orjson) and MessagePack, the way the app encodes them:
+
+    python benchmarks/msgpack_payloads.py --rows 1000 --calls 2000
+
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import orjson
+
+from vertical.app.media import pack, unpack
+
+
+def make_number() -> str:
+    return "7" + "".join(random.choice("0123456789") for _ in range(10))
+
+
+def make_row() -> Dict:
+    number = make_number()
+    if random.random() < 0.2:
+        return {
+            "number": number,
+            "status": True,
+            "period": {
+                "registered_at": "2000.01.01",
+                "updated_at": "2020.01.01",
+            },
+        }
+    return {"number": number, "status": False, "period": None}
+
+
+def make_payloads(rows: int) -> Dict[str, Any]:
+    results = [make_row() for _ in range(rows)]
+
+    return {
+        "phone request": {"number": make_number()},
+        "phone response": {"data": results[0], "message": "OK"},
+        "phones request": {"numbers": [row["number"] for row in results]},
+        "phones response": {"data": {"results": results}, "message": "OK"},
+    }
+
+
+def measure(call: Callable[[], Any], calls: int) -> float:
+    call()
+
+    started_at = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started_at) / calls
+
+
+def report(name: str, payload: Any, calls: int) -> None:
+    json = orjson.dumps(payload)
+    packed = pack(payload)
+
+    timings: List[float] = [
+        measure(lambda: orjson.dumps(payload), calls),
+        measure(lambda: pack(payload), calls),
+        measure(lambda: orjson.loads(json), calls),
+        measure(lambda: unpack(packed), calls),
+    ]
+
+    print(
+        f"{name:<16}"
+        f"{len(json):>10}{len(packed):>10}"
+        + "".join(f"{timing * 1e6:>12.1f}" for timing in timings)
+    )
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+
+    print(
+        f"{'payload':<16}{'json B':>10}{'msgpack B':>10}"
+        f"{'json enc':>12}{'msgpack enc':>12}"
+        f"{'json dec':>12}{'msgpack dec':>12}"
+    )
+    for name, payload in make_payloads(args.rows).items():
+        report(name, payload, args.calls)
+    print("(bytes, microseconds per call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Rate limiter check cost benchmark.
+
+Measures the cost of a single `RateLimiter.check` call while a number of
+worker processes hammer the shared counter table concurrently, either all
+with the same contract or each with its own. Timings include the time
+spent waiting for the CPU, so keep the number of workers below the number
+of CPUs:
+
+    python benchmarks/rate_limit.py --workers 4 --checks 200000
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from typing import List, Sequence
+
+from vertical.app.ratelimit import RateLimitExceeded, RateLimiter
+
+
+def worker(path: str, contract_id: str, checks: int, queue) -> None:
+    limiter = RateLimiter(path)
+
+    started_at = time.perf_counter()
+    for _ in range(checks):
+        try:
+            limiter.check(contract_id, 1e9, 1000)
+        except RateLimitExceeded:
+            pass
+    elapsed = time.perf_counter() - started_at
+
+    limiter.close()
+    queue.put(elapsed / checks)
+
+
+def run(path: str, contract_ids: List[str], checks: int) -> List[float]:
+    queue = multiprocessing.Queue()
+
+    processes = [
+        multiprocessing.Process(
+            target=worker,
+            args=(path, contract_id, checks, queue),
+        )
+        for contract_id in contract_ids
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    return [queue.get() for _ in processes]
+
+
+def report(name: str, timings: List[float]) -> None:
+    average = sum(timings) / len(timings)
+    print(f"{name:<24} {average * 1e6:>8.2f} us/check")
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checks", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "vertical.ratelimit")
+
+        contract_id = str(uuid.uuid4())
+        report("single worker", run(path, [contract_id], args.checks))
+
+        shared = [contract_id] * args.workers
+        report("shared contract", run(path, shared, args.checks))
+
+        distinct = [str(uuid.uuid4()) for _ in range(args.workers)]
+        report("distinct contracts", run(path, distinct, args.checks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Rule engine benchmark.
+
+Measures the time to group the submission rows of a batch of phones and
+to evaluate the rules over them, with more and more rules registered:
+
+    python benchmarks/rule_engine.py --phones 500 --rows 4 --rules 8
+
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, List, Sequence
+
+import numpy
+
+from vertical.app.rules import Row, RuleEngine, Submissions, span_rule
+
+EPOCH = date(2015, 1, 1)
+
+
+def make_rows(phones: int, rows: int) -> List[Row]:
+    result = []
+    for phone in range(phones):
+        tel = f"{phone:064X}"
+        for _ in range(random.randint(1, rows * 2 - 1)):
+            person = random.choice(("jake", "mike", "anna"))
+            created_at = EPOCH + timedelta(days=random.randint(0, 2000))
+            result.append((tel, person, person, created_at))
+    return result
+
+
+def shared_rule(submissions: Submissions) -> Any:
+    first, _ = submissions.person_bounds
+    phones = submissions.phones[first]
+    return numpy.bincount(phones, minlength=submissions.size()) > 1
+
+
+def measure(call: Callable[[], Any], calls: int) -> float:
+    call()
+
+    started_at = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started_at) / calls
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phones", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--rules", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+
+    phone_hashes = [f"{phone:064X}" for phone in range(args.phones)]
+    rows = make_rows(args.phones, args.rows)
+
+    grouping = measure(
+        lambda: Submissions.from_rows(phone_hashes, rows),
+        args.calls,
+    )
+    print(f"{len(rows)} rows of {args.phones} phones")
+    print(f"{'grouping':<16}{grouping * 1e6:>12.1f}")
+
+    submissions = Submissions.from_rows(phone_hashes, rows)
+
+    engine = RuleEngine()
+    for count in range(1, args.rules + 1):
+        if count % 2:
+            engine.add_rule(f"span_{count}", span_rule(90 * count))
+        else:
+            engine.add_rule(f"shared_{count}", shared_rule)
+
+        elapsed = measure(lambda: engine.evaluate(submissions), args.calls)
+        print(f"{f'{count} rules':<16}{elapsed * 1e6:>12.1f}")
+    print("(microseconds per batch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Worker startup benchmark.
+
+Reports where the import time of the application goes (based on
+`python -X importtime`) and how long a gunicorn worker takes to serve its
+first request, both on a cold start and after the worker is replaced
+(like it's done every `max_requests` requests, the worker is killed and
+the master forks a new one):
+
+    AUTH_DB_URL=postgresql://... HUNTER_DB_URL=... \\
+        python benchmarks/startup.py --top 20 --requests 20
+
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+# (module, self time, cumulative time) in microseconds
+Entry = Tuple[str, int, int]
+
+
+def import_times(module: str) -> List[Entry]:
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    result = subprocess.run(
+        command,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        entries.append((name.strip(), int(own), int(cumulative)))
+    return entries
+
+
+def report_imports(entries: List[Entry], top: int) -> None:
+    total = sum(own for _, own, _ in entries)
+    print(f"Imported {len(entries)} modules in {total / 1000:.1f} ms\n")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, own, _ in entries:
+        packages[name.split(".")[0]] += own
+
+    print(f"{'package':<40} {'self, ms':>10}")
+    ranked = sorted(packages.items(), key=lambda item: -item[1])
+    for name, own in ranked[:top]:
+        print(f"{name:<40} {own / 1000:>10.1f}")
+    print()
+
+    print(f"{'module':<40} {'cumulative, ms':>15}")
+    ranked_modules = sorted(entries, key=lambda entry: -entry[2])
+    for name, _, cumulative in ranked_modules[:top]:
+        print(f"{name:<40} {cumulative / 1000:>15.1f}")
+    print()
+
+
+def children(pid: int) -> List[int]:
+    path = f"/proc/{pid}/task/{pid}/children"
+    with open(path) as file:
+        return [int(child) for child in file.read().split()]
+
+
+def wait_for(url: str, timeout: float) -> float:
+    headers = {
+        "Content-Type": "application/json",
+    }
+    request = urllib.request.Request(url, headers=headers)
+
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < timeout:
+        try:
+            with urllib.request.urlopen(request, timeout=timeout):
+                return time.perf_counter() - started_at
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    raise SystemExit(f"{url} is not available")
+
+
+def first_requests(module: str, port: int, requests: int) -> List[float]:
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKERS="1",
+    )
+    command = [
+        sys.executable, "-m", "gunicorn", f"{module}:app",
+        "-c", "gunicorn.config.py",
+    ]
+    url = f"http://127.0.0.1:{port}/ping"
+
+    process = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        timings = [wait_for(url, timeout=30)]
+        for _ in range(requests - 1):
+            for pid in children(process.pid):
+                os.kill(pid, signal.SIGKILL)
+            timings.append(wait_for(url, timeout=30))
+        return timings
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+
+def report_requests(timings: List[float]) -> None:
+    cold, replaced = timings[0], timings[1:]
+
+    print(f"{'time to first request':<40} {'ms':>10}")
+    print(f"{'cold start':<40} {cold * 1000:>10.1f}")
+    if replaced:
+        median = statistics.median(replaced)
+        print(f"{'replaced worker (median)':<40} {median * 1000:>10.1f}")
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args(argv)
+
+    report_imports(import_times(args.module), args.top)
+    report_requests(first_requests(args.module, args.port, args.requests))
+
+
+if __name__ == "__main__":
+    main()
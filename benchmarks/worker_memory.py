@@ -0,0 +1,94 @@
+"""Gunicorn preload benchmark.
+
+Starts the application with and without `preload_app` and reports how long
+it takes for every worker to complete its startup and the total memory of
+the master and worker processes (PSS, so the shared pages are counted once):
+
+    AUTH_DB_URL=postgresql://... HUNTER_DB_URL=postgresql://... \\
+        python benchmarks/worker_memory.py --workers 4
+
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Sequence
+
+STARTUP_COMPLETE = b"Application startup complete"
+
+
+def children(pid: int) -> List[int]:
+    path = f"/proc/{pid}/task/{pid}/children"
+    with open(path) as file:
+        return [int(child) for child in file.read().split()]
+
+
+def pss(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(workers: int, preload: bool, port: int) -> Dict[str, float]:
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_PRELOAD_APP=str(preload).lower(),
+    )
+    command = [
+        sys.executable, "-m", "gunicorn", "main:app",
+        "-c", "gunicorn.config.py",
+    ]
+
+    started_at = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    try:
+        ready = 0
+        for line in process.stdout:
+            if STARTUP_COMPLETE in line:
+                ready += 1
+            if ready == workers:
+                break
+        else:
+            raise SystemExit("Application failed to start")
+        elapsed = time.perf_counter() - started_at
+
+        pids = [process.pid, *children(process.pid)]
+        memory = sum(pss(pid) for pid in pids)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.communicate()
+
+    return {
+        "boot": elapsed,
+        "memory": memory / 1024,
+    }
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12} {'boot, s':>10} {'PSS, MiB':>10}")
+    for preload in (False, True):
+        result = run(args.workers, preload, args.port)
+        mode = "preload" if preload else "default"
+        print(f"{mode:<12} {result['boot']:>10.2f} {result['memory']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
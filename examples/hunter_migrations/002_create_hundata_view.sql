@@ -1,3 +1,4 @@
 CREATE MATERIALIZED VIEW yavert.hundata AS SELECT * FROM yavert.submissions;
 
 CREATE INDEX hundata_phk1_index ON yavert.hundata (phk1);
+CREATE INDEX hundata_tel_index ON yavert.hundata (tel);
@@ -0,0 +1,17 @@
+-- Required to refresh the view concurrently (python -m vertical.refresh).
+CREATE UNIQUE INDEX hundata_sub_no_index ON yavert.hundata (sub_no);
+
+CREATE TABLE IF NOT EXISTS yavert.generations
+(
+    name                    VARCHAR(64) NOT NULL
+        CONSTRAINT generations_pk
+            PRIMARY KEY
+    , generation            BIGINT NOT NULL
+    , refreshed_at          TIMESTAMP NOT NULL
+);
+
+INSERT INTO
+    yavert.generations (name, generation, refreshed_at)
+VALUES
+    ('hundata', 1, now())
+;
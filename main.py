@@ -18,6 +18,18 @@ config = {
         "logger": {
             "name": "audit",
         },
+        "audit_mode": env.str("AUTH_AUDIT_MODE", "split"),
+        "audit_compress_threshold": env.int("AUTH_AUDIT_COMPRESS", None),
+        "usage_flush_interval": env.float("AUTH_USAGE_FLUSH_INTERVAL", 5),
+        "contract_cache": {
+            "ttl": env.float("AUTH_CONTRACT_CACHE_TTL", 30),
+            "max_size": env.int("AUTH_CONTRACT_CACHE_SIZE", 10000),
+            "snapshot": env.str(
+                "AUTH_CONTRACT_CACHE_SNAPSHOT",
+                "/dev/shm/vertical-contracts.cache",
+            ),
+            "load_budget": env.float("CACHE_LOAD_BUDGET", 0.1),
+        },
     },
     "hunter_service": {
         "bind": {
@@ -30,14 +42,72 @@ config = {
             "pool_size": env.int("HUNTER_DB_POOL_SIZE", 5),
             "pool_recycle": env.int("HUNTER_DB_POOL_RECYCLE", 3600),
             "pool_timeout": env.int("HUNTER_DB_POOL_TIMEOUT", 10),
+            "pool_mode": env.str("HUNTER_DB_POOL_MODE", "queue"),
+            "session_pool": {
+                "driver": env.str("HUNTER_DB_DRIVER", "cx_Oracle"),
+                "min": env.int("HUNTER_DB_SESSION_POOL_MIN", 1),
+                "max": env.int("HUNTER_DB_SESSION_POOL_MAX", 5),
+                "increment": env.int("HUNTER_DB_SESSION_POOL_INCREMENT", 1),
+                "stmtcachesize": env.int("HUNTER_DB_STMT_CACHE_SIZE", 20),
+                "arraysize": env.int("HUNTER_DB_ARRAYSIZE", 2),
+                "prefetchrows": env.int("HUNTER_DB_PREFETCH_ROWS", None),
+            },
         },
         "days": env.int("HUNTER_DELTA_DAYS", 180),
         "schema": env.str("HUNTER_DB_SCHEMA", "yavert"),
         "table": env.str("HUNTER_DB_TABLE", "hundata"),
         "timeout": env.float("HUNTER_QUERY_TIMEOUT", 10),
+        "plan_check": env.str("HUNTER_PLAN_CHECK", "warn"),
+        "generation_poll_interval": env.float(
+            "HUNTER_GENERATION_POLL_INTERVAL",
+            0,
+        ),
+        "chunk_size": env.int("HUNTER_CHUNK_SIZE", 500),
+        "coalesce_window": env.float("HUNTER_COALESCE_WINDOW", 0),
+        "coalesce_size": env.int("HUNTER_COALESCE_SIZE", 100),
+        "executor_workers": env.int("HUNTER_EXECUTOR_WORKERS", None),
+        "executor_queue_size": env.int("HUNTER_EXECUTOR_QUEUE_SIZE", 50),
+        "reliability_mode": env.str("HUNTER_RELIABILITY_MODE", "sql"),
         "logger": {
             "name": "hunter",
         },
+        "reliability_cache": {
+            "ttl": env.float("HUNTER_CACHE_TTL", 300),
+            "max_size": env.int("HUNTER_CACHE_SIZE", 100000),
+            "snapshot": env.str(
+                "HUNTER_CACHE_SNAPSHOT",
+                "/dev/shm/vertical-reliability.cache",
+            ),
+            "load_budget": env.float("CACHE_LOAD_BUDGET", 0.1),
+        },
+    },
+    "rate_limiter": {
+        "path": env.str("RATE_LIMITER_PATH", "/dev/shm/vertical.ratelimit"),
+        "slots": env.int("RATE_LIMITER_SLOTS", 4096),
+    },
+    "loop_monitor": {
+        "interval": env.float("LOOP_MONITOR_INTERVAL", 0.1),
+        "threshold": env.float("LOOP_LAG_THRESHOLD", 0.25),
+        "samples": env.int("LOOP_LAG_SAMPLES", 1024),
+        "logger": {
+            "name": "app",
+        },
+    },
+    "idempotency_guard": {
+        "window": env.float("IDEMPOTENCY_WINDOW", 3600),
+        "lock_timeout": env.float("IDEMPOTENCY_LOCK_TIMEOUT", 15),
+        "cache_size": env.int("IDEMPOTENCY_CACHE_SIZE", 10000),
+        "logger": {
+            "name": "app",
+        },
+    },
+    "health_prober": {
+        "interval": env.float("HEALTH_PROBE_INTERVAL", 5),
+        "timeout": env.float("HEALTH_PROBE_TIMEOUT", 1),
+        "max_lag": env.float("HEALTH_MAX_LOOP_LAG", 1),
+        "logger": {
+            "name": "app",
+        },
     },
 }
 
@@ -8,16 +8,30 @@ Create Date: 2020-04-20 18:12:50.053551
 
 import secrets
 
+import sqlalchemy as sa
 from alembic import op
-from sqlalchemy.orm import Session
-
-from vertical.app.auth import Client, Contract
 
 revision = "be0f06ec00b4"
 down_revision = "7b7f7733db71"
 branch_labels = None
 depends_on = None
 
+CLIENT_NAME = "admin"
+
+# Lightweight table definitions, so this migration doesn't depend
+# on the current state of the application models.
+clients = sa.table(
+    "clients",
+    sa.column("client_id"),
+    sa.column("name"),
+)
+
+contracts = sa.table(
+    "contracts",
+    sa.column("client_id"),
+    sa.column("token"),
+)
+
 
 def make_token() -> str:
     return secrets.token_hex()
@@ -25,26 +39,24 @@ def make_token() -> str:
 
 def upgrade() -> None:
     bind = op.get_bind()
-    session = Session(bind=bind)
 
-    admin = Client(name="admin")
-    token = make_token()
+    query = clients.insert() \
+        .values(name=CLIENT_NAME) \
+        .returning(clients.c.client_id)
+    client_id = bind.execute(query).scalar()
 
-    contract = Contract(token=token, client=admin)
-    session.add(contract)
-    session.commit()
+    token = make_token()
 
-    session.close()
+    query = contracts.insert().values(client_id=client_id, token=token)
+    bind.execute(query)
 
 
 def downgrade() -> None:
     bind = op.get_bind()
-    session = Session(bind=bind)
-
-    admin = session.query(Client).filter(Client.name == "admin").first()
 
-    session.query(Contract).filter(Contract.client == admin).delete()
-    session.delete(admin)
+    client_id = sa.select([clients.c.client_id]) \
+        .where(clients.c.name == CLIENT_NAME) \
+        .as_scalar()
 
-    session.commit()
-    session.close()
+    bind.execute(contracts.delete().where(contracts.c.client_id == client_id))
+    bind.execute(clients.delete().where(clients.c.name == CLIENT_NAME))
@@ -0,0 +1,282 @@
+"""Partition audit tables by creation time.
+
+Revision ID: 335a7cc9acd7
+Revises: 99574da7cd18
+Create Date: 2026-10-19 09:12:31.482911
+
+"""
+
+from datetime import date
+from typing import Optional
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import (
+    JSONB,
+    SMALLINT,
+    TIMESTAMP,
+    UUID,
+    VARCHAR,
+)
+
+revision = "335a7cc9acd7"
+down_revision = "99574da7cd18"
+branch_labels = None
+depends_on = None
+
+SERVER_NOW = sa.func.now()
+SERVER_UUID = sa.text("gen_random_uuid()")
+
+PARTITION_BY = "RANGE (created_at)"
+
+# Partitions created ahead of time, the rest is up to `vertical.partitions`.
+PREMAKE_MONTHS = 3
+
+TABLES = (
+    "requests",
+    "responses",
+    "identifications",
+)
+
+UNIQUE_CONSTRAINTS = {
+    "requests": (
+        "requests_pkey",
+    ),
+    "responses": (
+        "responses_pkey",
+    ),
+    "identifications": (
+        "identifications_pkey",
+        "identifications_request_id_contract_id_key",
+    ),
+}
+
+
+def next_month(value: date) -> date:
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    for _ in range(months):
+        value = next_month(value)
+    return value
+
+
+def rename_table(table: str, suffix: str) -> None:
+    for constraint in UNIQUE_CONSTRAINTS[table]:
+        op.execute(
+            f"ALTER TABLE {table} "
+            f"RENAME CONSTRAINT {constraint} TO {constraint}_{suffix};"
+        )
+    op.rename_table(table, f"{table}_{suffix}")
+
+
+def create_partitions(table: str, since: date, until: date) -> None:
+    start = since.replace(day=1)
+
+    while start <= until:
+        end = next_month(start)
+        op.execute(
+            f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}');"
+        )
+        start = end
+
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;")
+
+
+def oldest_record(bind: sa.engine.Connection) -> Optional[date]:
+    query = """
+        SELECT
+            min(created_at)::DATE
+        FROM (
+            SELECT min(created_at) AS created_at FROM requests_unpartitioned
+            UNION ALL
+            SELECT min(created_at) AS created_at FROM responses_unpartitioned
+        ) AS audit
+        ;
+    """
+    return bind.execute(query).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    for table in TABLES:
+        rename_table(table, "unpartitioned")
+
+    op.create_table(
+        "requests",
+        sa.Column("request_id", UUID, nullable=False),
+        sa.Column("remote", VARCHAR(64), nullable=True),
+        sa.Column("method", VARCHAR(7), nullable=False),
+        sa.Column("path", VARCHAR(50), nullable=False),
+        sa.Column("body", JSONB, nullable=True),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW,
+                  nullable=False),
+        sa.PrimaryKeyConstraint("request_id", "created_at"),
+        postgresql_partition_by=PARTITION_BY,
+    )
+    op.create_index("requests_created_at_idx", "requests", ["created_at"])
+
+    op.create_table(
+        "responses",
+        sa.Column("request_id", UUID, nullable=False),
+        sa.Column("body", JSONB, nullable=True),
+        sa.Column("code", SMALLINT, nullable=False),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW,
+                  nullable=False),
+        sa.PrimaryKeyConstraint("request_id", "created_at"),
+        postgresql_partition_by=PARTITION_BY,
+    )
+
+    op.create_table(
+        "identifications",
+        sa.Column("identification_id", UUID, server_default=SERVER_UUID,
+                  nullable=False),
+        sa.Column("request_id", UUID, nullable=False),
+        sa.Column("contract_id", UUID, nullable=False),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW,
+                  nullable=False),
+        sa.PrimaryKeyConstraint(
+            "identification_id",
+            "created_at",
+        ),
+        sa.UniqueConstraint(
+            "request_id",
+            "contract_id",
+            "created_at",
+            name="identifications_request_id_contract_id_key",
+        ),
+        sa.ForeignKeyConstraint(
+            columns=("contract_id", ),
+            refcolumns=("contracts.contract_id", ),
+            ondelete="CASCADE",
+        ),
+        postgresql_partition_by=PARTITION_BY,
+    )
+
+    today = date.today()
+    since = oldest_record(bind) or today
+    until = add_months(today, PREMAKE_MONTHS)
+
+    for table in TABLES:
+        create_partitions(table, since, until)
+
+    op.execute("""
+        INSERT INTO requests
+            (request_id, remote, method, path, body, created_at)
+        SELECT
+            request_id, remote, method, path, body, COALESCE(created_at, now())
+        FROM requests_unpartitioned
+        ;
+    """)
+
+    op.execute("""
+        INSERT INTO responses
+            (request_id, body, code, created_at)
+        SELECT
+            request_id, body, code, COALESCE(created_at, now())
+        FROM responses_unpartitioned
+        ;
+    """)
+
+    op.execute("""
+        INSERT INTO identifications
+            (identification_id, request_id, contract_id, created_at)
+        SELECT
+            identifications.identification_id
+            , identifications.request_id
+            , identifications.contract_id
+            , COALESCE(requests.created_at, now())
+        FROM
+            identifications_unpartitioned AS identifications
+            LEFT JOIN requests_unpartitioned AS requests USING (request_id)
+        ;
+    """)
+
+    op.drop_table("responses_unpartitioned")
+    op.drop_table("identifications_unpartitioned")
+    op.drop_table("requests_unpartitioned")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        rename_table(table, "partitioned")
+
+    op.create_table(
+        "requests",
+        sa.Column("request_id", UUID, primary_key=True),
+        sa.Column("remote", VARCHAR(64), nullable=True),
+        sa.Column("method", VARCHAR(7), nullable=False),
+        sa.Column("path", VARCHAR(50), nullable=False),
+        sa.Column("body", JSONB, nullable=True),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW),
+        sa.PrimaryKeyConstraint("request_id"),
+    )
+
+    op.create_table(
+        "responses",
+        sa.Column("request_id", UUID, primary_key=True),
+        sa.Column("body", JSONB, nullable=True),
+        sa.Column("code", SMALLINT, nullable=False),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW),
+        sa.ForeignKeyConstraint(
+            columns=("request_id", ),
+            refcolumns=("requests.request_id", ),
+            ondelete="CASCADE",
+        ),
+    )
+
+    op.create_table(
+        "identifications",
+        sa.Column("identification_id", UUID, server_default=SERVER_UUID),
+        sa.Column("request_id", UUID, nullable=False),
+        sa.Column("contract_id", UUID, nullable=False),
+        sa.PrimaryKeyConstraint(
+            "identification_id",
+        ),
+        sa.UniqueConstraint(
+            "request_id",
+            "contract_id",
+        ),
+        sa.ForeignKeyConstraint(
+            columns=("contract_id", ),
+            refcolumns=("contracts.contract_id", ),
+            ondelete="CASCADE",
+        ),
+    )
+
+    op.execute("""
+        INSERT INTO requests
+            (request_id, remote, method, path, body, created_at)
+        SELECT
+            request_id, remote, method, path, body, created_at
+        FROM requests_partitioned
+        ;
+    """)
+
+    op.execute("""
+        INSERT INTO responses
+            (request_id, body, code, created_at)
+        SELECT
+            request_id, body, code, created_at
+        FROM responses_partitioned
+        WHERE request_id IN (SELECT request_id FROM requests)
+        ;
+    """)
+
+    op.execute("""
+        INSERT INTO identifications
+            (identification_id, request_id, contract_id)
+        SELECT
+            identification_id, request_id, contract_id
+        FROM identifications_partitioned
+        ;
+    """)
+
+    op.drop_table("responses_partitioned")
+    op.drop_table("identifications_partitioned")
+    op.drop_table("requests_partitioned")
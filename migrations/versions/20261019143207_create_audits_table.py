@@ -0,0 +1,114 @@
+"""Create audits table.
+
+Revision ID: 4e1b0c9f52d3
+Revises: 335a7cc9acd7
+Create Date: 2026-10-19 14:32:07.193551
+
+"""
+
+from datetime import date
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import (
+    JSONB,
+    SMALLINT,
+    TIMESTAMP,
+    UUID,
+    VARCHAR,
+)
+
+revision = "4e1b0c9f52d3"
+down_revision = "335a7cc9acd7"
+branch_labels = None
+depends_on = None
+
+SERVER_NOW = sa.func.now()
+
+PARTITION_BY = "RANGE (created_at)"
+
+# Partitions created ahead of time, the rest is up to `vertical.partitions`.
+PREMAKE_MONTHS = 3
+
+# Reporting views combining the split audit tables with consolidated audits.
+VIEWS = {
+    "audit_requests": """
+        SELECT
+            request_id, remote, method, path, body, created_at
+        FROM requests
+        UNION ALL
+        SELECT
+            request_id, remote, method, path, request_body, created_at
+        FROM audits
+    """,
+    "audit_responses": """
+        SELECT
+            request_id, body, code, created_at
+        FROM responses
+        UNION ALL
+        SELECT
+            request_id, response_body, response_code, created_at
+        FROM audits
+        WHERE response_code IS NOT NULL
+    """,
+    "audit_identifications": """
+        SELECT
+            identification_id, request_id, contract_id, created_at
+        FROM identifications
+        UNION ALL
+        SELECT
+            request_id, request_id, contract_id, created_at
+        FROM audits
+        WHERE contract_id IS NOT NULL
+    """,
+}
+
+
+def next_month(value: date) -> date:
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def create_partitions(table: str, since: date, months: int) -> None:
+    start = since.replace(day=1)
+
+    for _ in range(months + 1):
+        end = next_month(start)
+        op.execute(
+            f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}');"
+        )
+        start = end
+
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audits",
+        sa.Column("request_id", UUID, nullable=False),
+        sa.Column("remote", VARCHAR(64), nullable=True),
+        sa.Column("method", VARCHAR(7), nullable=False),
+        sa.Column("path", VARCHAR(50), nullable=False),
+        sa.Column("request_body", JSONB, nullable=True),
+        sa.Column("contract_id", UUID, nullable=True),
+        sa.Column("response_code", SMALLINT, nullable=True),
+        sa.Column("response_body", JSONB, nullable=True),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW,
+                  nullable=False),
+        sa.PrimaryKeyConstraint("request_id", "created_at"),
+        postgresql_partition_by=PARTITION_BY,
+    )
+
+    create_partitions("audits", date.today(), PREMAKE_MONTHS)
+
+    for name, query in VIEWS.items():
+        op.execute(f"CREATE VIEW {name} AS {query};")
+
+
+def downgrade() -> None:
+    for name in VIEWS:
+        op.execute(f"DROP VIEW {name};")
+
+    op.drop_table("audits")
@@ -0,0 +1,165 @@
+"""Compact audits storage.
+
+Revision ID: a81f3d6c0e27
+Revises: 4e1b0c9f52d3
+Create Date: 2026-10-19 17:15:44.620317
+
+"""
+
+from alembic import op
+
+revision = "a81f3d6c0e27"
+down_revision = "4e1b0c9f52d3"
+branch_labels = None
+depends_on = None
+
+METHODS = (
+    "CONNECT",
+    "HEAD",
+    "GET",
+    "DELETE",
+    "OPTIONS",
+    "PATCH",
+    "POST",
+    "PUT",
+    "TRACE",
+)
+
+IPV4_REMOTE = r"^\d{1,3}(\.\d{1,3}){3}:\d+$"
+
+# Compressed bodies can't be decoded by the database, so reporting views
+# show them as NULL and `python -m vertical.audit` has to be used instead.
+DECODE_BODY = """
+    CREATE FUNCTION decode_audit_body(body BYTEA) RETURNS JSONB AS $$
+        SELECT
+            CASE
+                WHEN substring(body FROM 1 FOR 4) = '\\x28b52ffd'::BYTEA
+                THEN NULL
+                ELSE convert_from(body, 'UTF8')::JSONB
+            END
+        ;
+    $$ LANGUAGE SQL IMMUTABLE;
+"""
+
+COMPACT_VIEWS = {
+    "audit_requests": """
+        SELECT
+            request_id, remote, method, path, body, created_at
+        FROM requests
+        UNION ALL
+        SELECT
+            request_id
+            , host(remote) || ':' || remote_port
+            , method::VARCHAR
+            , path
+            , decode_audit_body(request_body)
+            , created_at
+        FROM audits
+    """,
+    "audit_responses": """
+        SELECT
+            request_id, body, code, created_at
+        FROM responses
+        UNION ALL
+        SELECT
+            request_id, decode_audit_body(response_body), response_code,
+            created_at
+        FROM audits
+        WHERE response_code IS NOT NULL
+    """,
+}
+
+JSONB_VIEWS = {
+    "audit_requests": """
+        SELECT
+            request_id, remote, method, path, body, created_at
+        FROM requests
+        UNION ALL
+        SELECT
+            request_id, remote, method, path, request_body, created_at
+        FROM audits
+    """,
+    "audit_responses": """
+        SELECT
+            request_id, body, code, created_at
+        FROM responses
+        UNION ALL
+        SELECT
+            request_id, response_body, response_code, created_at
+        FROM audits
+        WHERE response_code IS NOT NULL
+    """,
+}
+
+
+def drop_views() -> None:
+    for name in COMPACT_VIEWS:
+        op.execute(f"DROP VIEW {name};")
+
+
+def create_views(views: dict) -> None:
+    for name, query in views.items():
+        op.execute(f"CREATE VIEW {name} AS {query};")
+
+
+def upgrade() -> None:
+    drop_views()
+
+    methods = ", ".join(f"'{method}'" for method in METHODS)
+    op.execute(f"CREATE TYPE http_method AS ENUM ({methods});")
+
+    op.execute("ALTER TABLE audits ADD COLUMN remote_port INTEGER;")
+    op.execute("""
+        UPDATE audits SET
+            remote_port = substring(remote FROM ':(\\d+)$')::INTEGER
+        ;
+    """)
+
+    op.execute(f"""
+        ALTER TABLE audits
+            ALTER COLUMN remote TYPE INET USING (
+                CASE
+                    WHEN remote ~ '{IPV4_REMOTE}'
+                    THEN split_part(remote, ':', 1)::INET
+                END
+            )
+            , ALTER COLUMN method DROP NOT NULL
+            , ALTER COLUMN method TYPE http_method USING (
+                CASE
+                    WHEN method IN ({methods})
+                    THEN method::http_method
+                END
+            )
+            , ALTER COLUMN request_body TYPE BYTEA
+                USING convert_to(request_body::TEXT, 'UTF8')
+            , ALTER COLUMN response_body TYPE BYTEA
+                USING convert_to(response_body::TEXT, 'UTF8')
+        ;
+    """)
+
+    op.execute(DECODE_BODY)
+    create_views(COMPACT_VIEWS)
+
+
+def downgrade() -> None:
+    drop_views()
+
+    op.execute("""
+        ALTER TABLE audits
+            ALTER COLUMN remote TYPE VARCHAR(64)
+                USING host(remote) || ':' || remote_port
+            , ALTER COLUMN method TYPE VARCHAR(7) USING method::VARCHAR
+            , ALTER COLUMN request_body TYPE JSONB
+                USING decode_audit_body(request_body)
+            , ALTER COLUMN response_body TYPE JSONB
+                USING decode_audit_body(response_body)
+        ;
+    """)
+    op.execute("UPDATE audits SET method = '' WHERE method IS NULL;")
+    op.execute("ALTER TABLE audits ALTER COLUMN method SET NOT NULL;")
+    op.execute("ALTER TABLE audits DROP COLUMN remote_port;")
+
+    op.execute("DROP FUNCTION decode_audit_body(BYTEA);")
+    op.execute("DROP TYPE http_method;")
+
+    create_views(JSONB_VIEWS)
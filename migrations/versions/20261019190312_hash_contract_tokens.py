@@ -0,0 +1,50 @@
+"""Hash contract tokens.
+
+Revision ID: 0d6e2b7a94c1
+Revises: a81f3d6c0e27
+Create Date: 2026-10-19 19:03:12.417205
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import CHAR, VARCHAR
+
+revision = "0d6e2b7a94c1"
+down_revision = "a81f3d6c0e27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "contracts",
+        sa.Column("token_digest", CHAR(64), nullable=True),
+    )
+
+    op.execute("""
+        UPDATE contracts SET
+            token_digest = encode(sha256(convert_to(token, 'UTF8')), 'hex')
+        ;
+    """)
+
+    op.alter_column("contracts", "token_digest", nullable=False)
+    op.create_unique_constraint(
+        "contracts_token_digest_key",
+        "contracts",
+        ["token_digest"],
+    )
+
+    op.drop_column("contracts", "token")
+
+
+def downgrade() -> None:
+    # Plain tokens can't be restored from their digests,
+    # every contract has to be reissued after the downgrade.
+    op.add_column(
+        "contracts",
+        sa.Column("token", VARCHAR(64), nullable=True),
+    )
+
+    op.drop_constraint("contracts_token_digest_key", "contracts")
+    op.drop_column("contracts", "token_digest")
@@ -0,0 +1,94 @@
+"""Create usage_daily table.
+
+Revision ID: 6f3a9d1e8b05
+Revises: 0d6e2b7a94c1
+Create Date: 2026-10-19 20:37:18.902614
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import (
+    BIGINT,
+    DATE,
+    DOUBLE_PRECISION,
+    SMALLINT,
+    UUID,
+)
+
+revision = "6f3a9d1e8b05"
+down_revision = "0d6e2b7a94c1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_daily",
+        sa.Column("contract_id", UUID, nullable=False),
+        sa.Column("day", DATE, nullable=False),
+        sa.Column("status_class", SMALLINT, nullable=False),
+        sa.Column("calls", BIGINT, nullable=False),
+        sa.Column("latency", DOUBLE_PRECISION, nullable=False),
+        sa.PrimaryKeyConstraint(
+            "day",
+            "contract_id",
+            "status_class",
+        ),
+        sa.ForeignKeyConstraint(
+            columns=("contract_id", ),
+            refcolumns=("contracts.contract_id", ),
+            ondelete="CASCADE",
+        ),
+    )
+
+    # The audit history has no request time, so the latency of already
+    # served calls is approximated by the gap between request and response.
+    op.execute("""
+        INSERT INTO usage_daily
+            (contract_id, day, status_class, calls, latency)
+        SELECT
+            contract_id
+            , day
+            , status_class
+            , sum(calls)
+            , sum(latency)
+        FROM (
+            SELECT
+                identifications.contract_id
+                , requests.created_at::DATE AS day
+                , responses.code / 100 AS status_class
+                , count(*) AS calls
+                , sum(extract(EPOCH FROM
+                    responses.created_at - requests.created_at)) AS latency
+            FROM
+                identifications
+                JOIN requests USING (request_id)
+                JOIN responses USING (request_id)
+            GROUP BY
+                1, 2, 3
+            UNION ALL
+            SELECT
+                audits.contract_id
+                , audits.created_at::DATE AS day
+                , audits.response_code / 100 AS status_class
+                , count(*) AS calls
+                , 0 AS latency
+            FROM
+                audits
+            WHERE
+                audits.contract_id IS NOT NULL
+                AND audits.response_code IS NOT NULL
+            GROUP BY
+                1, 2, 3
+        ) AS history
+        WHERE
+            contract_id IN (SELECT contract_id FROM contracts)
+        GROUP BY
+            1, 2, 3
+        ;
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("usage_daily")
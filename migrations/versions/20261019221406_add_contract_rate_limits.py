@@ -0,0 +1,47 @@
+"""Add contract rate limits.
+
+Revision ID: 9c4e7b2a1f36
+Revises: 6f3a9d1e8b05
+Create Date: 2026-10-19 22:14:06.381027
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, INTEGER
+
+revision = "9c4e7b2a1f36"
+down_revision = "6f3a9d1e8b05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL rate limit means the contract isn't limited at all.
+    op.add_column(
+        "contracts",
+        sa.Column("rate_limit", DOUBLE_PRECISION, nullable=True),
+    )
+    op.add_column(
+        "contracts",
+        sa.Column("rate_burst", INTEGER, nullable=True),
+    )
+
+    op.create_check_constraint(
+        "contracts_rate_limit_check",
+        "contracts",
+        "rate_limit > 0",
+    )
+    op.create_check_constraint(
+        "contracts_rate_burst_check",
+        "contracts",
+        "rate_burst > 0",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("contracts_rate_burst_check", "contracts")
+    op.drop_constraint("contracts_rate_limit_check", "contracts")
+
+    op.drop_column("contracts", "rate_burst")
+    op.drop_column("contracts", "rate_limit")
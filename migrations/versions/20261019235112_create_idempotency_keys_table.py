@@ -0,0 +1,56 @@
+"""Create idempotency_keys table.
+
+Revision ID: 2d8b5f0e6a47
+Revises: 9c4e7b2a1f36
+Create Date: 2026-10-19 23:51:12.604318
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import (
+    CHAR,
+    JSONB,
+    SMALLINT,
+    TIMESTAMP,
+    UUID,
+    VARCHAR,
+)
+
+revision = "2d8b5f0e6a47"
+down_revision = "9c4e7b2a1f36"
+branch_labels = None
+depends_on = None
+
+SERVER_NOW = sa.func.now()
+
+
+def upgrade() -> None:
+    # NULL code means the request is still in flight.
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("contract_id", UUID, nullable=False),
+        sa.Column("key", VARCHAR(255), nullable=False),
+        sa.Column("request_digest", CHAR(64), nullable=False),
+        sa.Column("code", SMALLINT, nullable=True),
+        sa.Column("body", JSONB, nullable=True),
+        sa.Column("created_at", TIMESTAMP, server_default=SERVER_NOW),
+        sa.PrimaryKeyConstraint(
+            "contract_id",
+            "key",
+        ),
+        sa.ForeignKeyConstraint(
+            columns=("contract_id", ),
+            refcolumns=("contracts.contract_id", ),
+            ondelete="CASCADE",
+        ),
+    )
+    op.create_index(
+        "idempotency_keys_created_at_index",
+        "idempotency_keys",
+        ["created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("idempotency_keys")
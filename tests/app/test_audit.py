@@ -0,0 +1,64 @@
+import orjson
+import pytest
+
+from vertical.app import audit
+
+
+class TestBodyCodec:
+
+    def test_small_body_is_stored_raw(self) -> None:
+        pytest.importorskip("zstandard")
+        codec = audit.BodyCodec(threshold=1024)
+
+        content = orjson.dumps({"number": "79001234567"})
+
+        assert codec.encode(content) == content
+        assert audit.decode_body(codec.encode(content)) == {
+            "number": "79001234567",
+        }
+
+    def test_large_body_is_compressed(self) -> None:
+        pytest.importorskip("zstandard")
+        codec = audit.BodyCodec(threshold=1024)
+
+        data = {"data": [{"score": i / 1000} for i in range(1000)]}
+        content = orjson.dumps(data)
+
+        encoded = codec.encode(content)
+
+        assert encoded.startswith(audit.ZSTD_MAGIC)
+        assert len(encoded) < len(content)
+        assert audit.decode_body(encoded) == data
+
+    def test_compression_is_disabled_by_default(self) -> None:
+        codec = audit.BodyCodec()
+
+        content = b"[" + b"0," * 10000 + b"0]"
+
+        assert codec.encode(content) == content
+
+    @pytest.mark.parametrize("content", [
+        None,
+        b"",
+    ])
+    def test_empty_body(self, content: bytes) -> None:
+        pytest.importorskip("zstandard")
+        codec = audit.BodyCodec(threshold=0)
+
+        assert codec.encode(content) is None
+        assert audit.decode_body(codec.encode(content)) is None
+
+
+@pytest.mark.parametrize("remote, expected", [
+    ("127.0.0.1:8080", ("127.0.0.1", 8080)),
+    ("::1:8080", ("::1", 8080)),
+    ("testclient:50000", (None, 50000)),
+    (None, (None, None)),
+])
+def test_split_remote(remote: str, expected: tuple) -> None:
+    assert audit.split_remote(remote) == expected
+
+
+def test_audit_method() -> None:
+    assert audit.audit_method("POST") == "POST"
+    assert audit.audit_method("PROPFIND") is None
@@ -0,0 +1,215 @@
+import asyncio
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+from http import HTTPStatus
+from typing import List
+
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from vertical import contracts, hdrs
+from vertical.app import AppConfig, auth, create_app, tables
+
+APPLICATION_JSON = "application/json"
+
+
+def test_that_token_is_not_stored(
+        sqlalchemy_auth_session: Session,
+        allowed_contract: tables.Contract,
+) -> None:
+    columns = sqlalchemy_auth_session.execute("""
+        SELECT
+            column_name
+        FROM
+            information_schema.columns
+        WHERE
+            table_name = 'contracts'
+        ;
+    """).fetchall()
+    assert ("token", ) not in columns
+
+    contract = sqlalchemy_auth_session.query(tables.Contract) \
+        .filter(tables.Contract.id == allowed_contract.id) \
+        .one()
+
+    digest = auth.make_token_digest(allowed_contract.token)
+    assert contract.token_digest == digest
+    assert len(contract.token_digest) == 64
+
+
+def test_issued_contract_is_authorized(
+        client: TestClient,
+        sqlalchemy_auth_session: Session,
+) -> None:
+    contract = contracts.issue_contract(sqlalchemy_auth_session, "Issued")
+
+    assert contract.client.name == "Issued"
+
+    headers = {
+        hdrs.CONTENT_TYPE: APPLICATION_JSON,
+        hdrs.AUTHORIZATION: f"{hdrs.BEARER} {contract.token}",
+    }
+
+    r = client.get("/health", headers=headers)
+
+    http_status = HTTPStatus.OK
+    assert r.status_code == http_status
+
+
+def test_app_is_served_by_another_loop(
+        config: AppConfig,
+        allowed_contract: tables.Contract,
+) -> None:
+    # Like with gunicorn preload_app, the app is loaded before
+    # the event loop of the worker process is created.
+    app = create_app(config)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    headers = {
+        hdrs.CONTENT_TYPE: APPLICATION_JSON,
+        hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+    }
+
+    with TestClient(app) as client:
+        r = client.get("/health", headers=headers)
+
+    http_status = HTTPStatus.OK
+    assert r.status_code == http_status
+
+
+def test_that_orm_is_not_imported_by_app() -> None:
+    code = "import sys, vertical; print('sqlalchemy.orm' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert result.stdout.strip() == b"False"
+
+
+def test_contracts_cache_survives_restart(
+        config: AppConfig,
+        admin_contract: tables.Contract,
+        tmp_path,
+) -> None:
+    config["auth_service"]["contract_cache"] = {
+        "ttl": 60,
+        "snapshot": str(tmp_path / "contracts.cache"),
+    }
+
+    headers = {
+        hdrs.CONTENT_TYPE: APPLICATION_JSON,
+        hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+    }
+
+    def spans() -> List[str]:
+        with TestClient(create_app(config)) as client:
+            r = client.get("/health", headers=headers)
+
+        assert r.status_code == HTTPStatus.OK
+
+        server_timing = r.headers[hdrs.SERVER_TIMING]
+        return [metric.split(";")[0] for metric in server_timing.split(", ")]
+
+    assert "auth.get_contract" in spans()
+    assert "auth.get_contract" not in spans()
+
+
+def test_contract_cache_round_trip(admin_contract: tables.Contract) -> None:
+    contract = auth.Contract(
+        id=uuid.UUID(admin_contract.id),
+        client_id=uuid.UUID(admin_contract.client.id),
+        token_digest=admin_contract.token_digest,
+        created_at=admin_contract.created_at,
+        expired_at=datetime(2030, 1, 1),
+        rate_limit=1.5,
+        rate_burst=3,
+        client=auth.Client(
+            id=uuid.UUID(admin_contract.client.id),
+            name=admin_contract.client.name,
+            created_at=admin_contract.client.created_at,
+        ),
+    )
+
+    data = auth.encode_contract(contract)
+    assert auth.decode_contract(data) == contract
+
+
+def test_jsonb_round_trip() -> None:
+    content = b'{"number": "79001234567"}'
+
+    assert auth.encode_jsonb(content) == b"\x01" + content
+    assert auth.decode_jsonb(auth.encode_jsonb(content)) == {
+        "number": "79001234567",
+    }
+    assert auth.decode_jsonb(auth.encode_jsonb([1, None])) == [1, None]
+
+
+def test_pool_connections_are_initialized(
+        auth_config: auth.AuthServiceConfig,
+) -> None:
+    service = auth.AuthService.from_config(auth_config)
+
+    async def main() -> None:
+        pool = await service._pool_factory(init=auth.init_connection)
+        try:
+            async with pool.acquire() as connection:
+                value = await connection.fetchval(
+                    "SELECT $1::JSONB;",
+                    b'{"data": [1, 2]}',
+                )
+                assert value == {"data": [1, 2]}
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+# The first flush hangs until it's cancelled.
+class HangingPool:
+
+    def __init__(self) -> None:
+        self.flushing = asyncio.Event()
+        self.flushed: List[List] = []
+
+    async def executemany(self, query: str, rows: List) -> None:
+        if not self.flushing.is_set():
+            self.flushing.set()
+            await asyncio.sleep(60)
+        self.flushed.append(rows)
+
+    async def close(self) -> None:
+        pass
+
+
+def test_usage_is_flushed_at_shutdown(
+        auth_config: auth.AuthServiceConfig,
+) -> None:
+    config = auth_config.copy()
+    config["usage_flush_interval"] = 0.01
+    service = auth.AuthService.from_config(config)
+    contract_id = uuid.uuid4()
+
+    async def main() -> List[List]:
+        pool = HangingPool()
+        service._pool = pool
+        service._usage_flusher = asyncio.create_task(
+            service.flush_usage_loop(),
+        )
+
+        await service.record_usage(contract_id, HTTPStatus.OK, 0.5)
+        await pool.flushing.wait()
+
+        await service.cleanup()
+        return pool.flushed
+
+    flushed = asyncio.run(main())
+    assert len(flushed) == 1
+
+    (row,) = flushed[0]
+    assert row[0] == contract_id
+    assert row[3] == 1
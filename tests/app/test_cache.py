@@ -0,0 +1,143 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from vertical.app import cache
+
+
+@pytest.fixture
+def snapshot(tmp_path) -> str:
+    return str(tmp_path / "vertical.cache")
+
+
+def encode(value: str) -> bytes:
+    return value.encode()
+
+
+def decode(data: bytes) -> str:
+    return data.decode()
+
+
+class TestTTLCache:
+
+    def test_disabled_cache(self) -> None:
+        ttl_cache = cache.TTLCache()
+        ttl_cache.set(b"key", "value")
+
+        assert ttl_cache.get(b"key") is None
+
+    def test_expired_entry(self) -> None:
+        ttl_cache = cache.TTLCache(ttl=10)
+        ttl_cache.set(b"key", "value")
+
+        assert ttl_cache.get(b"key") == "value"
+
+        with patch.object(time, "time", return_value=time.time() + 10):
+            assert ttl_cache.get(b"key") is None
+        assert len(ttl_cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, max_size=2)
+        ttl_cache.set(b"first", 1)
+        ttl_cache.set(b"second", 2)
+
+        ttl_cache.get(b"first")
+        ttl_cache.set(b"third", 3)
+
+        assert ttl_cache.get(b"first") == 1
+        assert ttl_cache.get(b"second") is None
+        assert ttl_cache.get(b"third") == 3
+
+    def test_snapshot_is_loaded(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        ttl_cache.set(b"first", "1")
+        ttl_cache.set(b"second", "2")
+
+        assert ttl_cache.save(encode, 1) == 2
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        assert loaded.load(decode, 1) == 2
+        assert loaded.get(b"first") == "1"
+        assert loaded.get(b"second") == "2"
+
+    def test_snapshot_of_another_version(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        ttl_cache.set(b"key", "value")
+        ttl_cache.save(encode, 1)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        assert loaded.load(decode, 2) == 0
+        assert loaded.get(b"key") is None
+
+    def test_snapshot_with_another_stamp(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        ttl_cache.set(b"key", "value")
+        ttl_cache.save(encode, 1, stamp=7)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        assert loaded.load(decode, 1, stamp=8) == 0
+        assert loaded.load(decode, 1, stamp=7) == 1
+        assert loaded.get(b"key") == "value"
+
+    def test_clear(self) -> None:
+        ttl_cache = cache.TTLCache(ttl=10)
+        ttl_cache.set(b"key", "value")
+        ttl_cache.clear()
+
+        assert len(ttl_cache) == 0
+        assert ttl_cache.get(b"key") is None
+
+    def test_expired_entries_are_discarded(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        ttl_cache.set(b"stale", "1", expires_at=time.time() + 1)
+        ttl_cache.set(b"fresh", "2")
+        ttl_cache.save(encode, 1)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        with patch.object(time, "time", return_value=time.time() + 5):
+            assert loaded.load(decode, 1) == 1
+            assert loaded.get(b"stale") is None
+            assert loaded.get(b"fresh") == "2"
+
+    def test_entries_keep_shorter_ttl(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=100, snapshot=snapshot)
+        ttl_cache.set(b"key", "value")
+        ttl_cache.save(encode, 1)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+        loaded.load(decode, 1)
+
+        with patch.object(time, "time", return_value=time.time() + 10):
+            assert loaded.get(b"key") is None
+
+    def test_load_budget(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        for i in range(100):
+            ttl_cache.set(str(i).encode(), str(i))
+        ttl_cache.save(encode, 1)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot, load_budget=0)
+
+        assert loaded.load(decode, 1) == 0
+
+    def test_corrupted_snapshot(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+        ttl_cache.set(b"key", "value")
+        ttl_cache.save(encode, 1)
+
+        with open(snapshot, "r+b") as file:
+            file.truncate(cache.HEADER.size + 4)
+
+        loaded = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        assert loaded.load(decode, 1) == 0
+
+    def test_missing_snapshot(self, snapshot: str) -> None:
+        ttl_cache = cache.TTLCache(ttl=10, snapshot=snapshot)
+
+        assert ttl_cache.load(decode, 1) == 0
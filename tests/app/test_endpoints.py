@@ -1,17 +1,22 @@
+import hashlib
 from datetime import date
 from http import HTTPStatus
-from typing import Callable, Dict
+from typing import Callable, Dict, List
 from unittest.mock import patch
 
+import orjson
 import pytest
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
 from starlette.applications import Starlette
 from starlette.testclient import TestClient
 
 from vertical import hdrs
-from vertical.app import auth, utils
+from vertical.app import AppConfig, auth, create_app, hunter, tables, utils
 
 APPLICATION_JSON = "application/json"
+APPLICATION_NDJSON = "application/x-ndjson"
+APPLICATION_MSGPACK = "application/msgpack"
 
 
 class TestPingEndpoint:
@@ -45,8 +50,8 @@ class TestPingEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
 
 
 class TestHealthEndpoint:
@@ -62,7 +67,7 @@ class TestHealthEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
     ) -> None:
         headers = {
             hdrs.CONTENT_TYPE: APPLICATION_JSON,
@@ -82,8 +87,117 @@ class TestHealthEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
+
+    def test_request_with_limited_contract(
+            self,
+            client: TestClient,
+            limited_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {limited_contract.token}"
+        }
+
+        for _ in range(limited_contract.rate_burst):
+            r = client.get(self.path, headers=headers)
+            assert r.status_code == HTTPStatus.OK
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.TOO_MANY_REQUESTS
+        assert r.status_code == http_status
+
+        assert r.json() == {
+            "message": "Too many requests",
+        }
+
+        retry_after = int(r.headers[hdrs.RETRY_AFTER])
+        assert 0 < retry_after <= 1 / limited_contract.rate_limit
+
+
+class TestLivezEndpoint:
+    path = "/livez"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="livez")
+        assert self.path == url
+
+    def test_that_service_is_alive(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+    ) -> None:
+        r = client.get(self.path)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+        assert r.headers[hdrs.CONTENT_TYPE].startswith(APPLICATION_JSON)
+
+        assert r.json() == {
+            "message": "OK",
+            "data": {},
+        }
+
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+
+
+class TestReadyzEndpoint:
+    path = "/readyz"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="readyz")
+        assert self.path == url
+
+    def test_that_service_is_ready(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+    ) -> None:
+        # No Content-Type and no body parsing, like load balancer probes.
+        r = client.get(self.path)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+        assert r.headers[hdrs.CONTENT_TYPE].startswith(APPLICATION_JSON)
+
+        json = r.json()
+        assert json["message"] == "OK"
+        assert json["data"]["auth"] is True
+        assert json["data"]["hunter"] is True
+        assert json["data"]["loop"] is True
+
+        request_id = r.headers[hdrs.X_REQUEST_ID]
+        assert utils.is_valid_uuid(request_id)
+
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
+
+    def test_that_service_is_not_ready(
+            self,
+            config: AppConfig,
+            sqlalchemy_hunter_session: Session,
+    ) -> None:
+        with patch.object(
+            hunter.HunterService,
+            "get_ping",
+            side_effect=ConnectionError("connection refused"),
+        ):
+            with TestClient(create_app(config)) as client:
+                r = client.get(self.path)
+
+        http_status = HTTPStatus.SERVICE_UNAVAILABLE
+        assert r.status_code == http_status
+
+        json = r.json()
+        assert json["message"] == "Not ready"
+        assert json["data"]["auth"] is True
+        assert json["data"]["hunter"] is False
 
 
 class TestPhoneReliabilityEndpoint:
@@ -110,8 +224,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -145,8 +259,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -161,7 +275,7 @@ class TestPhoneReliabilityEndpoint:
     def test_request_with_invalid_token_type(
             self,
             client: TestClient,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             sqlalchemy_auth_session: Session,
     ) -> None:
         token = allowed_contract.token
@@ -183,8 +297,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -218,8 +332,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -235,7 +349,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            expired_contract: auth.Contract,
+            expired_contract: tables.Contract,
     ) -> None:
         token = expired_contract.token
 
@@ -258,8 +372,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -275,7 +389,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            revoked_contract: auth.Contract,
+            revoked_contract: tables.Contract,
     ) -> None:
         token = revoked_contract.token
 
@@ -298,8 +412,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -319,7 +433,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             json: Dict,
     ) -> None:
         token = allowed_contract.token
@@ -346,8 +460,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -370,7 +484,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             number: str,
     ) -> None:
         token = allowed_contract.token
@@ -401,8 +515,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -418,7 +532,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             phone_number_generator: Callable,
     ) -> None:
         token = allowed_contract.token
@@ -448,8 +562,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -465,7 +579,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             phone_number_generator: Callable,
             create_submission: Callable,
     ) -> None:
@@ -522,8 +636,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -539,7 +653,7 @@ class TestPhoneReliabilityEndpoint:
             self,
             client: TestClient,
             sqlalchemy_auth_session: Session,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             phone_number_generator: Callable,
             create_submission: Callable,
     ) -> None:
@@ -596,8 +710,8 @@ class TestPhoneReliabilityEndpoint:
         request_id = r.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        response = sqlalchemy_auth_session.query(auth.Response).first()
-        assert isinstance(response, auth.Response)
+        response = sqlalchemy_auth_session.query(tables.Response).first()
+        assert isinstance(response, tables.Response)
 
         assert response.id == request_id
         assert response.body == r.json()
@@ -612,7 +726,7 @@ class TestPhoneReliabilityEndpoint:
     def test_request_with_query_timeout(
             self,
             client: TestClient,
-            allowed_contract: auth.Contract,
+            allowed_contract: tables.Contract,
             phone_number_generator: Callable,
     ) -> None:
         token = allowed_contract.token
@@ -638,3 +752,564 @@ class TestPhoneReliabilityEndpoint:
         assert r.json() == {
             "message": "Internal server error",
         }
+
+    def test_request_with_idempotency_key(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        token = allowed_contract.token
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {token}",
+            hdrs.IDEMPOTENCY_KEY: "retry-1",
+        }
+
+        json = {
+            "number": phone_number_generator(),
+        }
+
+        r = client.post(self.path, json=json, headers=headers)
+        assert r.status_code == HTTPStatus.OK
+        assert hdrs.IDEMPOTENT_REPLAYED not in r.headers
+
+        with patch("vertical.app.hunter.HunterService.verify") as m:
+            replayed = client.post(self.path, json=json, headers=headers)
+            m.assert_not_called()
+
+        assert replayed.status_code == r.status_code
+        assert replayed.json() == r.json()
+        assert replayed.headers[hdrs.IDEMPOTENT_REPLAYED] == "true"
+
+        key = sqlalchemy_auth_session.query(tables.IdempotencyKey).one()
+        assert key.contract_id == allowed_contract.id
+        assert key.key == "retry-1"
+        assert key.code == r.status_code
+        assert key.body == r.json()
+
+    def test_request_with_reused_idempotency_key(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        token = allowed_contract.token
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {token}",
+            hdrs.IDEMPOTENCY_KEY: "retry-1",
+        }
+
+        json = {
+            "number": phone_number_generator(),
+        }
+        r = client.post(self.path, json=json, headers=headers)
+        assert r.status_code == HTTPStatus.OK
+
+        json = {
+            "number": phone_number_generator(),
+        }
+        r = client.post(self.path, json=json, headers=headers)
+
+        http_status = HTTPStatus.UNPROCESSABLE_ENTITY
+        assert r.status_code == http_status
+
+        assert r.json() == {
+            "message": "Idempotency-Key was used with another request body",
+        }
+
+
+class TestPhonesReliabilityEndpoint:
+    path = "/reliability/phones"
+
+    @pytest.fixture
+    def hunter_config(self, hunter_config: Dict) -> Dict:
+        return {**hunter_config, "chunk_size": 2}
+
+    @pytest.fixture
+    def numbers(
+            self,
+            phone_number_generator: Callable,
+            create_submission: Callable,
+    ) -> List[str]:
+        numbers = [phone_number_generator() for _ in range(5)]
+
+        dates = (date(2000, 1, 1), date(2020, 1, 1))
+        for submission_number, created_at in enumerate(dates):
+            create_submission(
+                submission_number=submission_number,
+                submission_created_at=created_at,
+                person_name="Jake",
+                person_birthday="1970.01.01",
+                person_phone_number=numbers[1],
+            )
+        return numbers
+
+    def expected(self, numbers: List[str]) -> List[Dict]:
+        rows = [
+            {"number": number, "status": False, "period": None}
+            for number in numbers
+        ]
+        rows[1] = {
+            "number": numbers[1],
+            "status": True,
+            "period": {
+                "registered_at": "2000.01.01",
+                "updated_at": "2020.01.01",
+            },
+        }
+        return rows
+
+    def test_request_with_json_response(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        r = client.post(self.path, json={"numbers": numbers}, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        assert r.json() == {
+            "message": "OK",
+            "data": {
+                "results": self.expected(numbers),
+            },
+        }
+
+    def test_request_with_ndjson_response(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: APPLICATION_NDJSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        r = client.post(self.path, json={"numbers": numbers}, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+        assert r.headers[hdrs.CONTENT_TYPE] == APPLICATION_NDJSON
+
+        rows = [orjson.loads(line) for line in r.content.splitlines()]
+        assert rows == self.expected(numbers)
+
+        # Only the digest of the streamed body is saved.
+        response = sqlalchemy_auth_session.query(tables.Response).one()
+
+        assert response.id == r.headers[hdrs.X_REQUEST_ID]
+        assert response.code == r.status_code
+        assert response.body == {
+            "rows": len(numbers),
+            "length": len(r.content),
+            "sha256": hashlib.sha256(r.content).hexdigest(),
+        }
+
+    def test_request_with_msgpack_response(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        msgpack = pytest.importorskip("msgpack")
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_MSGPACK,
+            hdrs.ACCEPT: APPLICATION_MSGPACK,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        data = msgpack.packb({"numbers": numbers})
+        r = client.post(self.path, data=data, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+        assert r.headers[hdrs.CONTENT_TYPE] == APPLICATION_MSGPACK
+
+        content = {
+            "message": "OK",
+            "data": {
+                "results": self.expected(numbers),
+            },
+        }
+        assert msgpack.unpackb(r.content) == content
+
+        # Both bodies are saved in the decoded form.
+        response = sqlalchemy_auth_session.query(tables.Response).one()
+
+        assert response.body == content
+        assert response.request.body == {"numbers": numbers}
+
+    def test_request_with_invalid_phone_number(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: APPLICATION_NDJSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        json = {
+            "numbers": [phone_number_generator(), "80000000000"],
+        }
+
+        r = client.post(self.path, json=json, headers=headers)
+
+        http_status = HTTPStatus.UNPROCESSABLE_ENTITY
+        assert r.status_code == http_status
+
+        assert r.json()["errors"] == {
+            "numbers": {
+                "1": [
+                    "Phone number does't match expected pattern: 7\\d{10}.",
+                ],
+            },
+        }
+
+    def test_request_with_query_timeout(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: APPLICATION_NDJSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        with patch("vertical.app.hunter.HunterService.timeout") as mocked:
+            mocked.side_effect = [10, 1e-10]
+
+            r = client.post(
+                self.path,
+                json={"numbers": numbers},
+                headers=headers,
+            )
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        rows = [orjson.loads(line) for line in r.content.splitlines()]
+        assert rows == [
+            *self.expected(numbers)[:2],
+            {"error": "Internal server error"},
+        ]
+
+    def test_request_with_database_error(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: APPLICATION_NDJSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        get_reliabilities = hunter.HunterService.get_reliabilities
+        error = sa.exc.OperationalError("SELECT", {}, Exception("gone"))
+
+        calls = []
+
+        def failing(service, phone_hashes):
+            calls.append(phone_hashes)
+            if len(calls) > 1:
+                raise error
+            return get_reliabilities(service, phone_hashes)
+
+        with patch.object(hunter.HunterService, "get_reliabilities", failing):
+            r = client.post(
+                self.path,
+                json={"numbers": numbers},
+                headers=headers,
+            )
+
+        assert r.status_code == HTTPStatus.OK
+
+        rows = [orjson.loads(line) for line in r.content.splitlines()]
+        assert rows == [
+            *self.expected(numbers)[:2],
+            {"error": "Internal server error"},
+        ]
+
+        response = sqlalchemy_auth_session.query(tables.Response).one()
+        assert response.id == r.headers[hdrs.X_REQUEST_ID]
+        assert response.body["rows"] == 3
+
+    def test_failed_stream_is_saved(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            numbers: List[str],
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: APPLICATION_NDJSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        async def rows(hunter_service, phone_numbers):
+            yield {"number": phone_numbers[0]}
+            raise RuntimeError("stream failed")
+
+        path = "vertical.app.endpoints.stream_reliability_rows"
+        with patch(path, rows):
+            client.post(self.path, json={"numbers": numbers}, headers=headers)
+
+        response = sqlalchemy_auth_session.query(tables.Response).one()
+        assert response.code == HTTPStatus.OK
+        assert response.body["rows"] == 1
+
+
+class TestUsageEndpoint:
+    path = "/usage"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="usage")
+        assert self.path == url
+
+    def test_request_with_client_contract(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.FORBIDDEN
+        assert r.status_code == http_status
+
+        assert r.json() == {
+            "message": "Admin contract required",
+        }
+
+    def test_request_with_invalid_period(
+            self,
+            client: TestClient,
+            admin_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        json = {
+            "since": "2020.02.01",
+            "until": "2020.01.01",
+        }
+
+        r = client.post(self.path, json=json, headers=headers)
+
+        http_status = HTTPStatus.UNPROCESSABLE_ENTITY
+        assert r.status_code == http_status
+
+        assert r.json() == {
+            "message": "Input payload validation failed",
+            "errors": {
+                "since": [
+                    "Must not be later than until",
+                ],
+            },
+        }
+
+    def test_usage_is_counted(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            admin_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        for json in [{"number": phone_number_generator()}, {}, {}]:
+            client.post("/reliability/phone", json=json, headers=headers)
+
+        usage = sqlalchemy_auth_session.query(tables.UsageDaily) \
+            .filter(tables.UsageDaily.contract_id == allowed_contract.id) \
+            .order_by(tables.UsageDaily.status_class) \
+            .all()
+
+        assert [(row.status_class, row.calls) for row in usage] == [
+            (2, 1),
+            (4, 2),
+        ]
+        assert all(row.latency > 0 for row in usage)
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        json = {
+            "contract_id": allowed_contract.id,
+        }
+
+        r = client.post(self.path, json=json, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        today = date.today().strftime("%Y.%m.%d")
+
+        data = r.json()["data"]
+        assert data["until"] == today
+        assert [
+            (row["contract_id"], row["day"], row["status_class"], row["calls"])
+            for row in data["usage"]
+        ] == [
+            (allowed_contract.id, today, "2xx", 1),
+            (allowed_contract.id, today, "4xx", 2),
+        ]
+
+
+class TestHunterPlansEndpoint:
+    path = "/hunter/plans"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="hunter_plans")
+        assert self.path == url
+
+    def test_request_with_client_contract(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.FORBIDDEN
+        assert r.status_code == http_status
+
+    def test_plans_use_tel_index(
+            self,
+            client: TestClient,
+            admin_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        plans = r.json()["data"]["plans"]
+        assert [plan["name"] for plan in plans] == ["status", "period"]
+
+        for plan in plans:
+            assert not plan["full_scan"]
+            assert any("hundata_tel_index" in line for line in plan["plan"])
+
+
+class TestHunterExecutorEndpoint:
+    path = "/hunter/executor"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="hunter_executor")
+        assert self.path == url
+
+    def test_executor_stats(
+            self,
+            client: TestClient,
+            admin_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        data = r.json()["data"]
+        assert data["workers"] == 15
+        assert data["active"] == 0
+        assert data["queued"] == 0
+
+
+class TestLoopLagEndpoint:
+    path = "/loop/lag"
+
+    def test_that_route_is_named(self, client: TestClient) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        url = app.url_path_for(name="loop_lag")
+        assert self.path == url
+
+    def test_request_with_client_contract(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.FORBIDDEN
+        assert r.status_code == http_status
+
+    def test_lag_percentiles(
+            self,
+            client: TestClient,
+            admin_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        r = client.get(self.path, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        data = r.json()["data"]
+        assert set(data) == {"samples", "p50", "p90", "p99", "max"}
@@ -7,7 +7,7 @@ from starlette.requests import Request
 from starlette.testclient import TestClient
 
 from vertical import hdrs
-from vertical.app import auth, utils
+from vertical.app import tables, utils
 
 APPLICATION_JSON = "application/json"
 
@@ -41,10 +41,10 @@ def test_default_error_handler(
     request_id = r.headers[hdrs.X_REQUEST_ID]
     assert utils.is_valid_uuid(request_id)
 
-    assert sqlalchemy_auth_session.query(auth.Response).first() is None
+    assert sqlalchemy_auth_session.query(tables.Response).first() is None
 
-    request = sqlalchemy_auth_session.query(auth.Request).first()
-    assert isinstance(request, auth.Request)
+    request = sqlalchemy_auth_session.query(tables.Request).first()
+    assert isinstance(request, tables.Request)
 
     assert request.id == request_id
     assert request.path == r.request.path_url
@@ -73,8 +73,8 @@ def test_http_exception_handler(
     request_id = r.headers[hdrs.X_REQUEST_ID]
     assert utils.is_valid_uuid(request_id)
 
-    response = sqlalchemy_auth_session.query(auth.Response).first()
-    assert isinstance(response, auth.Response)
+    response = sqlalchemy_auth_session.query(tables.Response).first()
+    assert isinstance(response, tables.Response)
 
     assert response.id == request_id
     assert response.body == r.json()
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from vertical.app.context import REQUEST_ID
+from vertical.app.executor import BoundedExecutor, ExecutorFull
+
+
+class TestBoundedExecutor:
+
+    def test_calls_over_capacity_are_rejected(self) -> None:
+        executor = BoundedExecutor(workers=1, queue_size=1)
+        release = threading.Event()
+
+        async def main() -> None:
+            running = asyncio.ensure_future(executor.run(release.wait))
+            queued = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+
+            with pytest.raises(ExecutorFull):
+                await executor.run(release.wait)
+
+            stats = executor.stats()
+            assert (stats["active"], stats["queued"]) == (1, 1)
+            assert stats["rejected"] == 1
+
+            release.set()
+            assert list(await asyncio.gather(running, queued)) == [True, True]
+
+        asyncio.run(main())
+        executor.shutdown()
+
+        stats = executor.stats()
+        assert (stats["active"], stats["queued"]) == (0, 0)
+        assert stats["wait_max"] > 0
+
+    def test_cancelled_calls_leave_the_queue(self) -> None:
+        executor = BoundedExecutor(workers=1, queue_size=1)
+        release = threading.Event()
+
+        async def main() -> None:
+            running = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(executor.run(release.wait), 0.05)
+
+            assert executor.stats()["queued"] == 0
+
+            release.set()
+            await running
+
+        asyncio.run(main())
+        executor.shutdown()
+
+    def test_context_is_copied(self) -> None:
+        executor = BoundedExecutor(workers=1, queue_size=0)
+
+        async def main() -> str:
+            REQUEST_ID.set("request")
+            return await executor.run(REQUEST_ID.get)
+
+        assert asyncio.run(main()) == "request"
+        executor.shutdown()
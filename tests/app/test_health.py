@@ -0,0 +1,121 @@
+import asyncio
+from http import HTTPStatus
+from unittest.mock import Mock
+
+import orjson
+import pytest
+
+from vertical.app.health import HealthProber
+
+
+@pytest.fixture
+def logger() -> Mock:
+    return Mock()
+
+
+def make_prober(logger: Mock) -> HealthProber:
+    return HealthProber(interval=0.01, timeout=0.05, max_lag=1, logger=logger)
+
+
+async def healthy() -> bool:
+    return True
+
+
+async def unhealthy() -> bool:
+    raise ConnectionError("connection refused")
+
+
+async def hanging() -> bool:
+    await asyncio.sleep(1)
+    return True
+
+
+class TestHealthProber:
+
+    def test_ready_when_all_checks_pass(self, logger: Mock) -> None:
+        prober = make_prober(logger)
+        prober.add_check("auth", healthy)
+        prober.add_check("hunter", healthy)
+
+        async def main() -> None:
+            await prober.setup()
+            await asyncio.sleep(0.03)
+            await prober.cleanup()
+
+        asyncio.run(main())
+
+        http_status, content = prober.readiness()
+        assert http_status == HTTPStatus.OK
+
+        data = orjson.loads(content)["data"]
+        assert data["auth"] is True
+        assert data["hunter"] is True
+        assert prober.liveness()[0] == HTTPStatus.OK
+
+        logger.warning.assert_not_called()
+
+    def test_not_ready_when_check_fails(self, logger: Mock) -> None:
+        prober = make_prober(logger)
+        prober.add_check("auth", healthy)
+        prober.add_check("hunter", unhealthy)
+        prober.add_check("loop", hanging)
+
+        asyncio.run(prober.probe())
+
+        http_status, content = prober.readiness()
+        assert http_status == HTTPStatus.SERVICE_UNAVAILABLE
+
+        data = orjson.loads(content)["data"]
+        assert data["auth"] is True
+        assert data["hunter"] is False
+        assert data["loop"] is False
+
+        messages = sorted(call[0][0] for call in logger.warning.call_args_list)
+        assert messages == [
+            "Health check hunter failed: connection refused",
+            "Health check loop timed out",
+        ]
+
+        # Only the readiness depends on the checks.
+        assert prober.liveness()[0] == HTTPStatus.OK
+
+    def test_stale_probe_is_not_alive(self, logger: Mock) -> None:
+        prober = make_prober(logger)
+        prober.add_check("auth", healthy)
+
+        assert prober.liveness()[0] == HTTPStatus.SERVICE_UNAVAILABLE
+        assert prober.readiness()[0] == HTTPStatus.SERVICE_UNAVAILABLE
+
+        async def main() -> None:
+            await prober.setup()
+            await prober.cleanup()
+            await asyncio.sleep(0.1)
+
+        asyncio.run(main())
+
+        assert prober.liveness()[0] == HTTPStatus.SERVICE_UNAVAILABLE
+        assert prober.readiness()[0] == HTTPStatus.SERVICE_UNAVAILABLE
+
+    def test_cleanup_waits_for_running_probe(self, logger: Mock) -> None:
+        prober = make_prober(logger)
+        running = []
+
+        async def slow() -> bool:
+            running.append(True)
+            try:
+                await asyncio.sleep(0.04)
+            finally:
+                running.pop()
+            return True
+
+        prober.add_check("auth", slow)
+
+        async def main() -> None:
+            await prober.setup()
+            await asyncio.sleep(0.02)
+            assert running == [True]
+
+            await prober.cleanup()
+            assert running == []
+
+        asyncio.run(main())
@@ -0,0 +1,722 @@
+import asyncio
+import logging
+import random
+import subprocess
+import sys
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from unittest.mock import patch
+
+import orjson
+import pytest
+import sqlalchemy as sa
+from marshmallow import ValidationError
+
+from vertical import refresh, score
+from vertical.app.hunter import (
+    DATE_FORMAT,
+    RELIABILITY_SCHEMA,
+    HunterCoalescer,
+    HunterException,
+    HunterService,
+    HunterServiceConfig,
+    Period,
+    Reliability,
+    ReliabilityMode,
+    dump_reliability,
+    load_reliability,
+    make_generations_table,
+    make_hash,
+)
+
+EPOCH = date(1900, 1, 1)
+
+
+def random_date(rnd: random.Random) -> date:
+    return EPOCH + timedelta(days=rnd.randint(0, 73_000))
+
+
+def random_period(rnd: random.Random) -> Optional[Period]:
+    if rnd.random() < 0.3:
+        return None
+    return Period(random_date(rnd), random_date(rnd))
+
+
+def random_reliability(rnd: random.Random) -> Reliability:
+    status = rnd.random() < 0.5
+    period = random_period(rnd)
+    if rnd.random() < 0.3:
+        return Reliability(status, period, {"status": status, "x": True})
+    return Reliability(status, period)
+
+
+def random_date_value(rnd: random.Random) -> Any:
+    value = random_date(rnd).strftime(DATE_FORMAT)
+    return rnd.choice([
+        value,
+        value,
+        value,
+        value.replace(".", "-"),
+        value[:-1],
+        "2020.02.30",
+        "",
+        None,
+        20200101,
+    ])
+
+
+def random_payload(rnd: random.Random) -> Any:
+    period: Any = {
+        "registered_at": random_date_value(rnd),
+        "updated_at": random_date_value(rnd),
+    }
+    if rnd.random() < 0.1:
+        period.pop(rnd.choice(list(period)))
+    if rnd.random() < 0.3:
+        period = rnd.choice([None, None, [], "period"])
+
+    payload: Dict[str, Any] = {
+        "status": rnd.choice([True, False, None, 1, "true", "yes"]),
+        "period": period,
+    }
+    if rnd.random() < 0.1:
+        payload.pop(rnd.choice(list(payload)))
+    if rnd.random() < 0.1:
+        payload["extra"] = True
+    return payload
+
+
+class TestReliabilityFastPath:
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_encoder_matches_schema(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            reliability = random_reliability(rnd)
+
+            expected = orjson.dumps(RELIABILITY_SCHEMA.dump(reliability))
+            assert orjson.dumps(reliability.to_dict()) == expected
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_decoder_matches_schema(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            payload = random_payload(rnd)
+
+            try:
+                expected = RELIABILITY_SCHEMA.load(payload)
+            except ValidationError as e:
+                with pytest.raises(ValidationError) as exc_info:
+                    Reliability.from_dict(payload)
+                assert exc_info.value.messages == e.messages
+            else:
+                assert Reliability.from_dict(payload) == expected
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_round_trip(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            reliability = random_reliability(rnd)
+
+            data = orjson.loads(orjson.dumps(reliability.to_dict()))
+            assert Reliability.from_dict(data) == reliability
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_cache_round_trip(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            reliability = random_reliability(rnd)
+
+            data = dump_reliability(reliability)
+            assert load_reliability(data) == reliability
+
+    def test_period_decoder_reports_schema_errors(self) -> None:
+        data = {
+            "registered_at": "2020-01-01",
+        }
+
+        with pytest.raises(ValidationError) as exc_info:
+            Period.from_dict(data)
+
+        assert exc_info.value.messages == {
+            "registered_at": [
+                "Not a valid date.",
+            ],
+            "updated_at": [
+                "Missing data for required field.",
+            ],
+        }
+
+
+class TestHunterQueries:
+
+    @pytest.fixture
+    def hunter_service(self) -> HunterService:
+        bind = sa.create_engine("sqlite://")
+
+        service = HunterService(
+            days=180,
+            bind=bind,
+            schema=None,
+            table="hundata",
+            timeout=1,
+            logger=logging.getLogger("hunter"),
+        )
+        service.metadata().create_all(bind)
+
+        return service
+
+    def test_queries_are_not_recompiled(self, hunter_service) -> None:
+        compile = patch.object(
+            sa.sql.ClauseElement,
+            "compile",
+            side_effect=AssertionError("Query is compiled again"),
+        )
+
+        with compile:
+            assert hunter_service.get_status("00FF") is False
+            assert hunter_service.get_period("00FF") is None
+
+    def test_phone_hash_is_bound(self, hunter_service) -> None:
+        submissions = hunter_service.submissions()
+        hunter_service.metadata().bind.execute(submissions.insert(), {
+            "sub_no": "1",
+            "creation_datetime": date(2020, 1, 1),
+            "tel": "00FF",
+            "phk1": "",
+            "dob": "",
+        })
+
+        period = Period(date(2020, 1, 1), date(2020, 1, 1))
+        assert hunter_service.get_period("00FF") == period
+        assert hunter_service.get_period("FF00") is None
+
+
+class TestQueryPlanCheck:
+
+    @pytest.fixture
+    def submissions_without_index(self, sqlalchemy_hunter_session) -> None:
+        sqlalchemy_hunter_session.execute(
+            "DROP INDEX yavert.hundata_tel_index",
+        )
+
+    def test_full_scan_fails_startup(
+            self,
+            hunter_config: HunterServiceConfig,
+            submissions_without_index: None,
+    ) -> None:
+        hunter_config["plan_check"] = "fail"
+        service = HunterService.from_config(hunter_config)
+
+        with pytest.raises(HunterException):
+            asyncio.run(service.setup())
+        asyncio.run(service.cleanup())
+
+    def test_full_scan_is_reported(
+            self,
+            hunter_config: HunterServiceConfig,
+            submissions_without_index: None,
+    ) -> None:
+        service = HunterService.from_config(hunter_config)
+
+        logger = logging.getLogger(hunter_config["logger"]["name"])
+        with patch.object(logger, "warning") as warning:
+            asyncio.run(service.setup())
+        asyncio.run(service.cleanup())
+
+        assert [plan.full_scan for plan in service.plans()] == [True, True]
+        assert warning.call_count == 2
+
+    def test_check_is_disabled(
+            self,
+            hunter_config: HunterServiceConfig,
+            submissions_without_index: None,
+    ) -> None:
+        hunter_config["plan_check"] = "off"
+        service = HunterService.from_config(hunter_config)
+        asyncio.run(service.setup())
+        asyncio.run(service.cleanup())
+
+        assert service.plans() == []
+
+
+class TestDataGeneration:
+
+    def test_generation_change_clears_cache(
+            self,
+            hunter_config: HunterServiceConfig,
+            sqlalchemy_hunter_session: sa.engine.Engine,
+            create_submission,
+    ) -> None:
+        hunter_config["reliability_cache"] = {"ttl": 3600}
+        service = HunterService.from_config(hunter_config)
+
+        generations = service.generations()
+        phone_number = "79000000000"
+
+        async def verify_twice() -> None:
+            await service.setup()
+
+            reliability = await service.verify(phone_number)
+            assert reliability.period is None
+
+            create_submission(
+                submission_number=1,
+                submission_created_at=date(2020, 1, 1),
+                person_name="Jake",
+                person_birthday="1980-01-01",
+                person_phone_number=phone_number,
+            )
+
+            # Data has changed, but the generation has not been bumped yet.
+            await service.poll_generation()
+            reliability = await service.verify(phone_number)
+            assert reliability.period is None
+
+            sqlalchemy_hunter_session.execute(generations.insert().values(
+                name="hundata",
+                generation=1,
+                refreshed_at=sa.func.now(),
+            ))
+
+            await service.poll_generation()
+            assert service.generation() == 1
+
+            reliability = await service.verify(phone_number)
+            assert reliability.period is not None
+
+            await service.cleanup()
+
+        asyncio.run(verify_twice())
+
+    def test_snapshot_of_another_generation(
+            self,
+            hunter_config: HunterServiceConfig,
+            sqlalchemy_hunter_session: sa.engine.Engine,
+            tmp_path,
+    ) -> None:
+        hunter_config["generation_poll_interval"] = 60
+        hunter_config["reliability_cache"] = {
+            "ttl": 3600,
+            "snapshot": str(tmp_path / "reliability.cache"),
+        }
+
+        service = HunterService.from_config(hunter_config)
+        generations = service.generations()
+
+        async def restart() -> int:
+            await service.setup()
+            await service.verify("79000000000")
+            await service.cleanup()
+
+            sqlalchemy_hunter_session.execute(generations.insert().values(
+                name="hundata",
+                generation=1,
+                refreshed_at=sa.func.now(),
+            ))
+
+            restarted = HunterService.from_config(hunter_config)
+            await restarted.setup()
+            await restarted.cleanup()
+            return restarted.generation()
+
+        logger = logging.getLogger(hunter_config["logger"]["name"])
+        with patch.object(logger, "info") as info:
+            assert asyncio.run(restart()) == 1
+
+        messages = [call.args[0] for call in info.call_args_list]
+        assert "Loaded %d cached reliabilities" not in messages
+
+
+class TestRefresh:
+
+    @pytest.fixture
+    def materialized_view(
+            self,
+            sqlalchemy_hunter_bind: sa.engine.Engine,
+    ) -> Iterator[sa.engine.Engine]:
+        bind = sqlalchemy_hunter_bind
+        bind.execute("""
+            CREATE SCHEMA refreshed;
+            CREATE TABLE refreshed.submissions (
+                sub_no VARCHAR(10) PRIMARY KEY,
+                tel VARCHAR(64) NOT NULL
+            );
+            CREATE MATERIALIZED VIEW refreshed.hundata AS
+                SELECT * FROM refreshed.submissions;
+            CREATE UNIQUE INDEX ON refreshed.hundata (sub_no);
+        """)
+        make_generations_table(sa.MetaData(schema="refreshed")).create(bind)
+        try:
+            yield bind
+        finally:
+            bind.execute("DROP SCHEMA refreshed CASCADE")
+
+    def test_refresh_bumps_generation(
+            self,
+            materialized_view: sa.engine.Engine,
+    ) -> None:
+        bind = materialized_view
+
+        assert refresh.refresh(bind, "refreshed", "hundata") == 1
+
+        tel = make_hash("79000000000")
+        bind.execute(sa.text(
+            "INSERT INTO refreshed.submissions VALUES ('1', :tel)",
+        ), tel=tel)
+
+        assert refresh.refresh(bind, "refreshed", "hundata") == 2
+
+        query = "SELECT tel FROM refreshed.hundata"
+        assert bind.execute(query).scalar() == tel
+
+
+class TestBatchQueries:
+
+    numbers = ("79000000000", "78000000000", "77000000000")
+
+    @pytest.fixture
+    def submissions(self, create_submission) -> None:
+        rows = (
+            (1, date(2020, 1, 1), "79000000000"),
+            (2, date(2020, 9, 1), "79000000000"),
+            (3, date(2020, 3, 1), "78000000000"),
+        )
+        for number, created_at, phone_number in rows:
+            create_submission(
+                submission_number=number,
+                submission_created_at=created_at,
+                person_name="Jake",
+                person_birthday="1980-01-01",
+                person_phone_number=phone_number,
+            )
+
+    def test_reliabilities_match_single_queries(
+            self,
+            app,
+            submissions: None,
+    ) -> None:
+        service: HunterService = app.state.hunter_service
+
+        phone_hashes = [make_hash(number) for number in self.numbers]
+        expected = [
+            Reliability(
+                status=service.get_status(phone_hash),
+                period=service.get_period(phone_hash),
+            )
+            for phone_hash in phone_hashes
+        ]
+
+        assert service.get_reliabilities(phone_hashes) == expected
+        assert [reliability.status for reliability in expected] == [
+            True,
+            False,
+            False,
+        ]
+
+    def test_score_command(
+            self,
+            sqlalchemy_hunter_session: sa.engine.Engine,
+            submissions: None,
+            tmp_path,
+    ) -> None:
+        numbers = ("77000000000", "123", "79000000000", "", "78000000000")
+
+        source = tmp_path / "numbers.csv"
+        source.write_text("\n".join(["id,phone"] + [
+            f"{i},{number}" for i, number in enumerate(numbers)
+        ]))
+        target = tmp_path / "results.ndjson"
+
+        score.main([
+            str(source),
+            "--output", str(target),
+            "--format", "ndjson",
+            "--column", "1",
+            "--header",
+            "--url", str(sqlalchemy_hunter_session.url),
+            "--chunk-size", "2",
+            "--processes", "2",
+            "--progress", "0",
+        ])
+
+        lines = target.read_text().splitlines()
+        results = [orjson.loads(line) for line in lines]
+        assert results == [
+            {"number": "77000000000", "status": False, "period": None},
+            {"number": "123", "error": "Invalid phone number"},
+            {
+                "number": "79000000000",
+                "status": True,
+                "period": {
+                    "registered_at": "2020.01.01",
+                    "updated_at": "2020.09.01",
+                },
+            },
+            {"number": "", "error": "Invalid phone number"},
+            {
+                "number": "78000000000",
+                "status": False,
+                "period": {
+                    "registered_at": "2020.03.01",
+                    "updated_at": "2020.03.01",
+                },
+            },
+        ]
+
+
+class TestRuleEngine:
+
+    numbers = (
+        "79000000000",
+        "78000000000",
+        "77000000000",
+        "76000000000",
+        "79000000000",
+    )
+
+    @pytest.fixture
+    def hunter_config(self, hunter_config: Dict) -> Dict:
+        pytest.importorskip("numpy")
+        return {**hunter_config, "reliability_mode": "rules"}
+
+    @pytest.fixture
+    def submissions(self, create_submission) -> None:
+        rows = (
+            (1, date(2020, 1, 1), "Jake", "79000000000"),
+            (2, date(2020, 9, 1), "Jake", "79000000000"),
+            (3, date(2020, 3, 1), "Jake", "78000000000"),
+            (4, date(2020, 1, 1), "Jake", "76000000000"),
+            (5, date(2020, 12, 1), "Mike", "76000000000"),
+        )
+        for number, created_at, name, phone_number in rows:
+            create_submission(
+                submission_number=number,
+                submission_created_at=created_at,
+                person_name=name,
+                person_birthday="1980-01-01",
+                person_phone_number=phone_number,
+            )
+
+    def test_rules_match_sql_queries(
+            self,
+            app,
+            submissions: None,
+    ) -> None:
+        service: HunterService = app.state.hunter_service
+        assert service.reliability_mode() is ReliabilityMode.RULES
+
+        phone_hashes = [make_hash(number) for number in self.numbers]
+        expected = [
+            Reliability(
+                status=service.get_status(phone_hash),
+                period=service.get_period(phone_hash),
+                rules={"status": service.get_status(phone_hash)},
+            )
+            for phone_hash in phone_hashes
+        ]
+
+        assert service.get_rule_reliabilities(phone_hashes) == expected
+        assert [reliability.status for reliability in expected] == [
+            True,
+            False,
+            False,
+            False,
+            True,
+        ]
+
+    def test_added_rule_is_reported(
+            self,
+            app,
+            submissions: None,
+    ) -> None:
+        service: HunterService = app.state.hunter_service
+        numpy = pytest.importorskip("numpy")
+
+        def shared(submissions):
+            first, _ = submissions.person_bounds
+            phones = submissions.phones[first]
+            return numpy.bincount(phones, minlength=submissions.size()) > 1
+
+        service.add_rule("shared", shared)
+
+        reliability = asyncio.run(service.verify("76000000000"))
+        assert reliability.to_dict() == {
+            "status": False,
+            "period": {
+                "registered_at": "2020.01.01",
+                "updated_at": "2020.12.01",
+            },
+            "rules": {
+                "status": False,
+                "shared": True,
+            },
+        }
+
+    def test_that_numpy_is_not_imported_by_app(self) -> None:
+        code = "import sys, vertical; print('numpy' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        assert result.stdout.strip() == b"False"
+
+    def test_rules_need_rules_mode(
+            self,
+            hunter_config: HunterServiceConfig,
+    ) -> None:
+        config = hunter_config.copy()
+        config["reliability_mode"] = "sql"
+        service = HunterService.from_config(config)
+
+        with pytest.raises(HunterException):
+            service.add_rule("status", lambda submissions: None)
+
+
+class TestCoalescer:
+
+    @pytest.fixture
+    def calls(self) -> List:
+        return []
+
+    @pytest.fixture
+    def query(self, calls: List):
+        async def query(phone_hashes: Sequence[str]) -> List[Reliability]:
+            calls.append(list(phone_hashes))
+            return [
+                Reliability(status=phone_hash == "A", period=None)
+                for phone_hash in phone_hashes
+            ]
+        return query
+
+    def test_calls_are_coalesced(self, query, calls: List) -> None:
+        coalescer = HunterCoalescer(query, window=0.01, size=100)
+
+        async def main() -> List[Reliability]:
+            return await asyncio.gather(*(
+                coalescer.submit(phone_hash)
+                for phone_hash in ("A", "B", "A")
+            ))
+
+        reliabilities = asyncio.run(main())
+
+        assert calls == [["A", "B"]]
+        assert [r.status for r in reliabilities] == [True, False, True]
+
+    def test_full_batch_is_not_delayed(self, query, calls: List) -> None:
+        coalescer = HunterCoalescer(query, window=60, size=2)
+
+        async def main() -> List[Reliability]:
+            return list(await asyncio.wait_for(
+                asyncio.gather(coalescer.submit("A"), coalescer.submit("B")),
+                timeout=5,
+            ))
+
+        reliabilities = asyncio.run(main())
+
+        assert calls == [["A", "B"]]
+        assert len(reliabilities) == 2
+
+    def test_errors_are_fanned_out(self) -> None:
+        async def query(phone_hashes: Sequence[str]) -> List[Reliability]:
+            raise sa.exc.OperationalError("SELECT", {}, Exception("gone"))
+
+        coalescer = HunterCoalescer(query, window=0.01, size=100)
+
+        async def main() -> List[Any]:
+            return list(await asyncio.gather(
+                coalescer.submit("A"),
+                coalescer.submit("B"),
+                return_exceptions=True,
+            ))
+
+        errors = asyncio.run(main())
+        assert [type(e) for e in errors] == [sa.exc.OperationalError] * 2
+
+    def test_verify_uses_batch_query(
+            self,
+            hunter_config: HunterServiceConfig,
+            create_submission,
+    ) -> None:
+        config = hunter_config.copy()
+        config["coalesce_window"] = 0.01
+        service = HunterService.from_config(config)
+
+        dates = (date(2000, 1, 1), date(2020, 1, 1))
+        for submission_number, created_at in enumerate(dates):
+            create_submission(
+                submission_number=submission_number,
+                submission_created_at=created_at,
+                person_name="Jake",
+                person_birthday="1980-01-01",
+                person_phone_number="79000000000",
+            )
+
+        async def main() -> List[Reliability]:
+            try:
+                return list(await asyncio.gather(
+                    service.verify("79000000000"),
+                    service.verify("78000000000"),
+                ))
+            finally:
+                await service.cleanup()
+
+        with patch.object(HunterService, "get_status") as get_status:
+            reliabilities = asyncio.run(main())
+            get_status.assert_not_called()
+
+        assert reliabilities == [
+            Reliability(
+                status=True,
+                period=Period(date(2000, 1, 1), date(2020, 1, 1)),
+            ),
+            Reliability(status=False, period=None),
+        ]
+
+
+class TestHunterExecutor:
+
+    def test_executor_is_sized_to_pool(
+            self,
+            hunter_config: HunterServiceConfig,
+    ) -> None:
+        service = HunterService.from_config(hunter_config)
+
+        stats = service.executor_stats()
+        assert stats["workers"] == 5 + 10
+        assert stats["queue_size"] == 50
+
+    def test_full_executor_fails_fast(
+            self,
+            hunter_config: HunterServiceConfig,
+    ) -> None:
+        config = hunter_config.copy()
+        config["executor_workers"] = 1
+        config["executor_queue_size"] = 0
+        service = HunterService.from_config(config)
+        release = threading.Event()
+
+        async def main() -> None:
+            try:
+                with pytest.raises(HunterException):
+                    await service.verify("79000000000")
+            finally:
+                release.set()
+                await service.cleanup()
+
+        # The status query holds the only thread, the period query is
+        # rejected instead of waiting for it.
+        with patch.object(HunterService, "get_status") as get_status, \
+                patch.object(HunterService, "get_period", return_value=None):
+            get_status.side_effect = lambda *args: release.wait()
+            asyncio.run(main())
+
+        stats = service.executor_stats()
+        assert (stats["active"], stats["queued"]) == (0, 0)
+        assert stats["rejected"] == 1
@@ -0,0 +1,208 @@
+import asyncio
+import uuid
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+from unittest.mock import Mock
+
+import orjson
+import pytest
+from starlette.responses import Response
+
+from vertical import hdrs
+from vertical.app import auth
+from vertical.app.idempotency import (
+    IdempotencyGuard,
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    InvalidIdempotencyKey,
+)
+from vertical.app.responses import create_response
+
+Row = Tuple[str, Optional[int], Optional[Dict]]
+
+
+# Keeps the keys the way the auth database does, without the expiry.
+class FakeAuthService:
+
+    def __init__(self) -> None:
+        self.keys: Dict[Tuple[uuid.UUID, str], Row] = {}
+
+    async def claim_idempotency_key(
+        self,
+        contract_id: uuid.UUID,
+        key: str,
+        request_digest: str,
+        window: float,
+        lock_timeout: float,
+    ) -> auth.IdempotencyKey:
+        row = self.keys.get((contract_id, key))
+        if row is None:
+            self.keys[contract_id, key] = (request_digest, None, None)
+            return auth.IdempotencyKey(True, request_digest)
+        return auth.IdempotencyKey(False, *row)
+
+    async def complete_idempotency_key(
+        self,
+        contract_id: uuid.UUID,
+        key: str,
+        code: int,
+        body: Dict,
+    ) -> None:
+        digest, _, _ = self.keys[contract_id, key]
+        self.keys[contract_id, key] = (digest, code, body)
+
+    async def release_idempotency_key(
+        self,
+        contract_id: uuid.UUID,
+        key: str,
+    ) -> None:
+        del self.keys[contract_id, key]
+
+    async def purge_idempotency_keys(self, window: float) -> None:
+        pass
+
+
+@pytest.fixture
+def auth_service() -> FakeAuthService:
+    return FakeAuthService()
+
+
+@pytest.fixture
+def guard(auth_service: FakeAuthService) -> IdempotencyGuard:
+    return IdempotencyGuard(
+        auth_service,
+        window=60,
+        lock_timeout=0.05,
+        poll_interval=0.01,
+        logger=Mock(),
+    )
+
+
+class Endpoint:
+
+    def __init__(self, http_status: int = HTTPStatus.OK) -> None:
+        self.http_status = http_status
+        self.calls = 0
+
+    async def __call__(self) -> Response:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return create_response({"calls": self.calls}, self.http_status)
+
+
+class TestIdempotencyGuard:
+    contract_id = uuid.uuid4()
+
+    def test_that_duplicates_are_replayed(
+        self,
+        guard: IdempotencyGuard,
+        auth_service: FakeAuthService,
+    ) -> None:
+        endpoint = Endpoint()
+
+        async def main() -> Tuple[Response, ...]:
+            return tuple(await asyncio.gather(*(
+                guard.run(self.contract_id, "key", "digest", endpoint)
+                for _ in range(3)
+            )))
+
+        first, *duplicates = asyncio.run(main())
+        assert endpoint.calls == 1
+
+        assert hdrs.IDEMPOTENT_REPLAYED not in first.headers
+        for duplicate in duplicates:
+            assert duplicate.status_code == first.status_code
+            assert duplicate.body == first.body
+            assert duplicate.headers[hdrs.IDEMPOTENT_REPLAYED] == "true"
+
+        assert auth_service.keys[self.contract_id, "key"] == (
+            "digest",
+            HTTPStatus.OK,
+            orjson.loads(first.body),
+        )
+
+    def test_that_stored_response_is_replayed(
+        self,
+        guard: IdempotencyGuard,
+        auth_service: FakeAuthService,
+    ) -> None:
+        auth_service.keys[self.contract_id, "key"] = (
+            "digest",
+            HTTPStatus.OK,
+            {"calls": 1},
+        )
+        endpoint = Endpoint()
+
+        r = asyncio.run(guard.run(self.contract_id, "key", "digest", endpoint))
+        assert endpoint.calls == 0
+
+        assert orjson.loads(r.body) == {"calls": 1}
+        assert r.headers[hdrs.IDEMPOTENT_REPLAYED] == "true"
+
+    def test_that_key_reused_with_another_body_is_rejected(
+        self,
+        guard: IdempotencyGuard,
+    ) -> None:
+        endpoint = Endpoint()
+
+        async def main() -> None:
+            await guard.run(self.contract_id, "key", "digest", endpoint)
+            await guard.run(self.contract_id, "key", "another", endpoint)
+
+        with pytest.raises(IdempotencyKeyReused):
+            asyncio.run(main())
+        assert endpoint.calls == 1
+
+    def test_that_failed_requests_are_retried(
+        self,
+        guard: IdempotencyGuard,
+        auth_service: FakeAuthService,
+    ) -> None:
+        endpoint = Endpoint(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        async def main() -> None:
+            await guard.run(self.contract_id, "key", "digest", endpoint)
+            await guard.run(self.contract_id, "key", "digest", endpoint)
+
+        asyncio.run(main())
+        assert endpoint.calls == 2
+        assert auth_service.keys == {}
+
+    def test_that_raised_requests_are_released(
+        self,
+        guard: IdempotencyGuard,
+        auth_service: FakeAuthService,
+    ) -> None:
+
+        async def endpoint() -> Response:
+            raise ConnectionError("connection refused")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(guard.run(self.contract_id, "key", "digest", endpoint))
+        assert auth_service.keys == {}
+
+    def test_that_key_claimed_elsewhere_is_in_progress(
+        self,
+        guard: IdempotencyGuard,
+        auth_service: FakeAuthService,
+    ) -> None:
+        auth_service.keys[self.contract_id, "key"] = ("digest", None, None)
+        endpoint = Endpoint()
+
+        with pytest.raises(IdempotencyKeyInProgress):
+            asyncio.run(
+                guard.run(self.contract_id, "key", "digest", endpoint),
+            )
+        assert endpoint.calls == 0
+
+    @pytest.mark.parametrize("key", ["", "k" * 256])
+    def test_that_invalid_key_is_rejected(
+        self,
+        guard: IdempotencyGuard,
+        key: str,
+    ) -> None:
+        endpoint = Endpoint()
+
+        with pytest.raises(InvalidIdempotencyKey):
+            asyncio.run(guard.run(self.contract_id, key, "digest", endpoint))
+        assert endpoint.calls == 0
@@ -1,12 +1,24 @@
+import asyncio
+import hashlib
 from http import HTTPStatus
+from typing import Callable, Dict, NoReturn
+from unittest.mock import Mock
 
+import pytest
 from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
 from starlette.testclient import TestClient
 
 from vertical import hdrs
-from vertical.app import auth, utils
+from vertical.app import auth, tables, utils
+from vertical.app.audit import decode_body
+from vertical.app.context import SPANS
+from vertical.app.middlewares import TracingMiddleware
 
 APPLICATION_JSON = "application/json"
+APPLICATION_MSGPACK = "application/msgpack"
 
 
 class TestContentTypeMiddleware:
@@ -29,8 +41,8 @@ class TestContentTypeMiddleware:
         request_id = response.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
 
     def test_request_without_invalid_content_type(
             self,
@@ -53,8 +65,8 @@ class TestContentTypeMiddleware:
         request_id = response.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
 
 
 class TestJsonDecoderMiddleware:
@@ -82,8 +94,8 @@ class TestJsonDecoderMiddleware:
         request_id = response.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
 
     def test_request_with_invalid_json_body(
             self,
@@ -107,5 +119,283 @@ class TestJsonDecoderMiddleware:
         request_id = response.headers[hdrs.X_REQUEST_ID]
         assert utils.is_valid_uuid(request_id)
 
-        assert sqlalchemy_auth_session.query(auth.Request).first() is None
-        assert sqlalchemy_auth_session.query(auth.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
+
+
+class TestMsgpackContent:
+    url = "/ping"
+
+    def test_request_with_msgpack_body(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+    ) -> None:
+        msgpack = pytest.importorskip("msgpack")
+
+        headers = {
+            hdrs.CONTENT_TYPE: "application/x-msgpack",
+            hdrs.ACCEPT: "application/x-msgpack",
+        }
+
+        data = msgpack.packb({"key": "value"})
+        response = client.post(self.url, headers=headers, data=data)
+
+        http_status = HTTPStatus.OK
+        assert response.status_code == http_status
+        assert response.headers[hdrs.CONTENT_TYPE] == "application/x-msgpack"
+
+        assert msgpack.unpackb(response.content) == {
+            "message": "pong",
+            "data": {},
+        }
+
+    def test_response_is_json_by_default(self, client: TestClient) -> None:
+        msgpack = pytest.importorskip("msgpack")
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_MSGPACK,
+        }
+
+        data = msgpack.packb({"key": "value"})
+        response = client.post(self.url, headers=headers, data=data)
+
+        http_status = HTTPStatus.OK
+        assert response.status_code == http_status
+
+        assert response.json() == {
+            "message": "pong",
+            "data": {},
+        }
+
+    def test_request_with_invalid_msgpack_body(
+            self,
+            client: TestClient,
+    ) -> None:
+        msgpack = pytest.importorskip("msgpack")
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_MSGPACK,
+            hdrs.ACCEPT: APPLICATION_MSGPACK,
+        }
+
+        # Binary values have no JSON form to be audited in.
+        for data in (b"\xc1", msgpack.packb({"key": b"value"})):
+            response = client.post(self.url, headers=headers, data=data)
+
+            http_status = HTTPStatus.BAD_REQUEST
+            assert response.status_code == http_status
+
+            assert msgpack.unpackb(response.content) == {
+                "message": "Could not parse request body",
+            }
+
+
+class TestTracingMiddleware:
+    url = "/health"
+
+    def test_server_timing_for_admin_contract(
+            self,
+            client: TestClient,
+            admin_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {admin_contract.token}",
+        }
+
+        response = client.get(self.url, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert response.status_code == http_status
+
+        server_timing = response.headers[hdrs.SERVER_TIMING]
+
+        names = [metric.split(";")[0] for metric in server_timing.split(", ")]
+        assert "auth.get_contract" in names
+        assert "auth.identify" in names
+        assert "auth.ping" in names
+        assert "content_type" in names
+        assert "json_parser" in names
+
+    def test_server_timing_for_client_contract(
+            self,
+            client: TestClient,
+            allowed_contract: tables.Contract,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+
+        response = client.get(self.url, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert response.status_code == http_status
+
+        assert hdrs.SERVER_TIMING not in response.headers
+
+    def test_spans_are_reset_when_handler_fails(self) -> None:
+        middleware = TracingMiddleware(Starlette())
+
+        async def handler(_: Request) -> Response:
+            raise ConnectionError("connection refused")
+
+        async def main() -> None:
+            with pytest.raises(ConnectionError):
+                await middleware.dispatch(Mock(), handler)
+            assert SPANS.get() is None
+
+        asyncio.run(main())
+
+
+async def error_endpoint(_: Request) -> NoReturn:
+    raise NotImplementedError()
+
+
+class TestConsolidatedAudit:
+    path = "/reliability/phone"
+
+    @pytest.fixture
+    def auth_config(self, sqlalchemy_auth_session: Session) -> Dict:
+        return {
+            "pool": {
+                "dsn": str(sqlalchemy_auth_session.bind.url),
+            },
+            "logger": {
+                "name": "audit",
+            },
+            "audit_mode": auth.AuditMode.CONSOLIDATED.value,
+        }
+
+    def test_authorized_request(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+        json = {
+            "number": phone_number_generator(),
+        }
+
+        r = client.post(self.path, json=json, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        request_id = r.headers[hdrs.X_REQUEST_ID]
+
+        assert sqlalchemy_auth_session.query(tables.Request).first() is None
+        assert sqlalchemy_auth_session.query(tables.Response).first() is None
+        assert sqlalchemy_auth_session.query(tables.Identification) \
+            .first() is None
+
+        audit = sqlalchemy_auth_session.query(tables.Audit).one()
+
+        assert audit.id == request_id
+        assert audit.path == r.request.path_url
+        assert audit.method == r.request.method
+        assert audit.remote is None
+        assert audit.remote_port == 50000
+        assert decode_body(audit.request_body) == json
+        assert audit.contract_id == allowed_contract.id
+        assert audit.response_code == r.status_code
+        assert decode_body(audit.response_body) == r.json()
+
+        query = """
+            SELECT
+                audit_requests.request_id::TEXT
+                , audit_responses.code
+                , audit_identifications.contract_id::TEXT
+            FROM
+                audit_requests
+                JOIN audit_responses USING (request_id)
+                JOIN audit_identifications USING (request_id)
+            ;
+        """
+        rows = sqlalchemy_auth_session.execute(query).fetchall()
+        assert rows == [(request_id, r.status_code, allowed_contract.id)]
+
+    def test_unauthorized_request(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+        }
+
+        r = client.post(self.path, headers=headers)
+
+        http_status = HTTPStatus.UNAUTHORIZED
+        assert r.status_code == http_status
+
+        audit = sqlalchemy_auth_session.query(tables.Audit).one()
+
+        assert audit.id == r.headers[hdrs.X_REQUEST_ID]
+        assert audit.contract_id is None
+        assert audit.response_code == r.status_code
+        assert decode_body(audit.response_body) == r.json()
+
+    def test_unhandled_exception(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+    ) -> None:
+        app: Starlette = client.app  # type: ignore
+
+        path = "/error"
+        app.add_route(path, error_endpoint)
+
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+        }
+
+        r = client.get(path, headers=headers)
+
+        http_status = HTTPStatus.INTERNAL_SERVER_ERROR
+        assert r.status_code == http_status
+
+        audit = sqlalchemy_auth_session.query(tables.Audit).one()
+
+        assert audit.id == r.headers[hdrs.X_REQUEST_ID]
+        assert audit.response_code is None
+        assert audit.response_body is None
+
+    def test_streamed_response(
+            self,
+            client: TestClient,
+            sqlalchemy_auth_session: Session,
+            allowed_contract: tables.Contract,
+            phone_number_generator: Callable,
+    ) -> None:
+        headers = {
+            hdrs.CONTENT_TYPE: APPLICATION_JSON,
+            hdrs.ACCEPT: "application/x-ndjson",
+            hdrs.AUTHORIZATION: f"{hdrs.BEARER} {allowed_contract.token}",
+        }
+        json = {
+            "numbers": [phone_number_generator() for _ in range(3)],
+        }
+
+        r = client.post("/reliability/phones", json=json, headers=headers)
+
+        http_status = HTTPStatus.OK
+        assert r.status_code == http_status
+
+        audit = sqlalchemy_auth_session.query(tables.Audit).one()
+
+        assert audit.id == r.headers[hdrs.X_REQUEST_ID]
+        assert decode_body(audit.request_body) == json
+        assert audit.contract_id == allowed_contract.id
+        assert audit.response_code == r.status_code
+        assert decode_body(audit.response_body) == {
+            "rows": 3,
+            "length": len(r.content),
+            "sha256": hashlib.sha256(r.content).hexdigest(),
+        }
@@ -1,9 +1,12 @@
-from typing import Dict
+import random
+import string
+from typing import Any, Dict
 
+import orjson
 import pytest
 from marshmallow import ValidationError
 
-from vertical.app.models import Phone
+from vertical.app.models import PHONE_SCHEMA, Phone
 
 
 class TestPhoneModel:
@@ -79,3 +82,62 @@ class TestPhoneModel:
                 "Phone number does't match expected pattern: 7\\d{10}.",
             ],
         }
+
+
+def random_number(rnd: random.Random) -> str:
+    length = rnd.choice([0, 1, 10, 11, 11, 11, 12])
+    alphabet = rnd.choice([string.digits, string.digits + "+-() x"])
+    number = "".join(rnd.choice(alphabet) for _ in range(length))
+    if number and rnd.random() < 0.5:
+        number = "7" + number[1:]
+    return number
+
+
+def random_phone_payload(rnd: random.Random) -> Any:
+    payload: Dict[str, Any] = {
+        "number": rnd.choice([
+            random_number(rnd),
+            random_number(rnd),
+            random_number(rnd),
+            None,
+            rnd.randint(0, 10 ** 11),
+            [],
+        ]),
+    }
+    if rnd.random() < 0.1:
+        payload.pop("number")
+    if rnd.random() < 0.1:
+        payload["extra"] = random_number(rnd)
+    if rnd.random() < 0.05:
+        return rnd.choice([None, [], "number"])
+    return payload
+
+
+class TestPhoneFastPath:
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_decoder_matches_schema(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            payload = random_phone_payload(rnd)
+
+            try:
+                expected = PHONE_SCHEMA.load(payload)
+            except ValidationError as e:
+                with pytest.raises(ValidationError) as exc_info:
+                    Phone.from_dict(payload)
+                assert exc_info.value.messages == e.messages
+                assert exc_info.value.valid_data == e.valid_data
+            else:
+                assert Phone.from_dict(payload) == expected
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_encoder_matches_schema(self, seed: int) -> None:
+        rnd = random.Random(seed)
+
+        for _ in range(200):
+            phone = Phone(random_number(rnd))
+
+            expected = orjson.dumps(PHONE_SCHEMA.dump(phone))
+            assert orjson.dumps(phone.to_dict()) == expected
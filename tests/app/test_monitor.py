@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from vertical.app.context import REQUEST_ID
+from vertical.app.monitor import LoopMonitor, percentile
+
+
+def blocking_call(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.fixture
+def logger() -> Mock:
+    return Mock()
+
+
+class TestLoopMonitor:
+
+    def test_blocked_loop_is_reported(self, logger: Mock) -> None:
+        monitor = LoopMonitor(interval=0.01, threshold=0.05, logger=logger)
+
+        request_ids: List[str] = []
+        logger.warning.side_effect = \
+            lambda *args: request_ids.append(REQUEST_ID.get())
+
+        async def handle_request() -> None:
+            REQUEST_ID.set("blocked-request")
+            await asyncio.create_task(block())
+
+        async def block() -> None:
+            await asyncio.sleep(0.02)
+            blocking_call(0.3)
+
+        async def main() -> None:
+            await monitor.setup()
+            try:
+                await handle_request()
+                await asyncio.sleep(0.05)
+            finally:
+                await monitor.cleanup()
+
+        asyncio.run(main())
+
+        logger.warning.assert_called_once()
+        message, lag, stack = logger.warning.call_args[0]
+        assert message.startswith("Event loop is blocked")
+        assert lag > 0.05
+        assert "blocking_call" in stack
+        assert request_ids == ["blocked-request"]
+
+        assert monitor.percentiles()["max"] >= 0.2
+
+    def test_monitor_is_disabled_by_default(self, logger: Mock) -> None:
+        monitor = LoopMonitor.from_config({})
+
+        async def main() -> None:
+            await monitor.setup()
+            blocking_call(0.05)
+            await monitor.cleanup()
+
+        asyncio.run(main())
+
+        assert monitor.percentiles() == {
+            "samples": 0,
+            "p50": 0.0,
+            "p90": 0.0,
+            "p99": 0.0,
+            "max": 0.0,
+        }
+
+    def test_percentiles(self) -> None:
+        samples = [i / 1000 for i in range(1, 101)]
+
+        assert percentile(samples, 50) == 0.05
+        assert percentile(samples, 99) == 0.099
+        assert percentile(samples, 100) == 0.1
+        assert percentile([], 50) == 0.0
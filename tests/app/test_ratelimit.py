@@ -0,0 +1,91 @@
+import uuid
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from vertical.app import ratelimit
+
+
+@pytest.fixture
+def limiter(tmp_path) -> Iterator[ratelimit.RateLimiter]:
+    limiter = ratelimit.RateLimiter(str(tmp_path / "ratelimit"), slots=4)
+    yield limiter
+    limiter.close()
+
+
+def make_key() -> bytes:
+    return uuid.uuid4().bytes
+
+
+class TestRateLimiter:
+
+    def test_burst_is_allowed(self, limiter: ratelimit.RateLimiter) -> None:
+        key = make_key()
+
+        assert limiter.acquire(key, 1, 3) == 0
+        assert limiter.acquire(key, 1, 3) == 0
+        assert limiter.acquire(key, 1, 3) == 0
+        assert limiter.acquire(key, 1, 3) == pytest.approx(1, abs=0.01)
+
+    def test_tokens_are_refilled(self, limiter: ratelimit.RateLimiter) -> None:
+        key = make_key()
+
+        with patch.object(ratelimit, "monotonic", return_value=100.0):
+            assert limiter.acquire(key, 2, 1) == 0
+            assert limiter.acquire(key, 2, 1) == pytest.approx(0.5)
+
+        with patch.object(ratelimit, "monotonic", return_value=100.5):
+            assert limiter.acquire(key, 2, 1) == 0
+
+    def test_buckets_are_separated(
+            self,
+            limiter: ratelimit.RateLimiter,
+    ) -> None:
+        first, second = make_key(), make_key()
+
+        assert limiter.acquire(first, 1, 1) == 0
+        assert limiter.acquire(first, 1, 1) > 0
+        assert limiter.acquire(second, 1, 1) == 0
+
+    def test_buckets_are_shared(
+            self,
+            limiter: ratelimit.RateLimiter,
+            tmp_path,
+    ) -> None:
+        key = make_key()
+        other = ratelimit.RateLimiter(str(tmp_path / "ratelimit"), slots=4)
+
+        try:
+            assert limiter.acquire(key, 1, 1) == 0
+            assert other.acquire(key, 1, 1) > 0
+        finally:
+            other.close()
+
+    def test_full_table_is_not_limited(
+            self,
+            limiter: ratelimit.RateLimiter,
+    ) -> None:
+        for _ in range(4):
+            limiter.acquire(make_key(), 1, 1)
+
+        key = make_key()
+
+        assert limiter.acquire(key, 1, 1) == 0
+        assert limiter.acquire(key, 1, 1) == 0
+
+    def test_unlimited_contract(self, limiter: ratelimit.RateLimiter) -> None:
+        contract_id = uuid.uuid4()
+
+        for _ in range(10):
+            limiter.check(contract_id, None, None)
+
+    def test_limited_contract(self, limiter: ratelimit.RateLimiter) -> None:
+        contract_id = uuid.uuid4()
+
+        limiter.check(contract_id, 1, None)
+
+        with pytest.raises(ratelimit.RateLimitExceeded) as e:
+            limiter.check(contract_id, 1, None)
+
+        assert e.value.retry_after == pytest.approx(1, abs=0.01)
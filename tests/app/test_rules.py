@@ -0,0 +1,118 @@
+from datetime import date, datetime
+from typing import Any, List
+
+import pytest
+
+from vertical.app.rules import RuleEngine, Submissions, group_bounds, span_rule
+
+numpy = pytest.importorskip("numpy")
+
+ROWS = (
+    ("A", "jake", "1980", date(2020, 1, 1)),
+    ("B", "jake", "1980", date(2020, 3, 1)),
+    ("A", "jake", "1980", date(2020, 9, 1)),
+    ("C", "jake", "1980", date(2020, 1, 1)),
+    ("C", "mike", "1990", date(2020, 12, 1)),
+    ("A", "jake", "1980", date(2020, 5, 1)),
+)
+
+
+@pytest.fixture
+def submissions() -> Submissions:
+    return Submissions.from_rows(["A", "B", "C", "D"], ROWS)
+
+
+# More than one person submitted the phone.
+def shared(submissions: Submissions) -> Any:
+    first, _ = submissions.person_bounds
+    phones = submissions.phones[first]
+    return numpy.bincount(phones, minlength=submissions.size()) > 1
+
+
+class TestGroupBounds:
+
+    def test_bounds(self) -> None:
+        keys = numpy.array([1, 0, 1, 0, 2, 1])
+        values = numpy.array([5, 3, 1, 4, 0, 9])
+
+        first, last = group_bounds(keys, values)
+
+        assert first.tolist() == [1, 2, 4]
+        assert last.tolist() == [3, 5, 4]
+
+    def test_empty_keys(self) -> None:
+        keys = numpy.array([], dtype=numpy.intp)
+
+        first, last = group_bounds(keys, keys)
+
+        assert first.tolist() == []
+        assert last.tolist() == []
+
+
+class TestSubmissions:
+
+    def test_periods(self, submissions: Submissions) -> None:
+        assert submissions.periods() == [
+            (date(2020, 1, 1), date(2020, 9, 1)),
+            (date(2020, 3, 1), date(2020, 3, 1)),
+            (date(2020, 1, 1), date(2020, 12, 1)),
+            None,
+        ]
+
+    def test_periods_keep_row_values(self) -> None:
+        rows = [
+            ("A", "jake", "1980", datetime(2020, 1, 1, 12)),
+            ("A", "jake", "1980", datetime(2020, 1, 1, 9)),
+        ]
+        submissions = Submissions.from_rows(["A"], rows)
+
+        assert submissions.periods() == [
+            (datetime(2020, 1, 1, 9), datetime(2020, 1, 1, 12)),
+        ]
+
+    def test_no_rows(self) -> None:
+        submissions = Submissions.from_rows(["A", "B"], [])
+
+        assert submissions.periods() == [None, None]
+        assert span_rule(180)(submissions).tolist() == [False, False]
+
+
+class TestRules:
+
+    @pytest.mark.parametrize("days, expected", [
+        (180, [True, False, False, False]),
+        (244, [False, False, False, False]),
+        (243, [True, False, False, False]),
+    ])
+    def test_span_rule(
+        self,
+        submissions: Submissions,
+        days: int,
+        expected: List[bool],
+    ) -> None:
+        assert span_rule(days)(submissions).tolist() == expected
+
+    def test_span_rule_counts_hours(self) -> None:
+        rows = [
+            ("A", "jake", "1980", datetime(2020, 1, 1, 9)),
+            ("A", "jake", "1980", datetime(2020, 1, 2, 10)),
+        ]
+        submissions = Submissions.from_rows(["A"], rows)
+
+        assert span_rule(1)(submissions).tolist() == [True]
+
+    def test_engine_evaluates_every_rule(
+        self,
+        submissions: Submissions,
+    ) -> None:
+        engine = RuleEngine()
+        engine.add_rule("status", span_rule(180))
+        engine.add_rule("shared", shared)
+
+        assert engine.rules() == ["status", "shared"]
+        assert engine.evaluate(submissions) == [
+            {"status": True, "shared": False},
+            {"status": False, "shared": False},
+            {"status": False, "shared": True},
+            {"status": False, "shared": False},
+        ]
@@ -0,0 +1,34 @@
+from vertical.app.context import SPANS
+from vertical.app.tracing import NOOP_SPAN, Spans, span
+
+
+def test_span_without_recorder() -> None:
+    assert SPANS.get() is None
+    assert span("query") is NOOP_SPAN
+
+
+def test_span_with_recorder() -> None:
+    spans = Spans()
+    token = SPANS.set(spans)
+
+    try:
+        with span("outer"):
+            with span("inner"):
+                pass
+    finally:
+        SPANS.reset(token)
+
+    names = [name for name, _ in spans]
+    assert names == ["inner", "outer"]
+
+    assert all(duration >= 0 for _, duration in spans)
+
+
+def test_spans_render() -> None:
+    spans = Spans()
+    spans.add("auth.get_contract", 0.0012345)
+    spans.add("hunter.status", 0.5)
+
+    assert spans.render() == (
+        "auth.get_contract;dur=1.234, hunter.status;dur=500.000"
+    )
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+from uuid import UUID
+
+import pytest
+from marshmallow import ValidationError
+
+from vertical.app import usage
+
+
+class TestUsageBuffer:
+    contract_id = UUID("6b0d9e1c-4b4f-4a8e-9d1e-8f2a3c4b5d6e")
+
+    def test_counters_are_grouped_by_status_class(self) -> None:
+        buffer = usage.UsageBuffer()
+
+        buffer.add(self.contract_id, 200, 0.1)
+        buffer.add(self.contract_id, 201, 0.2)
+        buffer.add(self.contract_id, 404, 0.3)
+
+        today = date.today()
+
+        assert sorted(buffer.rows()) == [
+            (self.contract_id, today, 2, 2, pytest.approx(0.3)),
+            (self.contract_id, today, 4, 1, pytest.approx(0.3)),
+        ]
+
+    def test_swap_and_merge(self) -> None:
+        buffer = usage.UsageBuffer()
+        buffer.add(self.contract_id, 200, 0.1)
+
+        swapped = buffer.swap()
+        assert len(buffer) == 0
+        assert len(swapped) == 1
+
+        buffer.add(self.contract_id, 200, 0.1)
+        buffer.merge(swapped)
+
+        [(_, _, _, calls, latency)] = buffer.rows()
+        assert calls == 2
+        assert latency == pytest.approx(0.2)
+
+
+class TestUsageQuerySchema:
+
+    def test_default_period(self) -> None:
+        query = usage.USAGE_QUERY_SCHEMA.load({})
+
+        assert query.until == date.today()
+        assert query.since == date.today() - timedelta(29)
+        assert query.contract_id is None
+
+    def test_invalid_contract_id(self) -> None:
+        with pytest.raises(ValidationError):
+            usage.USAGE_QUERY_SCHEMA.load({"contract_id": "contract"})
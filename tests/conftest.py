@@ -17,7 +17,15 @@ from sqlalchemy import exc, orm
 from starlette.applications import Starlette
 from starlette.testclient import TestClient
 
-from vertical.app import AppConfig, auth, create_app, hunter, utils
+from vertical.app import (
+    AppConfig,
+    auth,
+    create_app,
+    hunter,
+    ratelimit,
+    tables,
+    utils,
+)
 
 HERE = os.path.dirname(__file__)
 ROOT = os.path.dirname(HERE)
@@ -187,14 +195,24 @@ def auth_config(sqlalchemy_auth_session: orm.Session) -> Dict:
     }
 
 
+@pytest.fixture
+def rate_limiter_config(tmp_path) -> Dict:
+    return {
+        "path": str(tmp_path / "vertical.ratelimit"),
+        "slots": 64,
+    }
+
+
 @pytest.fixture
 def config(
     auth_config: auth.AuthServiceConfig,
     hunter_config: hunter.HunterServiceConfig,
+    rate_limiter_config: ratelimit.RateLimiterConfig,
 ) -> Iterator[AppConfig]:
     yield {
         "auth_service": auth_config,
         "hunter_service": hunter_config,
+        "rate_limiter": rate_limiter_config,
     }
 
 
@@ -263,7 +281,7 @@ class AuthFactory(factory.alchemy.SQLAlchemyModelFactory):
 
 class ClientFactory(AuthFactory):
     class Meta:
-        model = auth.Client
+        model = tables.Client
 
     id = factory.LazyFunction(generate_uuid)
     name = factory.Faker("name")
@@ -272,7 +290,7 @@ class ClientFactory(AuthFactory):
 
 class ContractFactory(AuthFactory):
     class Meta:
-        model = auth.Contract
+        model = tables.Contract
 
     id = factory.LazyFunction(generate_uuid)
     client_id = None
@@ -280,12 +298,14 @@ class ContractFactory(AuthFactory):
     created_at = factory.LazyFunction(datetime.now)
     expired_at = None
     revoked_at = None
+    rate_limit = None
+    rate_burst = None
 
     client = factory.SubFactory(ClientFactory)
 
 
 @pytest.fixture
-def expired_contract() -> auth.Contract:
+def expired_contract() -> tables.Contract:
     expired_at = datetime.now() - timedelta(365)
     contract = ContractFactory.create(expired_at=expired_at)
     assert contract.is_expired()
@@ -293,7 +313,7 @@ def expired_contract() -> auth.Contract:
 
 
 @pytest.fixture
-def revoked_contract() -> auth.Contract:
+def revoked_contract() -> tables.Contract:
     revoked_at = datetime.now() - timedelta(365)
     contract = ContractFactory.create(revoked_at=revoked_at)
     assert contract.is_revoked()
@@ -301,13 +321,28 @@ def revoked_contract() -> auth.Contract:
 
 
 @pytest.fixture
-def allowed_contract() -> auth.Contract:
+def allowed_contract() -> tables.Contract:
     contract = ContractFactory.create()
     assert not contract.is_expired()
     assert not contract.is_revoked()
     return contract
 
 
+@pytest.fixture
+def limited_contract() -> tables.Contract:
+    return ContractFactory.create(rate_limit=0.001, rate_burst=2)
+
+
+@pytest.fixture
+def admin_contract(sqlalchemy_auth_session: orm.Session) -> tables.Contract:
+    admin = sqlalchemy_auth_session.query(tables.Client) \
+        .filter(tables.Client.name == auth.ADMIN_CLIENT_NAME) \
+        .one()
+    contract = ContractFactory.create(client=admin)
+    assert contract.client.is_admin()
+    return contract
+
+
 def generate_phone_number():
     choice = secrets.SystemRandom().choice
     return "7" + "".join(choice(string.digits) for _ in range(10))
@@ -0,0 +1,152 @@
+import uuid
+from datetime import date, datetime
+from typing import Iterator, List
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from vertical import partitions
+
+# Plain tables named like partitions, i.e. the detached ones.
+DETACHED_QUERY = """
+    SELECT
+        relname
+    FROM
+        pg_class
+    WHERE
+        relkind = 'r'
+        AND NOT relispartition
+        AND relnamespace = 'public'::REGNAMESPACE
+    ;
+"""
+
+
+@pytest.fixture
+def bind(sqlalchemy_auth_session: Session) -> Iterator[sa.engine.Engine]:
+    bind = sqlalchemy_auth_session.bind
+    try:
+        yield bind
+    finally:
+        # The migrations only know of the attached partitions.
+        with bind.begin() as conn:
+            for name, in conn.execute(DETACHED_QUERY):
+                if partitions.PARTITION_NAME.fullmatch(name):
+                    conn.execute(f"DROP TABLE {name};")
+
+
+def starts(bind: sa.engine.Engine, table: str) -> List[date]:
+    with bind.connect() as conn:
+        return [
+            start for _, start in partitions.list_partitions(conn, table)
+        ]
+
+
+def exists(bind: sa.engine.Engine, name: str) -> bool:
+    query = sa.text("SELECT to_regclass(:name) IS NOT NULL;")
+    return bind.execute(query, name=name).scalar()
+
+
+def count(bind: sa.engine.Engine, name: str) -> int:
+    return bind.execute(f"SELECT count(*) FROM {name};").scalar()
+
+
+@pytest.mark.parametrize("value, months, expected", [
+    (date(2020, 5, 17), 0, date(2020, 5, 1)),
+    (date(2020, 5, 17), 1, date(2020, 6, 1)),
+    (date(2020, 11, 1), 2, date(2021, 1, 1)),
+    (date(2020, 12, 31), 1, date(2021, 1, 1)),
+    (date(2020, 12, 1), 13, date(2022, 1, 1)),
+    (date(2021, 1, 31), -1, date(2020, 12, 1)),
+    (date(2021, 3, 1), -15, date(2019, 12, 1)),
+])
+def test_add_months(value: date, months: int, expected: date) -> None:
+    assert partitions.add_months(value, months) == expected
+
+
+def test_partition_name() -> None:
+    start = partitions.month_start(date(2021, 1, 31))
+
+    assert partitions.partition_name("requests", start) == \
+        "requests_p2021_01"
+
+
+class TestMaintain:
+
+    def test_future_partitions_are_premade(
+            self,
+            bind: sa.engine.Engine,
+    ) -> None:
+        today = date(2030, 11, 15)
+        expected = [
+            date(2030, 11, 1),
+            date(2030, 12, 1),
+            date(2031, 1, 1),
+            date(2031, 2, 1),
+        ]
+
+        partitions.maintain(bind, premake=3, today=today)
+        # The existing partitions are kept as they are.
+        partitions.maintain(bind, premake=3, today=today)
+
+        for table in partitions.AUDIT_TABLES:
+            assert starts(bind, table)[-4:] == expected
+
+    def test_default_partition_rows_are_moved(
+            self,
+            bind: sa.engine.Engine,
+    ) -> None:
+        insert = sa.text("""
+            INSERT INTO requests
+                (request_id, method, path, created_at)
+            VALUES
+                (:request_id, 'POST', '/ping', :created_at)
+            ;
+        """)
+        for created_at in (datetime(2030, 11, 20), datetime(2030, 12, 5)):
+            bind.execute(
+                insert,
+                request_id=str(uuid.uuid4()),
+                created_at=created_at,
+            )
+        assert count(bind, "requests_default") == 2
+
+        partitions.maintain(
+            bind,
+            tables=["requests"],
+            premake=0,
+            today=date(2030, 11, 1),
+        )
+
+        assert count(bind, "requests_p2030_11") == 1
+        assert count(bind, "requests_default") == 1
+        assert count(bind, "requests") == 2
+
+    @pytest.mark.parametrize("drop", [False, True])
+    def test_partitions_past_retention_are_removed(
+            self,
+            bind: sa.engine.Engine,
+            drop: bool,
+    ) -> None:
+        partitions.maintain(
+            bind,
+            tables=["requests"],
+            premake=1,
+            today=date(2030, 6, 1),
+        )
+
+        partitions.maintain(
+            bind,
+            tables=["requests"],
+            premake=0,
+            retention=2,
+            drop=drop,
+            today=date(2030, 9, 10),
+        )
+
+        # Only the partitions ending by the cutoff, 2030-07-01, are removed.
+        assert starts(bind, "requests") == [
+            date(2030, 7, 1),
+            date(2030, 9, 1),
+        ]
+        assert exists(bind, "requests_p2030_06") is not drop
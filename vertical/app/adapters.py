@@ -1,11 +1,16 @@
+import hashlib
+from typing import Optional
+
+import orjson
 from starlette.requests import Request
 from starlette.responses import Response
 
 from vertical import hdrs
 
+from .media import is_msgpack, unpack
 from .protocols import RequestProtocol, ResponseProtocol
 
-__all__ = ("RequestAdapter", "ResponseAdapter")
+__all__ = ("RequestAdapter", "ResponseAdapter", "StreamedResponseAdapter")
 
 
 class RequestAdapter(RequestProtocol):
@@ -14,7 +19,7 @@ class RequestAdapter(RequestProtocol):
         "identifier",
         "method",
         "path",
-        "body",
+        "content",
         "remote_addr",
         "referer",
         "user_agent",
@@ -27,8 +32,7 @@ class RequestAdapter(RequestProtocol):
         self.method = request.method
         self.path = request.url.path
 
-        body = request.state.body
-        self.body = body.decode("utf-8") if body else None
+        self.content = request.state.body
 
         self.referer = request.headers.get(hdrs.REFERER)
 
@@ -40,17 +44,73 @@ class RequestAdapter(RequestProtocol):
 
         self.authorization = request.headers.get(hdrs.AUTHORIZATION)
 
+    @property
+    def body(self) -> Optional[str]:
+        return self.content.decode("utf-8") if self.content else None
+
 
 class ResponseAdapter(ResponseProtocol):
 
     __slots__ = (
         "request",
-        "body",
+        "content",
+        "length",
         "code",
     )
 
+    content: bytes
+
     def __init__(self, request: RequestAdapter, response: Response):
         self.request = request
 
-        self.body = response.body.decode("utf-8")
+        self.content = response.body
+        self.length = len(response.body)
         self.code = response.status_code
+
+        # Audited in the decoded form, as JSON.
+        content_type = response.headers.get(hdrs.CONTENT_TYPE, "")
+        if is_msgpack(content_type):
+            self.content = orjson.dumps(unpack(response.body))
+
+    @property
+    def body(self) -> str:
+        return self.content.decode("utf-8")
+
+
+# Streamed bodies are not kept, only their digest and number of rows are
+# audited once the stream is over.
+class StreamedResponseAdapter(ResponseProtocol):
+
+    __slots__ = (
+        "request",
+        "length",
+        "rows",
+        "code",
+        "_digest",
+    )
+
+    def __init__(self, request: RequestAdapter, response: Response):
+        self.request = request
+
+        self.length = 0
+        self.rows = 0
+        self.code = response.status_code
+
+        self._digest = hashlib.sha256()
+
+    def update(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+        self.length += len(chunk)
+        self.rows += chunk.count(b"\n")
+
+    @property
+    def content(self) -> bytes:
+        return orjson.dumps({
+            "rows": self.rows,
+            "length": self.length,
+            "sha256": self._digest.hexdigest(),
+        })
+
+    @property
+    def body(self) -> str:
+        return self.content.decode("utf-8")
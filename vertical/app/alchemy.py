@@ -1,7 +1,45 @@
-from typing import Dict, TypedDict
+import importlib
+import threading
+import weakref
+from enum import Enum
+from types import ModuleType
+from typing import Any, Dict, Optional, TypedDict
 
-from marshmallow import EXCLUDE, Schema, fields, post_load
-from sqlalchemy import engine
+from marshmallow import (
+    EXCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validate,
+    validates_schema,
+)
+from sqlalchemy import engine, event
+from sqlalchemy.pool import NullPool
+
+
+class PoolMode(str, Enum):
+    QUEUE = "queue"
+    SESSION = "session"
+
+
+# Connections the engines built here can hold at once, whichever pool
+# holds them.
+POOL_CAPACITIES: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def pool_capacity(bind: engine.Engine) -> Optional[int]:
+    return POOL_CAPACITIES.get(bind)
+
+
+class OracleSessionPoolConfig(TypedDict, total=False):
+    driver: str
+    min: int
+    max: int
+    increment: int
+    stmtcachesize: int
+    arraysize: int
+    prefetchrows: Optional[int]
 
 
 class SQLAlchemyEngineConfig(TypedDict, total=False):
@@ -20,6 +58,113 @@ class SQLAlchemyEngineConfig(TypedDict, total=False):
     pool_reset_on_return: str
     pool_timeout: int
     strategy: str
+    pool_mode: str
+    session_pool: OracleSessionPoolConfig
+
+
+# The native pool is created on the first checkout, so the workers forked
+# from a preloaded master never share its sessions.
+class OracleSessionPool:
+
+    __slots__ = (
+        "_driver",
+        "_params",
+        "_stmtcachesize",
+        "_pool",
+        "_lock",
+    )
+
+    def __init__(self, driver: ModuleType, params: Dict, stmtcachesize: int):
+        self._driver = driver
+        self._params = params
+        self._stmtcachesize = stmtcachesize
+        self._pool: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Any:
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                pool = self._pool
+                if pool is None:
+                    # Published only once it's configured.
+                    pool = self._driver.SessionPool(**self._params)
+                    pool.stmtcachesize = self._stmtcachesize
+                    self._pool = pool
+        return pool.acquire()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close(force=True)
+                self._pool = None
+
+
+def create_session_pool_engine(
+    name_or_url: str,
+    session_pool: OracleSessionPoolConfig,
+    **kwargs: Any,
+) -> engine.Engine:
+    driver = importlib.import_module(session_pool["driver"])
+
+    url = engine.url.make_url(name_or_url)
+    dialect = url.get_dialect()(dbapi=driver)
+    _, params = dialect.create_connect_args(url)
+
+    params.update(
+        min=session_pool["min"],
+        max=session_pool["max"],
+        increment=session_pool["increment"],
+        threaded=True,
+        getmode=driver.SPOOL_ATTRVAL_WAIT,
+    )
+    pool = OracleSessionPool(driver, params, session_pool["stmtcachesize"])
+
+    # Sessions are pooled by the driver, SQLAlchemy only borrows them.
+    bind = engine.create_engine(
+        url,
+        module=driver,
+        creator=pool.acquire,
+        poolclass=NullPool,
+        arraysize=session_pool["arraysize"],
+        **kwargs,
+    )
+
+    POOL_CAPACITIES[bind] = session_pool["max"]
+
+    @event.listens_for(bind, "engine_disposed")
+    def close_session_pool(_: engine.Engine) -> None:
+        pool.close()
+
+    prefetchrows = session_pool["prefetchrows"]
+    if prefetchrows is not None:
+        @event.listens_for(bind, "before_cursor_execute")
+        def set_prefetchrows(_, cursor: Any, *args: Any) -> None:
+            cursor.prefetchrows = prefetchrows
+
+    return bind
+
+
+class OracleSessionPoolSchema(Schema):
+    driver = fields.Str(missing="cx_Oracle")
+    min = fields.Int(missing=1, validate=validate.Range(min=0))
+    max = fields.Int(missing=5, validate=validate.Range(min=1))
+    increment = fields.Int(missing=1, validate=validate.Range(min=1))
+    stmtcachesize = fields.Int(missing=20, validate=validate.Range(min=0))
+    arraysize = fields.Int(missing=2, validate=validate.Range(min=1))
+    prefetchrows = fields.Int(
+        missing=None,
+        allow_none=True,
+        validate=validate.Range(min=0),
+    )
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @validates_schema
+    def validate_size(self, data: Dict, **kwargs) -> None:
+        if data.get("min", 0) > data.get("max", 1):
+            raise ValidationError("Must not be greater than max", "min")
 
 
 class SQLAlchemyEngineSchema(Schema):
@@ -31,10 +176,43 @@ class SQLAlchemyEngineSchema(Schema):
     pool_size = fields.Int(missing=5)
     pool_recycle = fields.Int(missing=3600)
     pool_timeout = fields.Int(missing=30)
+    pool_mode = fields.Str(
+        missing=PoolMode.QUEUE.value,
+        validate=validate.OneOf([mode.value for mode in PoolMode]),
+    )
+    session_pool = fields.Nested(OracleSessionPoolSchema, missing=None)
 
     class Meta:
         unknown = EXCLUDE
 
+    @validates_schema
+    def validate_session_pool(self, data: Dict, **kwargs) -> None:
+        if data.get("pool_mode") != PoolMode.SESSION:
+            return
+
+        if data.get("session_pool") is None:
+            raise ValidationError("Required in session mode", "session_pool")
+
+        url = engine.url.make_url(data["name_or_url"])
+        if url.get_backend_name() != "oracle":
+            raise ValidationError("Must be an Oracle URL", "name_or_url")
+
     @post_load
     def make_engine(self, data: Dict, **kwargs) -> engine.Engine:
-        return engine.create_engine(**data)
+        pool_mode = PoolMode(data.pop("pool_mode"))
+        session_pool = data.pop("session_pool")
+
+        if pool_mode is PoolMode.QUEUE:
+            bind = engine.create_engine(**data)
+            # A negative max_overflow leaves the pool unbounded.
+            if data["max_overflow"] >= 0:
+                capacity = data["pool_size"] + data["max_overflow"]
+                POOL_CAPACITIES[bind] = capacity
+            return bind
+
+        return create_session_pool_engine(
+            name_or_url=data["name_or_url"],
+            session_pool=session_pool,
+            echo=data["echo"],
+            echo_pool=data["echo_pool"],
+        )
@@ -0,0 +1,87 @@
+import ipaddress
+from typing import Any, Final, Optional, Tuple
+
+import orjson
+
+from vertical import hdrs
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = (
+    "ZSTD_MAGIC",
+    "BodyCodec",
+    "decompress_body",
+    "decode_body",
+    "split_remote",
+    "audit_method",
+)
+
+# Every zstd frame starts with these bytes, JSON bodies never do.
+ZSTD_MAGIC: Final = b"\x28\xb5\x2f\xfd"
+
+DEFAULT_COMPRESSION_LEVEL: Final = 3
+
+METHODS: Final = frozenset(hdrs.METHOD_ALL)
+
+
+class BodyCodec:
+
+    __slots__ = (
+        "_threshold",
+        "_compressor",
+    )
+
+    def __init__(
+        self,
+        threshold: Optional[int] = None,
+        level: int = DEFAULT_COMPRESSION_LEVEL,
+    ):
+        self._threshold = threshold
+        self._compressor = None
+
+        if threshold is not None:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required for compression")
+            self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def encode(self, content: Optional[bytes]) -> Optional[bytes]:
+        if not content:
+            return None
+        if self._compressor and len(content) >= self._threshold:
+            return self._compressor.compress(content)
+        return content
+
+
+def decompress_body(data: bytes) -> bytes:
+    if not data.startswith(ZSTD_MAGIC):
+        return data
+    if zstandard is None:
+        raise RuntimeError("zstandard is required for decompression")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def decode_body(data: Optional[bytes]) -> Any:
+    if not data:
+        return None
+    return orjson.loads(decompress_body(bytes(data)))
+
+
+def split_remote(remote: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    if not remote:
+        return None, None
+
+    host, _, port = remote.rpartition(":")
+
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        host = None
+
+    return host, int(port) if port.isdigit() else None
+
+
+def audit_method(method: str) -> Optional[str]:
+    return method if method in METHODS else None
@@ -1,45 +1,253 @@
+import asyncio
+import hashlib
+import secrets
+from contextlib import suppress
+from datetime import datetime
+from enum import Enum
+from functools import partial
 from http import HTTPStatus
 from logging import Logger
-from typing import Dict, Optional, TypedDict
+from typing import Any, Callable, Dict, Final, List, Optional, TypedDict
 from uuid import UUID
 
+import attr
+import orjson
+from asyncpg.connection import Connection
 from asyncpg.pool import Pool, create_pool
-from marshmallow import EXCLUDE, Schema, fields, post_load
-from sqlalchemy import Column, ForeignKey, orm
-from sqlalchemy.dialects import postgresql as pg
-from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
 
 from vertical import hdrs
 
+from .audit import BodyCodec, audit_method, split_remote
+from .cache import CacheConfig, CacheSchema, TTLCache
 from .log import LoggerConfig, LoggerSchema
 from .protocols import RequestProtocol, ResponseProtocol
-from .utils import make_uuid, now
+from .tracing import span
+from .usage import UsageBuffer, UsageQuery
+from .utils import now
 
 DATETIME_FORMAT = "%Y.%m.%d %H:%M:%S"
 
-
-Model: DeclarativeMeta = declarative_base()
-
-
-class Client(Model):
-    __tablename__ = "clients"
-
-    id = Column("client_id", pg.UUID, primary_key=True, default=make_uuid)
-    name = Column(pg.VARCHAR)
-    created_at = Column(pg.TIMESTAMP, default=now)
-
-
-class Contract(Model):
-    __tablename__ = "contracts"
-
-    id = Column("contract_id", pg.UUID, primary_key=True, default=make_uuid)
-    client_id = Column(pg.UUID, ForeignKey(Client.id))
-    token = Column(pg.VARCHAR)
-    created_at = Column(pg.TIMESTAMP, default=now)
-    expired_at = Column(pg.TIMESTAMP, default=None)
-    revoked_at = Column(pg.TIMESTAMP, default=None)
-
-    client = orm.relationship(Client)
+ADMIN_CLIENT_NAME = "admin"
+
+# Bump whenever the encoding of the cached contracts changes.
+CONTRACT_CACHE_VERSION: Final = 1
+
+# Binary JSONB values are the version byte followed by the JSON text.
+JSONB_VERSION: Final = b"\x01"
+
+
+PING_QUERY: Final = "SELECT TRUE;"
+
+SAVE_REQUEST_QUERY: Final = """
+    INSERT INTO requests
+        (request_id, remote, method, path, body)
+    VALUES
+        ($1::UUID, $2::VARCHAR, $3::VARCHAR, $4::VARCHAR, $5::JSONB)
+    RETURNING
+        requests.request_id AS id
+        , requests.remote
+        , requests.method
+        , requests.path
+        , requests.body
+    ;
+"""
+
+SAVE_RESPONSE_QUERY: Final = """
+    INSERT INTO responses
+        (request_id, code, body)
+    VALUES
+        ($1::UUID, $2::SMALLINT, $3::JSONB)
+    RETURNING
+        responses.request_id AS id
+        , responses.code
+        , responses.body
+    ;
+"""
+
+SAVE_AUDIT_QUERY: Final = """
+    INSERT INTO audits
+        (request_id, remote, remote_port, method, path, request_body,
+         contract_id, response_code, response_body)
+    VALUES
+        ($1::UUID, $2::INET, $3::INTEGER, $4::http_method,
+         $5::VARCHAR, $6::BYTEA, $7::UUID, $8::SMALLINT, $9::BYTEA)
+    ;
+"""
+
+FLUSH_USAGE_QUERY: Final = """
+    INSERT INTO usage_daily
+        (contract_id, day, status_class, calls, latency)
+    VALUES
+        ($1::UUID, $2::DATE, $3::SMALLINT, $4::BIGINT,
+         $5::DOUBLE PRECISION)
+    ON CONFLICT (day, contract_id, status_class) DO UPDATE SET
+        calls = usage_daily.calls + EXCLUDED.calls
+        , latency = usage_daily.latency + EXCLUDED.latency
+    ;
+"""
+
+GET_USAGE_QUERY: Final = """
+    SELECT
+        usage_daily.contract_id::TEXT
+        , usage_daily.day
+        , usage_daily.status_class
+        , usage_daily.calls
+        , usage_daily.latency
+    FROM
+        usage_daily
+    WHERE
+        usage_daily.day BETWEEN $1::DATE AND $2::DATE
+        AND ($3::UUID IS NULL OR usage_daily.contract_id = $3::UUID)
+    ORDER BY
+        usage_daily.day
+        , usage_daily.contract_id
+        , usage_daily.status_class
+    ;
+"""
+
+GET_CONTRACT_QUERY: Final = """
+    SELECT
+        contracts.contract_id AS id
+        , contracts.client_id
+        , contracts.token_digest
+        , contracts.created_at
+        , contracts.expired_at
+        , contracts.revoked_at
+        , contracts.rate_limit
+        , contracts.rate_burst
+    FROM contracts WHERE token_digest = $1::CHAR(64) LIMIT 1;
+"""
+
+GET_CLIENT_QUERY: Final = """
+    SELECT
+        clients.client_id AS id
+        , clients.name
+        , clients.created_at
+    FROM
+        clients JOIN contracts USING (client_id)
+    WHERE
+        contracts.contract_id = $1::UUID
+    LIMIT 1
+    ;
+"""
+
+IDENTIFY_QUERY: Final = """
+    INSERT INTO identifications
+        (request_id, contract_id)
+    VALUES
+        ($1::UUID, $2::UUID)
+    RETURNING
+        identifications.identification_id AS id
+        , identifications.request_id
+        , identifications.contract_id
+    ;
+"""
+
+# Expired keys, and keys left in flight for longer than the lock timeout,
+# are claimed again. The claim and the existing key are read at once.
+CLAIM_IDEMPOTENCY_KEY_QUERY: Final = """
+    WITH claimed AS (
+        INSERT INTO idempotency_keys
+            (contract_id, key, request_digest)
+        VALUES
+            ($1::UUID, $2::VARCHAR, $3::CHAR(64))
+        ON CONFLICT (contract_id, key) DO UPDATE SET
+            request_digest = EXCLUDED.request_digest
+            , code = NULL
+            , body = NULL
+            , created_at = now()
+        WHERE
+            idempotency_keys.created_at
+                < now() - make_interval(secs => $4::DOUBLE PRECISION)
+            OR (
+                idempotency_keys.code IS NULL
+                AND idempotency_keys.created_at
+                    < now() - make_interval(secs => $5::DOUBLE PRECISION)
+            )
+        RETURNING
+            idempotency_keys.request_digest
+    )
+    SELECT
+        TRUE AS claimed
+        , claimed.request_digest
+        , NULL::SMALLINT AS code
+        , NULL::JSONB AS body
+    FROM
+        claimed
+    UNION ALL
+    SELECT
+        FALSE AS claimed
+        , idempotency_keys.request_digest
+        , idempotency_keys.code
+        , idempotency_keys.body
+    FROM
+        idempotency_keys
+    WHERE
+        idempotency_keys.contract_id = $1::UUID
+        AND idempotency_keys.key = $2::VARCHAR
+        AND NOT EXISTS (SELECT FROM claimed)
+    ;
+"""
+
+COMPLETE_IDEMPOTENCY_KEY_QUERY: Final = """
+    UPDATE idempotency_keys SET
+        code = $3::SMALLINT
+        , body = $4::JSONB
+    WHERE
+        idempotency_keys.contract_id = $1::UUID
+        AND idempotency_keys.key = $2::VARCHAR
+        AND idempotency_keys.code IS NULL
+    ;
+"""
+
+RELEASE_IDEMPOTENCY_KEY_QUERY: Final = """
+    DELETE FROM idempotency_keys
+    WHERE
+        idempotency_keys.contract_id = $1::UUID
+        AND idempotency_keys.key = $2::VARCHAR
+        AND idempotency_keys.code IS NULL
+    ;
+"""
+
+PURGE_IDEMPOTENCY_KEYS_QUERY: Final = """
+    DELETE FROM idempotency_keys
+    WHERE
+        idempotency_keys.created_at
+            < now() - make_interval(secs => $1::DOUBLE PRECISION)
+    ;
+"""
+
+
+def make_token() -> str:
+    return secrets.token_hex()
+
+
+def make_token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+@attr.s(slots=True, frozen=True)
+class Client:
+    id: UUID = attr.ib()
+    name: str = attr.ib()
+    created_at: Optional[datetime] = attr.ib(default=None)
+
+    def is_admin(self) -> bool:
+        return self.name == ADMIN_CLIENT_NAME
+
+
+@attr.s(slots=True, frozen=True)
+class Contract:
+    id: UUID = attr.ib()
+    client_id: UUID = attr.ib()
+    token_digest: str = attr.ib()
+    created_at: Optional[datetime] = attr.ib(default=None)
+    expired_at: Optional[datetime] = attr.ib(default=None)
+    revoked_at: Optional[datetime] = attr.ib(default=None)
+    rate_limit: Optional[float] = attr.ib(default=None)
+    rate_burst: Optional[int] = attr.ib(default=None)
+    client: Optional[Client] = attr.ib(default=None)
 
     def is_expired(self) -> bool:
         if self.expired_at is None or self.expired_at > now():
@@ -52,37 +260,115 @@ class Contract(Model):
         return True
 
 
-class Request(Model):
-    __tablename__ = "requests"
+@attr.s(slots=True, frozen=True)
+class Request:
+    id: UUID = attr.ib()
+    remote: str = attr.ib()
+    method: str = attr.ib()
+    path: str = attr.ib()
+    body: Optional[Any] = attr.ib(default=None)
+
 
-    id = Column("request_id", pg.UUID, primary_key=True)
-    remote = Column(pg.VARCHAR)
-    method = Column(pg.VARCHAR)
-    path = Column(pg.VARCHAR)
-    body = Column(pg.JSONB)
-    created_at = Column(pg.TIMESTAMP)
+@attr.s(slots=True, frozen=True)
+class Response:
+    id: UUID = attr.ib()
+    code: int = attr.ib()
+    body: Optional[Any] = attr.ib(default=None)
 
 
-class Response(Model):
-    __tablename__ = "responses"
+@attr.s(slots=True, frozen=True)
+class Identification:
+    request_id: UUID = attr.ib()
+    contract_id: UUID = attr.ib()
+    id: Optional[UUID] = attr.ib(default=None)
+    contract: Optional[Contract] = attr.ib(default=None)
 
-    id = Column("request_id", None, ForeignKey(Request.id), primary_key=True)
-    body = Column(pg.JSONB)
-    code = Column(pg.SMALLINT)
-    created_at = Column(pg.TIMESTAMP)
 
-    request = orm.relationship(Request)
+@attr.s(slots=True, frozen=True)
+class Audit:
+    id: UUID = attr.ib()
+    remote: Optional[str] = attr.ib()
+    remote_port: Optional[int] = attr.ib()
+    method: Optional[str] = attr.ib()
+    path: str = attr.ib()
+    request_body: bytes = attr.ib()
+    contract_id: Optional[UUID] = attr.ib()
+    response_code: Optional[int] = attr.ib()
+    response_body: Optional[bytes] = attr.ib()
 
 
-class Identification(Model):
-    __tablename__ = "identifications"
+# Completed keys have the response code and content to be replayed.
+@attr.s(slots=True, frozen=True)
+class IdempotencyKey:
+    claimed: bool = attr.ib()
+    request_digest: str = attr.ib()
+    code: Optional[int] = attr.ib(default=None)
+    body: Optional[Any] = attr.ib(default=None)
 
-    id = Column("identification_id", pg.UUID, primary_key=True)
-    request_id = Column(None, ForeignKey(Request.id))
-    contract_id = Column(None, ForeignKey(Contract.id))
+    def is_completed(self) -> bool:
+        return self.code is not None
 
-    request = orm.relationship(Request)
-    contract = orm.relationship(Contract)
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return None if value is None else datetime.fromisoformat(value)
+
+
+def encode_contract(contract: Contract) -> bytes:
+    # asyncpg returns its own UUID type, which orjson doesn't know.
+    return orjson.dumps(attr.astuple(contract, recurse=True), default=str)
+
+
+# Request and response contents are already JSON, they are sent as is.
+def encode_jsonb(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return JSONB_VERSION + value
+    return JSONB_VERSION + orjson.dumps(value)
+
+
+def decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(data[1:])
+
+
+async def init_connection(connection: Connection) -> None:
+    await connection.set_type_codec(
+        "jsonb",
+        encoder=encode_jsonb,
+        decoder=decode_jsonb,
+        schema="pg_catalog",
+        format="binary",
+    )
+
+
+def decode_contract(data: bytes) -> Contract:
+    (
+        contract_id,
+        client_id,
+        token_digest,
+        created_at,
+        expired_at,
+        revoked_at,
+        rate_limit,
+        rate_burst,
+        (_, client_name, client_created_at),
+    ) = orjson.loads(data)
+
+    client = Client(
+        id=UUID(client_id),
+        name=client_name,
+        created_at=parse_datetime(client_created_at),
+    )
+
+    return Contract(
+        id=UUID(contract_id),
+        client_id=UUID(client_id),
+        token_digest=token_digest,
+        created_at=parse_datetime(created_at),
+        expired_at=parse_datetime(expired_at),
+        revoked_at=parse_datetime(revoked_at),
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+        client=client,
+    )
 
 
 class AuthException(Exception):
@@ -141,6 +427,13 @@ class ContractRevoked(ContractUnavailable):
         return f"Your contract was revoked on {revoked_at}"
 
 
+class AdminRequired(AuthException):
+    http_status = HTTPStatus.FORBIDDEN
+
+    def render(self) -> str:
+        return "Admin contract required"
+
+
 class AsyncpgPoolConfig(TypedDict, total=False):
     dsn: str
     min_size: str
@@ -153,131 +446,316 @@ class AsyncpgPoolConfig(TypedDict, total=False):
     max_cached_statement_lifetime: float
 
 
-class AuthServiceConfig(TypedDict):
+class AuditMode(str, Enum):
+    SPLIT = "split"
+    CONSOLIDATED = "consolidated"
+
+
+PoolFactory = Callable[..., Pool]
+
+
+class AuthServiceConfig(TypedDict, total=False):
     pool: AsyncpgPoolConfig
     logger: LoggerConfig
+    audit_mode: str
+    audit_compress_threshold: Optional[int]
+    usage_flush_interval: float
+    contract_cache: CacheConfig
 
 
 class AuthService:
 
     __slots__ = (
+        "_pool_factory",
         "_pool",
         "_logger",
+        "_audit_mode",
+        "_body_codec",
+        "_usage",
+        "_usage_flush_interval",
+        "_usage_flusher",
+        "_contracts",
     )
 
-    def __init__(self, pool: Pool, logger: Logger):
-        self._pool = pool
+    def __init__(
+        self,
+        pool_factory: PoolFactory,
+        logger: Logger,
+        audit_mode: str = AuditMode.SPLIT,
+        audit_compress_threshold: Optional[int] = None,
+        usage_flush_interval: float = 0,
+        contract_cache: Optional[TTLCache] = None,
+    ):
+        self._pool_factory = pool_factory
+        self._pool: Optional[Pool] = None
         self._logger = logger
+        self._audit_mode = AuditMode(audit_mode)
+        self._body_codec = BodyCodec(audit_compress_threshold)
+        self._usage = UsageBuffer()
+        self._usage_flush_interval = usage_flush_interval
+        self._usage_flusher: Optional[asyncio.Task] = None
+        self._contracts = contract_cache
+        if contract_cache is None:
+            self._contracts = TTLCache()
+
+    @property
+    def audit_mode(self) -> AuditMode:
+        return self._audit_mode
+
+    def is_consolidated(self) -> bool:
+        return self._audit_mode is AuditMode.CONSOLIDATED
 
     async def setup(self) -> None:
+        # The pool is bound to the running event loop, so it's created
+        # at startup of every worker, not when the app is loaded.
+        self._pool = self._pool_factory(init=init_connection)
         await self._pool
+        if self._usage_flush_interval > 0:
+            self._usage_flusher = asyncio.create_task(self.flush_usage_loop())
+
+        loaded = self._contracts.load(decode_contract, CONTRACT_CACHE_VERSION)
+        if loaded:
+            self._logger.info(f"Loaded {loaded} cached contracts")
+
         self._logger.info("Auth service initialized")
 
     async def cleanup(self) -> None:
+        # The flusher may be in the middle of a flush, it's awaited so the
+        # counters it swapped out are merged back before the final flush.
+        if self._usage_flusher:
+            self._usage_flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._usage_flusher
+        await self.flush_usage()
         await self._pool.close()
+
+        saved = self._contracts.save(encode_contract, CONTRACT_CACHE_VERSION)
+        if saved:
+            self._logger.info(f"Saved {saved} cached contracts")
+
         self._logger.info("Auth service shutdown")
 
     async def ping(self) -> bool:
-        return await self._pool.fetchval("SELECT TRUE;")
+        with span("auth.ping"):
+            return await self._pool.fetchval(PING_QUERY)
 
     async def save_request(self, request: RequestProtocol) -> Request:
-        query = """
-            INSERT INTO requests
-                (request_id, remote, method, path, body)
-            VALUES
-                ($1::UUID, $2::VARCHAR, $3::VARCHAR, $4::VARCHAR, $5::JSONB)
-            RETURNING
-                requests.request_id AS id
-                , requests.remote
-                , requests.method
-                , requests.path
-                , requests.body
-            ;
-        """
-
-        record = await self._pool.fetchrow(
-            query,
-            request.identifier,
-            request.remote_addr,
-            request.method,
-            request.path,
-            request.body,
-        )
+        with span("auth.save_request"):
+            record = await self._pool.fetchrow(
+                SAVE_REQUEST_QUERY,
+                request.identifier,
+                request.remote_addr,
+                request.method,
+                request.path,
+                request.content or None,
+            )
 
         return Request(**record)
 
     async def save_response(self, response: ResponseProtocol) -> Response:
-        query = """
-            INSERT INTO responses
-                (request_id, code, body)
-            VALUES
-                ($1::UUID, $2::SMALLINT, $3::JSONB)
-            RETURNING
-                responses.request_id AS id
-                , responses.code
-                , responses.body
-            ;
-        """
-
-        record = await self._pool.fetchrow(
-            query,
-            response.request.identifier,
-            response.code,
-            response.body,
-        )
+        with span("auth.save_response"):
+            record = await self._pool.fetchrow(
+                SAVE_RESPONSE_QUERY,
+                response.request.identifier,
+                response.code,
+                response.content,
+            )
 
         return Response(**record)
 
+    async def save_audit(
+        self,
+        request: RequestProtocol,
+        response: Optional[ResponseProtocol] = None,
+        contract_id: Optional[UUID] = None,
+    ) -> Audit:
+        remote, remote_port = split_remote(request.remote_addr)
+        method = audit_method(request.method)
+
+        encode = self._body_codec.encode
+        request_body = encode(request.content)
+        response_body = encode(response.content) if response else None
+        code = response.code if response else None
+
+        with span("auth.save_audit"):
+            await self._pool.execute(
+                SAVE_AUDIT_QUERY,
+                request.identifier,
+                remote,
+                remote_port,
+                method,
+                request.path,
+                request_body,
+                contract_id,
+                code,
+                response_body,
+            )
+
+        return Audit(
+            id=UUID(request.identifier),
+            remote=remote,
+            remote_port=remote_port,
+            method=method,
+            path=request.path,
+            request_body=request_body,
+            contract_id=contract_id,
+            response_code=code,
+            response_body=response_body,
+        )
+
+    async def record_usage(
+        self,
+        contract_id: UUID,
+        code: int,
+        latency: float,
+    ) -> None:
+        self._usage.add(contract_id, code, latency)
+        if self._usage_flush_interval <= 0:
+            await self.flush_usage()
+
+    async def flush_usage(self) -> None:
+        if not self._usage:
+            return
+
+        usage = self._usage.swap()
+        try:
+            with span("auth.flush_usage"):
+                await self._pool.executemany(FLUSH_USAGE_QUERY, usage.rows())
+        except BaseException:
+            # Keep the counters, they will be retried on the next flush,
+            # also when a flush is cancelled at shutdown.
+            self._usage.merge(usage)
+            raise
+
+    async def flush_usage_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._usage_flush_interval)
+            try:
+                await self.flush_usage()
+            except Exception as e:
+                self._logger.warning(f"Could not flush usage: {e}")
+
+    async def get_usage(self, query: UsageQuery) -> List[Dict]:
+        with span("auth.get_usage"):
+            records = await self._pool.fetch(
+                GET_USAGE_QUERY,
+                query.since,
+                query.until,
+                query.contract_id,
+            )
+
+        return [dict(record) for record in records]
+
     async def get_contract_by_token(self, token: str) -> Optional[Contract]:
-        query = """
-            SELECT
-                contracts.contract_id AS id
-                , contracts.client_id
-                , contracts.token
-                , contracts.created_at
-                , contracts.expired_at
-                , contracts.revoked_at
-            FROM contracts WHERE token = $1::VARCHAR LIMIT 1;
-        """
-
-        record = await self._pool.fetchrow(query, token)
+        token_digest = make_token_digest(token)
+
+        with span("auth.get_contract"):
+            record = await self._pool.fetchrow(
+                GET_CONTRACT_QUERY,
+                token_digest,
+            )
+
         if not record:
             return None
         return Contract(**record)
 
     async def get_client(self, contract: Contract) -> Client:
-        query = """
-            SELECT
-                clients.client_id AS id
-                , clients.name
-                , clients.created_at
-            FROM
-                clients JOIN contracts USING (client_id)
-            WHERE
-                contracts.contract_id = $1::UUID
-            LIMIT 1
-            ;
-        """
-
-        record = await self._pool.fetchrow(query, contract.id)
+        with span("auth.get_client"):
+            record = await self._pool.fetchrow(GET_CLIENT_QUERY, contract.id)
+
         return Client(**record)
 
-    async def identify(self, request_id: UUID, contract_id: UUID):
-        query = """
-            INSERT INTO identifications
-                (request_id, contract_id)
-            VALUES
-                ($1::UUID, $2::UUID)
-            RETURNING
-                identifications.identification_id AS id
-                , identifications.request_id
-                , identifications.contract_id
-            ;
-        """
-
-        record = await self._pool.fetchrow(query, request_id, contract_id)
+    async def identify(
+        self,
+        request_id: UUID,
+        contract_id: UUID,
+    ) -> Identification:
+        with span("auth.identify"):
+            record = await self._pool.fetchrow(
+                IDENTIFY_QUERY,
+                request_id,
+                contract_id,
+            )
+
         return Identification(**record)
 
+    async def claim_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+        request_digest: str,
+        window: float,
+        lock_timeout: float,
+    ) -> Optional[IdempotencyKey]:
+        with span("auth.claim_idempotency_key"):
+            record = await self._pool.fetchrow(
+                CLAIM_IDEMPOTENCY_KEY_QUERY,
+                contract_id,
+                key,
+                request_digest,
+                window,
+                lock_timeout,
+            )
+
+        # Nothing is read when the key was claimed by a concurrent request.
+        if not record:
+            return None
+        return IdempotencyKey(**record)
+
+    async def complete_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+        code: int,
+        body: Any,
+    ) -> None:
+        with span("auth.complete_idempotency_key"):
+            await self._pool.execute(
+                COMPLETE_IDEMPOTENCY_KEY_QUERY,
+                contract_id,
+                key,
+                code,
+                body,
+            )
+
+    async def release_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+    ) -> None:
+        with span("auth.release_idempotency_key"):
+            await self._pool.execute(
+                RELEASE_IDEMPOTENCY_KEY_QUERY,
+                contract_id,
+                key,
+            )
+
+    async def purge_idempotency_keys(self, window: float) -> None:
+        with span("auth.purge_idempotency_keys"):
+            await self._pool.execute(PURGE_IDEMPOTENCY_KEYS_QUERY, window)
+
+    async def get_cached_contract(self, token: str) -> Contract:
+        key = bytes.fromhex(make_token_digest(token))
+
+        contract = self._contracts.get(key)
+        if contract is not None:
+            return contract
+
+        contract = await self.get_contract_by_token(token)
+
+        if not contract:
+            self._logger.warning("Contract not found")
+            raise InvalidAccessToken()
+
+        self._logger.info(f"Found contract with id {contract.id}")
+
+        client = await self.get_client(contract)
+
+        contract = attr.evolve(contract, client=client)
+        self._contracts.set(key, contract)
+
+        return contract
+
     async def authorize(self, request: RequestProtocol) -> Identification:
         if not request.authorization:
             self._logger.warning("Authorization header not recognized")
@@ -293,15 +771,8 @@ class AuthService:
             self._logger.warning("Expected Bearer token scheme")
             raise BearerExpected()
 
-        contract = await self.get_contract_by_token(token)
-
-        if not contract:
-            self._logger.warning("Contract not found")
-            raise InvalidAccessToken()
-
-        self._logger.info(f"Found contract with id {contract.id}")
-
-        client = await self.get_client(contract)
+        contract = await self.get_cached_contract(token)
+        client = contract.client
 
         if contract.is_expired():
             self._logger.warning(f"Contract expired at {contract.expired_at}")
@@ -314,7 +785,16 @@ class AuthService:
         self._logger.info(f"Authorized {client.name} with id {client.id}")
 
         request_id = UUID(request.identifier)
-        return await self.identify(request_id, contract.id)
+        if self.is_consolidated():
+            # The identification is written along with the response audit.
+            identification = Identification(
+                request_id=request_id,
+                contract_id=contract.id,
+            )
+        else:
+            identification = await self.identify(request_id, contract.id)
+
+        return attr.evolve(identification, contract=contract)
 
     @classmethod
     def from_config(cls, config: AuthServiceConfig) -> "AuthService":
@@ -336,13 +816,24 @@ class AsyncpgPoolSchema(Schema):
         unknown = EXCLUDE
 
     @post_load
-    def make_pool(self, data: Dict, **kwargs) -> Pool:
-        return create_pool(**data)
+    def make_pool_factory(self, data: Dict, **kwargs) -> PoolFactory:
+        return partial(create_pool, **data)
 
 
 class AuthServiceSchema(Schema):
-    pool = fields.Nested(AsyncpgPoolSchema, required=True)
+    pool_factory = fields.Nested(
+        AsyncpgPoolSchema,
+        data_key="pool",
+        required=True,
+    )
     logger = fields.Nested(LoggerSchema, required=True)
+    audit_mode = fields.Str(
+        missing=AuditMode.SPLIT.value,
+        validate=validate.OneOf([mode.value for mode in AuditMode]),
+    )
+    audit_compress_threshold = fields.Int(missing=None, allow_none=True)
+    usage_flush_interval = fields.Float(missing=0)
+    contract_cache = fields.Nested(CacheSchema, missing=None)
 
     class Meta:
         unknown = EXCLUDE
@@ -0,0 +1,191 @@
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Final, Optional, Tuple, TypedDict
+
+from marshmallow import EXCLUDE, Schema, fields, post_load
+
+from .log import app_logger
+
+__all__ = (
+    "CacheConfig",
+    "TTLCache",
+    "CacheSchema",
+)
+
+MAGIC: Final = b"VRTC"
+
+FORMAT_VERSION: Final = 2
+
+# magic, format version, values version, stamp
+HEADER: Final = struct.Struct("!4sHHQ")
+
+# expires_at, key size, value size
+RECORD: Final = struct.Struct("!dHI")
+
+Encoder = Callable[[Any], bytes]
+Decoder = Callable[[bytes], Any]
+
+
+class CacheConfig(TypedDict, total=False):
+    ttl: float
+    max_size: int
+    snapshot: Optional[str]
+    load_budget: float
+
+
+class TTLCache:
+
+    __slots__ = (
+        "_ttl",
+        "_max_size",
+        "_snapshot",
+        "_load_budget",
+        "_entries",
+    )
+
+    def __init__(
+        self,
+        ttl: float = 0,
+        max_size: int = 10000,
+        snapshot: Optional[str] = None,
+        load_budget: float = 0.1,
+    ):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._snapshot = snapshot
+        self._load_budget = load_budget
+        self._entries: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(
+        self,
+        key: bytes,
+        value: Any,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        if self._ttl <= 0:
+            return
+
+        max_expires_at = time.time() + self._ttl
+        if expires_at is None or expires_at > max_expires_at:
+            expires_at = max_expires_at
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    # Snapshot is shared by all the worker processes of a host: the last
+    # worker to shut down replaces it, the next one to start loads it.
+    # Snapshot saved with another stamp (e.g. data generation) is ignored.
+    def save(self, encode: Encoder, version: int, stamp: int = 0) -> int:
+        if not self._snapshot or self._ttl <= 0:
+            return 0
+
+        try:
+            return self._save(encode, version, stamp)
+        except Exception as e:
+            app_logger.warning("Could not save cache snapshot: %s", e)
+            return 0
+
+    def load(self, decode: Decoder, version: int, stamp: int = 0) -> int:
+        if not self._snapshot or self._ttl <= 0:
+            return 0
+
+        try:
+            return self._load(decode, version, stamp)
+        except Exception as e:
+            app_logger.warning("Could not load cache snapshot: %s", e)
+            return 0
+
+    def _save(self, encode: Encoder, version: int, stamp: int) -> int:
+        now = time.time()
+        saved = 0
+
+        chunks = [HEADER.pack(MAGIC, FORMAT_VERSION, version, stamp)]
+        for key, (expires_at, value) in self._entries.items():
+            if expires_at <= now:
+                continue
+            data = encode(value)
+            chunks += (RECORD.pack(expires_at, len(key), len(data)), key, data)
+            saved += 1
+
+        path = f"{self._snapshot}.{os.getpid()}"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "wb") as file:
+            file.write(b"".join(chunks))
+        os.replace(path, self._snapshot)
+
+        return saved
+
+    def _load(self, decode: Decoder, version: int, stamp: int) -> int:
+        deadline = time.monotonic() + self._load_budget
+
+        try:
+            with open(self._snapshot, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return 0
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, version, stamp)
+        if data[:HEADER.size] != header:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        offset = HEADER.size
+
+        while offset < len(data) and time.monotonic() < deadline:
+            expires_at, key_size, value_size = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+
+            key = data[offset:offset + key_size]
+            offset += key_size
+
+            value = data[offset:offset + value_size]
+            offset += value_size
+
+            if expires_at > now:
+                self.set(key, decode(value), expires_at)
+                loaded += 1
+
+        return loaded
+
+    @classmethod
+    def from_config(cls, config: CacheConfig) -> "TTLCache":
+        return CacheSchema().load(config)
+
+
+class CacheSchema(Schema):
+    ttl = fields.Float(missing=0)
+    max_size = fields.Int(missing=10000)
+    snapshot = fields.Str(missing=None, allow_none=True)
+    load_budget = fields.Float(missing=0.1)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @post_load
+    def make_cache(self, data: Dict, **kwargs) -> TTLCache:
+        return TTLCache(**data)
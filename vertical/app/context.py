@@ -1,3 +1,15 @@
 from contextvars import ContextVar
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .tracing import Spans
 
 REQUEST_ID: ContextVar[str] = ContextVar("REQUEST_ID", default="-")
+
+SPANS: ContextVar[Optional["Spans"]] = ContextVar("SPANS", default=None)
+
+# The MessagePack media type accepted by the client, or JSON if None.
+RESPONSE_MEDIA_TYPE: ContextVar[Optional[str]] = ContextVar(
+    "RESPONSE_MEDIA_TYPE",
+    default=None,
+)
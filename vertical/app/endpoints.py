@@ -1,5 +1,5 @@
 from functools import wraps
-from typing import Dict
+from typing import AsyncIterator, Dict, Sequence
 
 from starlette.applications import Starlette
 from starlette.requests import Request
@@ -8,11 +8,17 @@ from starlette.responses import Response
 from vertical import hdrs
 
 from .adapters import RequestAdapter
-from .auth import AuthService
+from .auth import AdminRequired, AuthService
+from .health import HealthProber
 from .hunter import HunterService
-from .models import Phone
-from .responses import ok
+from .idempotency import IdempotencyGuard, request_digest
+from .log import app_logger
+from .models import Phone, Phones
+from .monitor import LoopMonitor
+from .ratelimit import RateLimiter
+from .responses import NDJSON_MEDIA_TYPE, ndjson, ok, prerendered
 from .types import Endpoint
+from .usage import DATE_FORMAT, USAGE_QUERY_SCHEMA
 
 __all__ = ("add_routes", )
 
@@ -25,10 +31,30 @@ def get_hunter_service(request: Request) -> HunterService:
     return request.app.state.hunter_service
 
 
+def get_rate_limiter(request: Request) -> RateLimiter:
+    return request.app.state.rate_limiter
+
+
+def get_loop_monitor(request: Request) -> LoopMonitor:
+    return request.app.state.loop_monitor
+
+
+def get_health_prober(request: Request) -> HealthProber:
+    return request.app.state.health_prober
+
+
+def get_idempotency_guard(request: Request) -> IdempotencyGuard:
+    return request.app.state.idempotency_guard
+
+
 def get_json(request: Request) -> Dict:
     return request.state.json
 
 
+def accepts_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get(hdrs.ACCEPT, "")
+
+
 def auth(endpoint: Endpoint) -> Endpoint:
 
     @wraps(endpoint)
@@ -36,13 +62,57 @@ def auth(endpoint: Endpoint) -> Endpoint:
         auth_service = get_auth_service(request)
 
         request_adapter = RequestAdapter(request)
-        await auth_service.authorize(request_adapter)
+        identification = await auth_service.authorize(request_adapter)
+        request.state.identification = identification
+
+        contract = identification.contract
+        get_rate_limiter(request).check(
+            contract.id,
+            contract.rate_limit,
+            contract.rate_burst,
+        )
+
+        return await endpoint(request)
+
+    return wrapper
+
+
+def admin(endpoint: Endpoint) -> Endpoint:
+
+    @wraps(endpoint)
+    async def wrapper(request: Request) -> Response:
+        identification = request.state.identification
+        if not identification.contract.client.is_admin():
+            raise AdminRequired()
 
         return await endpoint(request)
 
     return wrapper
 
 
+# Repeats of a request with the same Idempotency-Key get the response of
+# the first one, the key is scoped to the authorized contract.
+def idempotent(endpoint: Endpoint) -> Endpoint:
+
+    @wraps(endpoint)
+    async def wrapper(request: Request) -> Response:
+        key = request.headers.get(hdrs.IDEMPOTENCY_KEY)
+        if key is None:
+            return await endpoint(request)
+
+        identification = request.state.identification
+        digest = request_digest(request.state.body)
+
+        return await get_idempotency_guard(request).run(
+            identification.contract_id,
+            key,
+            digest,
+            lambda: endpoint(request),
+        )
+
+    return wrapper
+
+
 async def ping(_: Request) -> Response:
     return ok(message="pong")
 
@@ -53,7 +123,18 @@ async def health(request: Request) -> Response:
     return ok()
 
 
+async def livez(request: Request) -> Response:
+    http_status, content = get_health_prober(request).liveness()
+    return prerendered(content, http_status)
+
+
+async def readyz(request: Request) -> Response:
+    http_status, content = get_health_prober(request).readiness()
+    return prerendered(content, http_status)
+
+
 @auth
+@idempotent
 async def phone_reliability(request: Request) -> Response:
     json = get_json(request)
     phone = Phone.from_dict(json)
@@ -65,6 +146,102 @@ async def phone_reliability(request: Request) -> Response:
     return ok(data)
 
 
+async def reliability_rows(
+    hunter: HunterService,
+    numbers: Sequence[str],
+) -> AsyncIterator[Dict]:
+    chunks = hunter.verify_chunks(numbers)
+
+    offset = 0
+    async for reliabilities in chunks:
+        for reliability in reliabilities:
+            yield {"number": numbers[offset], **reliability.to_dict()}
+            offset += 1
+
+
+async def stream_reliability_rows(
+    hunter: HunterService,
+    numbers: Sequence[str],
+) -> AsyncIterator[Dict]:
+    try:
+        async for row in reliability_rows(hunter, numbers):
+            yield row
+    except Exception as e:
+        # The status is already sent, the last row tells about the error.
+        app_logger.warning(f"Could not stream reliabilities: {e}")
+        yield {"error": "Internal server error"}
+
+
+@auth
+async def phones_reliability(request: Request) -> Response:
+    json = get_json(request)
+    phones = Phones.from_dict(json)
+
+    hunter = get_hunter_service(request)
+
+    if accepts_ndjson(request):
+        rows = stream_reliability_rows(hunter, phones.numbers)
+        return ndjson(rows)
+
+    data = {
+        "results": [
+            row async for row in reliability_rows(hunter, phones.numbers)
+        ],
+    }
+    return ok(data)
+
+
+@auth
+@admin
+async def usage(request: Request) -> Response:
+    json = get_json(request)
+    query = USAGE_QUERY_SCHEMA.load(json)
+
+    auth_service = get_auth_service(request)
+    records = await auth_service.get_usage(query)
+
+    data = {
+        "since": query.since.strftime(DATE_FORMAT),
+        "until": query.until.strftime(DATE_FORMAT),
+        "usage": [
+            {
+                "contract_id": record["contract_id"],
+                "day": record["day"].strftime(DATE_FORMAT),
+                "status_class": f"{record['status_class']}xx",
+                "calls": record["calls"],
+                "latency_avg": round(record["latency"] / record["calls"], 4),
+            }
+            for record in records
+        ],
+    }
+    return ok(data)
+
+
+@auth
+@admin
+async def hunter_plans(request: Request) -> Response:
+    plans = get_hunter_service(request).plans()
+
+    data = {
+        "plans": [plan.to_dict() for plan in plans],
+    }
+    return ok(data)
+
+
+@auth
+@admin
+async def hunter_executor(request: Request) -> Response:
+    data = get_hunter_service(request).executor_stats()
+    return ok(data)
+
+
+@auth
+@admin
+async def loop_lag(request: Request) -> Response:
+    data = get_loop_monitor(request).percentiles()
+    return ok(data)
+
+
 def add_routes(app: Starlette) -> None:
     app.add_route(
         path="/ping",
@@ -80,6 +257,26 @@ def add_routes(app: Starlette) -> None:
         name="health",
     )
 
+    app.add_route(
+        path="/livez",
+        route=livez,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_HEAD,
+        ],
+        name="livez",
+    )
+
+    app.add_route(
+        path="/readyz",
+        route=readyz,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_HEAD,
+        ],
+        name="readyz",
+    )
+
     app.add_route(
         path="/reliability/phone",
         route=phone_reliability,
@@ -87,3 +284,51 @@ def add_routes(app: Starlette) -> None:
             hdrs.METHOD_POST,
         ],
     )
+
+    app.add_route(
+        path="/reliability/phones",
+        route=phones_reliability,
+        methods=[
+            hdrs.METHOD_POST,
+        ],
+    )
+
+    app.add_route(
+        path="/usage",
+        route=usage,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_POST,
+        ],
+        name="usage",
+    )
+
+    app.add_route(
+        path="/hunter/plans",
+        route=hunter_plans,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_POST,
+        ],
+        name="hunter_plans",
+    )
+
+    app.add_route(
+        path="/hunter/executor",
+        route=hunter_executor,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_POST,
+        ],
+        name="hunter_executor",
+    )
+
+    app.add_route(
+        path="/loop/lag",
+        route=loop_lag,
+        methods=[
+            hdrs.METHOD_GET,
+            hdrs.METHOD_POST,
+        ],
+        name="loop_lag",
+    )
@@ -1,11 +1,18 @@
+import math
+from http import HTTPStatus
+
 from marshmallow import ValidationError
 from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import Response
 
+from vertical import hdrs
+
 from .auth import AuthException
+from .idempotency import IdempotencyException
 from .log import app_logger
+from .ratelimit import RateLimitExceeded
 from .responses import create_response, validation_error
 
 __all__ = ("add_exception_handlers", )
@@ -28,6 +35,33 @@ async def auth_exception_handler(_: Request, e: AuthException) -> Response:
     return create_response(content, e.http_status)
 
 
+async def idempotency_exception_handler(
+    _: Request,
+    e: IdempotencyException,
+) -> Response:
+    message = e.render()
+    content = {
+        "message": message,
+    }
+    app_logger.warning("Caught Idempotency exception: %s", message)
+    return create_response(content, e.http_status)
+
+
+async def rate_limit_exceeded_handler(
+    _: Request,
+    e: RateLimitExceeded,
+) -> Response:
+    message = e.render()
+    content = {
+        "message": message,
+    }
+    app_logger.warning("Caught Rate limit exception: %s", message)
+
+    response = create_response(content, HTTPStatus.TOO_MANY_REQUESTS)
+    response.headers[hdrs.RETRY_AFTER] = str(math.ceil(e.retry_after))
+    return response
+
+
 async def validation_error_handler(_: Request, e: ValidationError) -> Response:
     errors = e.messages
     app_logger.warning("Caught Validation error exception")
@@ -37,4 +71,9 @@ async def validation_error_handler(_: Request, e: ValidationError) -> Response:
 def add_exception_handlers(app: Starlette) -> None:
     app.add_exception_handler(HTTPException, http_exception_handler)
     app.add_exception_handler(AuthException, auth_exception_handler)
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+    app.add_exception_handler(
+        IdempotencyException,
+        idempotency_exception_handler,
+    )
     app.add_exception_handler(ValidationError, validation_error_handler)
@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Final, TypeVar
+
+from .monitor import percentile
+
+__all__ = (
+    "ExecutorFull",
+    "BoundedExecutor",
+)
+
+T = TypeVar("T")
+
+WAIT_PERCENTILES: Final = (50, 99)
+
+
+class ExecutorFull(Exception):
+    pass
+
+
+# A thread pool that rejects calls instead of queueing them without bound,
+# the calls waiting for a thread are counted and their wait is sampled.
+class BoundedExecutor:
+
+    __slots__ = (
+        "_workers",
+        "_queue_size",
+        "_executor",
+        "_lock",
+        "_active",
+        "_queued",
+        "_rejected",
+        "_waits",
+    )
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        thread_name_prefix: str = "",
+        samples: int = 1024,
+    ):
+        self._workers = workers
+        self._queue_size = queue_size
+
+        # Threads are started on demand, after the workers are forked.
+        self._executor = ThreadPoolExecutor(
+            workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._rejected = 0
+        self._waits: deque = deque(maxlen=samples)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._active + self._queued >= self._workers + self._queue_size:
+                self._rejected += 1
+                raise ExecutorFull(f"{self._queued} calls are queued")
+            self._queued += 1
+
+        submitted_at = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def call() -> T:
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._waits.append(time.perf_counter() - submitted_at)
+
+            try:
+                return context.run(func, *args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(self.discard)
+        return await asyncio.wrap_future(future)
+
+    # Calls cancelled by a timeout before a thread took them never run.
+    def discard(self, future: Future) -> None:
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+
+        data: Dict[str, Any] = {
+            "workers": self._workers,
+            "queue_size": self._queue_size,
+            "active": self._active,
+            "queued": self._queued,
+            "rejected": self._rejected,
+        }
+        for q in WAIT_PERCENTILES:
+            data[f"wait_p{q}"] = round(percentile(waits, q), 4)
+        data["wait_max"] = round(waits[-1] if waits else 0.0, 4)
+        return data
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -9,9 +9,13 @@ from starlette.applications import Starlette
 from .auth import AuthService, AuthServiceConfig
 from .endpoints import add_routes
 from .exception_handlers import add_exception_handlers
+from .health import HealthProber, HealthProberConfig, lag_check
 from .hunter import HunterService, HunterServiceConfig
+from .idempotency import IdempotencyGuard, IdempotencyGuardConfig
 from .log import app_logger, setup_logging
 from .middlewares import add_middlewares
+from .monitor import LoopMonitor, LoopMonitorConfig
+from .ratelimit import RateLimiter, RateLimiterConfig
 
 __all__ = ("create_app", "AppConfig")
 
@@ -21,9 +25,17 @@ class Signal(str, Enum):
     SHUTDOWN = "shutdown"
 
 
-class AppConfig(TypedDict):
+class AppBaseConfig(TypedDict):
     auth_service: AuthServiceConfig
     hunter_service: HunterServiceConfig
+    rate_limiter: RateLimiterConfig
+
+
+# The rest of the services fall back to their defaults.
+class AppConfig(AppBaseConfig, total=False):
+    loop_monitor: LoopMonitorConfig
+    health_prober: HealthProberConfig
+    idempotency_guard: IdempotencyGuardConfig
 
 
 def setup_auth_service(app: Starlette, config: AuthServiceConfig) -> None:
@@ -42,10 +54,56 @@ def setup_hunter_service(app: Starlette, config: HunterServiceConfig) -> None:
     app.add_event_handler(Signal.SHUTDOWN, hunter_service.cleanup)
 
 
-def setup_asyncio() -> None:
-    uvloop.install()
+def setup_rate_limiter(app: Starlette, config: RateLimiterConfig) -> None:
+    rate_limiter = RateLimiter.from_config(config)
+    app.state.rate_limiter = rate_limiter
+
+    app.add_event_handler(Signal.SHUTDOWN, rate_limiter.close)
+
+
+# Started right after the loop is set up and stopped after the services.
+def setup_loop_monitor(app: Starlette, config: LoopMonitorConfig) -> None:
+    loop_monitor = LoopMonitor.from_config(config)
+    app.state.loop_monitor = loop_monitor
+
+    app.add_event_handler(Signal.STARTUP, loop_monitor.setup)
+    app.add_event_handler(Signal.SHUTDOWN, loop_monitor.cleanup)
+
 
-    loop = asyncio.get_event_loop()
+def setup_idempotency_guard(
+    app: Starlette,
+    config: IdempotencyGuardConfig,
+) -> None:
+    idempotency_guard = IdempotencyGuard.from_config(
+        app.state.auth_service,
+        config,
+    )
+    app.state.idempotency_guard = idempotency_guard
+
+    app.add_event_handler(Signal.STARTUP, idempotency_guard.setup)
+    app.add_event_handler(Signal.SHUTDOWN, idempotency_guard.cleanup)
+
+
+# Started after the services it checks, its first probe runs at startup.
+def setup_health_prober(app: Starlette, config: HealthProberConfig) -> None:
+    health_prober = HealthProber.from_config(config)
+    app.state.health_prober = health_prober
+
+    health_prober.add_check("auth", app.state.auth_service.ping)
+    health_prober.add_check("hunter", app.state.hunter_service.ping)
+    health_prober.add_check(
+        "loop",
+        lag_check(app.state.loop_monitor, health_prober.max_lag),
+    )
+
+    app.add_event_handler(Signal.STARTUP, health_prober.setup)
+    app.add_event_handler(Signal.SHUTDOWN, health_prober.cleanup)
+
+
+# Runs at startup to configure the loop of the worker process: the app
+# may be loaded by the gunicorn master before the workers are forked.
+async def setup_event_loop() -> None:
+    loop = asyncio.get_running_loop()
 
     executor = ThreadPoolExecutor(thread_name_prefix="vertical")
     loop.set_default_executor(executor)
@@ -59,9 +117,11 @@ def setup_asyncio() -> None:
 
 def create_app(config: AppConfig) -> Starlette:
     setup_logging()
-    setup_asyncio()
+    uvloop.install()
 
     app = Starlette(debug=False)
+    app.add_event_handler(Signal.STARTUP, setup_event_loop)
+    setup_loop_monitor(app, config.get("loop_monitor", {}))
 
     add_routes(app)
     add_middlewares(app)
@@ -69,5 +129,8 @@ def create_app(config: AppConfig) -> Starlette:
 
     setup_auth_service(app, config["auth_service"])
     setup_hunter_service(app, config["hunter_service"])
+    setup_rate_limiter(app, config.get("rate_limiter", {}))
+    setup_idempotency_guard(app, config.get("idempotency_guard", {}))
+    setup_health_prober(app, config.get("health_prober", {}))
 
     return app
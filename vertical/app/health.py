@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime
+from http import HTTPStatus
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Final,
+    Optional,
+    Tuple,
+    TypedDict,
+)
+
+import orjson
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
+
+from .log import LoggerConfig, LoggerSchema, app_logger
+from .monitor import LoopMonitor
+
+__all__ = (
+    "PROBE_PATHS",
+    "HealthProberConfig",
+    "HealthProber",
+    "HealthProberSchema",
+    "lag_check",
+)
+
+PROBE_PATHS: Final = ("/livez", "/readyz")
+
+# A probe is stale, and the prober considered dead, after this many
+# missed intervals.
+STALE_INTERVALS: Final = 3
+
+# (HTTP status, rendered body)
+Rendered = Tuple[int, bytes]
+
+Check = Callable[[], Awaitable[bool]]
+
+
+class HealthProberConfig(TypedDict, total=False):
+    interval: float
+    timeout: float
+    max_lag: float
+    logger: LoggerConfig
+
+
+def render(data: Dict, message: str, http_status: int) -> Rendered:
+    content = {
+        "data": data,
+        "message": message,
+    }
+    return http_status, orjson.dumps(content)
+
+
+ALIVE: Final = render({}, "OK", HTTPStatus.OK)
+DEAD: Final = render({}, "Stopped", HTTPStatus.SERVICE_UNAVAILABLE)
+STARTING: Final = render({}, "Starting", HTTPStatus.SERVICE_UNAVAILABLE)
+
+
+def lag_check(loop_monitor: LoopMonitor, max_lag: float) -> Check:
+
+    async def check() -> bool:
+        return loop_monitor.percentiles()["p99"] <= max_lag
+
+    return check
+
+
+# The checks run in a background task, the probe endpoints only serve
+# the result rendered by the last run and never touch the databases.
+class HealthProber:
+
+    __slots__ = (
+        "_interval",
+        "_timeout",
+        "_max_lag",
+        "_logger",
+        "_checks",
+        "_prober",
+        "_probed_at",
+        "_ready",
+    )
+
+    def __init__(
+        self,
+        interval: float,
+        timeout: float,
+        max_lag: float,
+        logger: logging.Logger,
+    ):
+        self._interval = interval
+        self._timeout = timeout
+        self._max_lag = max_lag
+        self._logger = logger
+
+        self._checks: Dict[str, Check] = {}
+        self._prober: Optional[asyncio.Task] = None
+        self._probed_at = 0.0
+        self._ready: Rendered = STARTING
+
+    @property
+    def max_lag(self) -> float:
+        return self._max_lag
+
+    def add_check(self, name: str, check: Check) -> None:
+        self._checks[name] = check
+
+    async def setup(self) -> None:
+        await self.probe()
+        self._prober = asyncio.create_task(self.probe_loop())
+
+    async def cleanup(self) -> None:
+        # Awaited so that no probe is left running against the pools
+        # closed by the later shutdown handlers.
+        if self._prober:
+            self._prober.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._prober
+
+    async def run_check(self, name: str, check: Check) -> bool:
+        try:
+            return bool(await asyncio.wait_for(check(), self._timeout))
+        except asyncio.TimeoutError:
+            self._logger.warning(f"Health check {name} timed out")
+        except Exception as e:
+            self._logger.warning(f"Health check {name} failed: {e}")
+        return False
+
+    async def probe(self) -> None:
+        results = await asyncio.gather(*(
+            self.run_check(name, check)
+            for name, check in self._checks.items()
+        ))
+
+        data: Dict[str, Any] = dict(zip(self._checks, results))
+        data["checked_at"] = datetime.now().isoformat(timespec="seconds")
+
+        if all(results):
+            self._ready = render(data, "OK", HTTPStatus.OK)
+        else:
+            self._ready = render(
+                data,
+                "Not ready",
+                HTTPStatus.SERVICE_UNAVAILABLE,
+            )
+        self._probed_at = time.monotonic()
+
+    async def probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.probe()
+            except Exception as e:
+                self._logger.warning(f"Could not probe health: {e}")
+
+    def liveness(self) -> Rendered:
+        stale_after = self._interval * STALE_INTERVALS + self._timeout
+        if time.monotonic() - self._probed_at > stale_after:
+            return DEAD
+        return ALIVE
+
+    def readiness(self) -> Rendered:
+        if self.liveness() is DEAD:
+            return DEAD
+        return self._ready
+
+    @classmethod
+    def from_config(cls, config: HealthProberConfig) -> "HealthProber":
+        return HealthProberSchema().load(config)
+
+
+class HealthProberSchema(Schema):
+    interval = fields.Float(missing=5, validate=validate.Range(min=0.1))
+    timeout = fields.Float(missing=1, validate=validate.Range(min=0.1))
+    max_lag = fields.Float(missing=1, validate=validate.Range(min=0))
+    logger = fields.Nested(LoggerSchema, missing=lambda: app_logger)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @post_load
+    def release(self, data: Dict, **kwargs) -> HealthProber:
+        return HealthProber(**data)
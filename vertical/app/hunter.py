@@ -1,24 +1,61 @@
 import asyncio
 import logging
+import re
 import time
-from datetime import date
-from typing import Dict, Final, Optional, TypedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Final,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypedDict,
+    TypeVar,
+)
 
 import attr
+import orjson
 import sqlalchemy as sa
-from marshmallow import EXCLUDE, Schema, fields, post_load
+from marshmallow import EXCLUDE, Schema, fields, post_dump, post_load, validate
 from pygost import gost341194
 from starlette.concurrency import run_in_threadpool
 
-from .alchemy import SQLAlchemyEngineConfig, SQLAlchemyEngineSchema
+from .alchemy import (
+    SQLAlchemyEngineConfig,
+    SQLAlchemyEngineSchema,
+    pool_capacity,
+)
+from .cache import CacheConfig, CacheSchema, TTLCache
+from .executor import BoundedExecutor, ExecutorFull
 from .log import LoggerConfig, LoggerSchema
+from .tracing import span
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .rules import Rule, RuleEngine
 
 __all__ = (
     "Period",
     "PeriodSchema",
+    "PERIOD_SCHEMA",
     "Reliability",
     "ReliabilitySchema",
+    "RELIABILITY_SCHEMA",
     "make_hash",
+    "ReliabilityMode",
+    "MAX_CHUNK_SIZE",
+    "PlanCheck",
+    "QueryPlan",
+    "GENERATIONS_TABLE",
+    "make_generations_table",
+    "HunterCoalescer",
     "HunterServiceConfig",
     "HunterService",
     "HunterServiceSchema",
@@ -26,30 +63,267 @@ __all__ = (
 
 DATE_FORMAT: Final = "%Y.%m.%d"
 
+# Bump whenever the encoding of the cached reliabilities changes, the
+# reliabilities evaluated by the rule engine are cached apart.
+RELIABILITY_CACHE_VERSION: Final = 1
+RULES_CACHE_VERSION: Final = 1001
+
+# The rule engine outcome reported as the reliability status.
+STATUS_RULE: Final = "status"
+
+# Oracle allows at most 1000 expressions in an IN list.
+MAX_CHUNK_SIZE: Final = 1000
+
+# Executor threads when the engine pool doesn't tell its size.
+DEFAULT_EXECUTOR_WORKERS: Final = 5
+
+T = TypeVar("T")
+
 
 @attr.s(slots=True, frozen=True)
 class Period:
     registered_at: date = attr.ib()
     updated_at: date = attr.ib()
 
+    def to_dict(self) -> Dict:
+        return {
+            "registered_at": self.registered_at.strftime(DATE_FORMAT),
+            "updated_at": self.updated_at.strftime(DATE_FORMAT),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Period":
+        try:
+            return decode_period(data)
+        except (TypeError, ValueError):
+            return PERIOD_SCHEMA.load(data)
+
 
 class PeriodSchema(Schema):
     registered_at = fields.Date(DATE_FORMAT, required=True)
     updated_at = fields.Date(DATE_FORMAT, required=True)
 
+    class Meta:
+        ordered = True
+
+    @post_load
+    def make_model(self, data: Dict, **kwargs) -> Period:
+        return Period(**data)
+
 
 @attr.s(slots=True, frozen=True)
 class Reliability:
     status: bool = attr.ib()
     period: Optional[Period] = attr.ib()
+    rules: Optional[Dict[str, bool]] = attr.ib(default=None)
 
     def to_dict(self) -> Dict:
-        return ReliabilitySchema().dump(self)
+        period = self.period
+
+        data = {
+            "status": self.status,
+            "period": None if period is None else period.to_dict(),
+        }
+        if self.rules is not None:
+            data["rules"] = self.rules
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Reliability":
+        try:
+            return decode_reliability(data)
+        except (TypeError, ValueError):
+            return RELIABILITY_SCHEMA.load(data)
 
 
 class ReliabilitySchema(Schema):
     status = fields.Bool(required=True)
     period = fields.Nested(PeriodSchema, allow_none=True, required=True)
+    rules = fields.Dict(keys=fields.Str(), values=fields.Bool(), missing=None)
+
+    class Meta:
+        ordered = True
+
+    @post_load
+    def make_model(self, data: Dict, **kwargs) -> Reliability:
+        return Reliability(**data)
+
+    # Only the rule engine reports the rules.
+    @post_dump
+    def remove_rules(self, data: Dict, **kwargs) -> Dict:
+        if data["rules"] is None:
+            del data["rules"]
+        return data
+
+
+PERIOD_SCHEMA: Final = PeriodSchema()
+RELIABILITY_SCHEMA: Final = ReliabilitySchema()
+
+PERIOD_FIELDS: Final = frozenset(PERIOD_SCHEMA.fields)
+RELIABILITY_FIELDS: Final = frozenset(RELIABILITY_SCHEMA.fields) - {"rules"}
+RULED_RELIABILITY_FIELDS: Final = RELIABILITY_FIELDS | {"rules"}
+
+
+def parse_date(value: str) -> date:
+    if type(value) is not str:
+        raise TypeError(value)
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+# Fast paths below accept only payloads the schemas would load unchanged,
+# anything else raises and is handed over to the schemas to report errors.
+def decode_period(data: Dict) -> Period:
+    if type(data) is not dict or data.keys() != PERIOD_FIELDS:
+        raise TypeError(data)
+
+    registered_at = parse_date(data["registered_at"])
+    updated_at = parse_date(data["updated_at"])
+
+    return Period(registered_at, updated_at)
+
+
+def decode_rules(data: Dict) -> Dict[str, bool]:
+    if type(data) is not dict:
+        raise TypeError(data)
+
+    for outcome in data.values():
+        if type(outcome) is not bool:
+            raise TypeError(outcome)
+
+    return data
+
+
+def decode_reliability(data: Dict) -> Reliability:
+    if type(data) is not dict:
+        raise TypeError(data)
+
+    keys = data.keys()
+    if keys != RELIABILITY_FIELDS and keys != RULED_RELIABILITY_FIELDS:
+        raise TypeError(data)
+
+    status = data["status"]
+    if type(status) is not bool:
+        raise TypeError(status)
+
+    period = data["period"]
+    if period is not None:
+        period = decode_period(period)
+
+    rules = data.get("rules")
+    if rules is not None:
+        rules = decode_rules(rules)
+
+    return Reliability(status, period, rules)
+
+
+def dump_reliability(reliability: Reliability) -> bytes:
+    return orjson.dumps(reliability.to_dict())
+
+
+def load_reliability(data: bytes) -> Reliability:
+    return decode_reliability(orjson.loads(data))
+
+
+# Reliabilities are either queried with the SQL rules of the Hunter
+# queries, or evaluated in-process over the fetched submission rows.
+class ReliabilityMode(str, Enum):
+    SQL = "sql"
+    RULES = "rules"
+
+
+class PlanCheck(str, Enum):
+    OFF = "off"
+    WARN = "warn"
+    FAIL = "fail"
+
+
+# Any valid hash will do, the plans do not depend on the value.
+EXPLAIN_PHONE_HASH: Final = "0" * 64
+
+
+@attr.s(slots=True, frozen=True)
+class QueryPlan:
+    name: str = attr.ib()
+    lines: Tuple[str, ...] = attr.ib()
+    full_scan: bool = attr.ib()
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "full_scan": self.full_scan,
+            "plan": list(self.lines),
+        }
+
+
+# Sequential scans are disabled for the statement, so the planner picks
+# an index whenever there is a usable one, even on a small table.
+def explain_postgresql(
+    connection: sa.engine.Connection,
+    statement: sa.engine.Compiled,
+    name: str,
+) -> List[str]:
+    params = statement.construct_params({"phone_hash": EXPLAIN_PHONE_HASH})
+
+    transaction = connection.begin()
+    try:
+        connection.execute("SET LOCAL enable_seqscan = off")
+        rows = connection.execute("EXPLAIN " + statement.string, params)
+        return [row[0] for row in rows]
+    finally:
+        transaction.rollback()
+
+
+def explain_oracle(
+    connection: sa.engine.Connection,
+    statement: sa.engine.Compiled,
+    name: str,
+) -> List[str]:
+    statement_id = f"vertical_{name}"
+
+    transaction = connection.begin()
+    try:
+        connection.execute(
+            "DELETE FROM plan_table WHERE statement_id = :statement_id",
+            {"statement_id": statement_id},
+        )
+        connection.execute(
+            f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR "
+            + statement.string,
+        )
+        rows = connection.execute(
+            "SELECT plan_table_output FROM TABLE(DBMS_XPLAN.DISPLAY("
+            "'PLAN_TABLE', :statement_id, 'BASIC'))",
+            {"statement_id": statement_id},
+        )
+        return [row[0] for row in rows]
+    finally:
+        transaction.rollback()
+
+
+EXPLAINERS: Final = {
+    "postgresql": explain_postgresql,
+    "oracle": explain_oracle,
+}
+
+FULL_SCAN_PATTERNS: Final = {
+    "postgresql": r"Seq Scan on {table}\b",
+    "oracle": r"ACCESS (?:STORAGE )?FULL\s*\|\s*{table}\b",
+}
+
+
+GENERATIONS_TABLE: Final = "generations"
+
+
+# Every refresh of the Hunter data bumps the generation of the refreshed
+# table, see `python -m vertical.refresh`.
+def make_generations_table(metadata: sa.MetaData) -> sa.Table:
+    return sa.Table(
+        GENERATIONS_TABLE,
+        metadata,
+        sa.Column("name", sa.VARCHAR(64), primary_key=True),
+        sa.Column("generation", sa.BIGINT(), nullable=False),
+        sa.Column("refreshed_at", sa.TIMESTAMP(), nullable=False),
+    )
 
 
 def make_hash(data: str) -> str:
@@ -58,7 +332,7 @@ def make_hash(data: str) -> str:
     return hashed.hexdigest().upper()
 
 
-class HunterServiceConfig(TypedDict):
+class HunterServiceBaseConfig(TypedDict):
     bind: SQLAlchemyEngineConfig
     days: int
     schema: str
@@ -67,10 +341,98 @@ class HunterServiceConfig(TypedDict):
     logger: LoggerConfig
 
 
+# The schema has defaults for the rest of the keys.
+class HunterServiceConfig(HunterServiceBaseConfig, total=False):
+    reliability_cache: CacheConfig
+    plan_check: str
+    generation_poll_interval: float
+    chunk_size: int
+    coalesce_window: float
+    coalesce_size: int
+    executor_workers: Optional[int]
+    executor_queue_size: int
+    reliability_mode: str
+
+
 class HunterException(Exception):
     pass
 
 
+# Phone hashes submitted within `window` seconds (or until `size` of them
+# are pending) are queried together and the rows are fanned back out.
+class HunterCoalescer:
+
+    __slots__ = (
+        "_query",
+        "_window",
+        "_size",
+        "_pending",
+        "_timer",
+        "_batches",
+    )
+
+    def __init__(
+        self,
+        query: Callable[[Sequence[str]], Awaitable[List[Reliability]]],
+        window: float,
+        size: int,
+    ):
+        self._query = query
+        self._window = window
+        self._size = size
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def submit(self, phone_hash: str) -> Reliability:
+        loop = asyncio.get_running_loop()
+
+        future = loop.create_future()
+        self._pending.append((phone_hash, future))
+
+        if len(self._pending) >= self._size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        batch = asyncio.create_task(self.execute(pending))
+        self._batches.add(batch)
+        batch.add_done_callback(self._batches.discard)
+
+    async def execute(self, pending: List[Tuple[str, asyncio.Future]]) -> None:
+        # The same phone may be verified by several callers at once.
+        phone_hashes = list(dict.fromkeys(hashed for hashed, _ in pending))
+
+        try:
+            reliabilities = await self._query(phone_hashes)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = dict(zip(phone_hashes, reliabilities))
+        for phone_hash, future in pending:
+            # Cancelled when the caller is timed out.
+            if not future.done():
+                future.set_result(results[phone_hash])
+
+    async def close(self) -> None:
+        self.flush()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+
 class HunterService:
 
     __slots__ = (
@@ -81,6 +443,25 @@ class HunterService:
         "_hash_factory",
         "_timeout",
         "_logger",
+        "_reliabilities",
+        "_period_query",
+        "_status_query",
+        "_periods_query",
+        "_statuses_query",
+        "_submissions_query",
+        "_plan_check",
+        "_plans",
+        "_generations",
+        "_generation_query",
+        "_ping_query",
+        "_generation",
+        "_generation_poll_interval",
+        "_generation_poller",
+        "_chunk_size",
+        "_coalescer",
+        "_executor",
+        "_reliability_mode",
+        "_rules",
     )
 
     def __init__(
@@ -91,6 +472,15 @@ class HunterService:
         table: str,
         timeout: float,
         logger: logging.Logger,
+        reliability_cache: Optional[TTLCache] = None,
+        plan_check: str = PlanCheck.WARN,
+        generation_poll_interval: float = 0,
+        chunk_size: int = 500,
+        coalesce_window: float = 0,
+        coalesce_size: int = 100,
+        executor_workers: Optional[int] = None,
+        executor_queue_size: int = 50,
+        reliability_mode: str = ReliabilityMode.SQL,
     ):
         self._days = days
         self._bind = bind
@@ -98,6 +488,11 @@ class HunterService:
         self._timeout = timeout
         self._logger = logger
 
+        # Keyed by phone hashes, so the snapshot holds no phone numbers.
+        self._reliabilities = reliability_cache
+        if reliability_cache is None:
+            self._reliabilities = TTLCache()
+
         self._submissions = sa.Table(
             table,
             self._metadata,
@@ -106,21 +501,170 @@ class HunterService:
             sa.Column("tel", sa.VARCHAR(64), nullable=False),
             sa.Column("phk1", sa.VARCHAR(64), nullable=False),
             sa.Column("dob", sa.VARCHAR(64), nullable=False),
+            sa.Index(f"{table}_tel_index", "tel"),
         )
 
+        self._generations = make_generations_table(self._metadata)
+
         self._hash_factory = make_hash
 
-    def setup(self) -> None:
+        # Compiled once, so the calls only bind the phone hash.
+        dialect = bind.dialect
+        self._period_query = self.period_query().compile(dialect=dialect)
+        self._status_query = self.status_query().compile(dialect=dialect)
+        self._periods_query = self.periods_query().compile(dialect=dialect)
+        self._statuses_query = self.statuses_query().compile(dialect=dialect)
+        self._submissions_query = self.submissions_query().compile(
+            dialect=dialect,
+        )
+        self._generation_query = self.generation_query().compile(
+            dialect=dialect,
+        )
+        self._ping_query = self.ping_query().compile(dialect=dialect)
+
+        self._plan_check = PlanCheck(plan_check)
+        self._plans: List[QueryPlan] = []
+
+        # Cached reliabilities belong to the generation of the Hunter data
+        # they were queried from, the cache is cleared when it changes.
+        self._generation = 0
+        self._generation_poll_interval = generation_poll_interval
+        self._generation_poller: Optional[asyncio.Task] = None
+
+        self._chunk_size = chunk_size
+
+        # Sized to the engine pool, so the queries never wait for
+        # a connection in a thread, but are rejected when too many queue.
+        self._executor = BoundedExecutor(
+            workers=(
+                executor_workers
+                or pool_capacity(bind)
+                or DEFAULT_EXECUTOR_WORKERS
+            ),
+            queue_size=executor_queue_size,
+            thread_name_prefix="hunter",
+        )
+
+        # Every rule added to the engine is evaluated over the same rows,
+        # at the cost of CPU time only.
+        self._reliability_mode = ReliabilityMode(reliability_mode)
+        self._rules: Optional["RuleEngine"] = None
+        if self._reliability_mode is ReliabilityMode.RULES:
+            # Imported only in this mode, numpy takes tens of milliseconds
+            # to import.
+            from . import rules
+
+            self._rules = rules.RuleEngine()
+            self._rules.add_rule(STATUS_RULE, rules.span_rule(days))
+
+        self._coalescer: Optional[HunterCoalescer] = None
+        if coalesce_window > 0:
+            self._coalescer = HunterCoalescer(
+                self.query_reliabilities,
+                coalesce_window,
+                coalesce_size,
+            )
+
+    async def setup(self) -> None:
         self._bind.connect()
 
         schema = self._metadata.schema
         self._logger.info("Connected to Hunter '%s' schema", schema)
 
-    def cleanup(self) -> None:
+        if self._plan_check is not PlanCheck.OFF:
+            self.check_plans()
+
+        if self._generation_poll_interval > 0:
+            try:
+                self._generation = self.get_generation()
+            except sa.exc.DBAPIError as e:
+                self._logger.warning("Could not get data generation: %s", e)
+
+            self._generation_poller = asyncio.create_task(
+                self.poll_generation_loop(),
+            )
+
+        loaded = self._reliabilities.load(
+            load_reliability,
+            self.cache_version(),
+            self._generation,
+        )
+        if loaded:
+            self._logger.info("Loaded %d cached reliabilities", loaded)
+
+    async def cleanup(self) -> None:
+        if self._generation_poller:
+            self._generation_poller.cancel()
+
+        if self._coalescer:
+            await self._coalescer.close()
+
+        await run_in_threadpool(self._executor.shutdown)
         self._bind.dispose()
 
+        saved = self._reliabilities.save(
+            dump_reliability,
+            self.cache_version(),
+            self._generation,
+        )
+        if saved:
+            self._logger.info("Saved %d cached reliabilities", saved)
+
+    def explain(self) -> List[QueryPlan]:
+        dialect = self._bind.dialect.name
+        explainer = EXPLAINERS[dialect]
+
+        table = re.escape(self._submissions.name)
+        pattern = FULL_SCAN_PATTERNS[dialect].format(table=table)
+        full_scan = re.compile(pattern, re.IGNORECASE)
+
+        statements = (
+            ("status", self._status_query),
+            ("period", self._period_query),
+        )
+
+        plans = []
+        with self._bind.connect() as connection:
+            for name, statement in statements:
+                lines = explainer(connection, statement, name)
+                plans.append(QueryPlan(
+                    name=name,
+                    lines=tuple(lines),
+                    full_scan=any(full_scan.search(line) for line in lines),
+                ))
+        return plans
+
+    def check_plans(self) -> None:
+        dialect = self._bind.dialect.name
+        if dialect not in EXPLAINERS:
+            self._logger.info("Query plans are not checked on %s", dialect)
+            return
+
+        try:
+            self._plans = self.explain()
+        except sa.exc.DBAPIError as e:
+            message = "Could not explain Hunter queries"
+            if self._plan_check is PlanCheck.FAIL:
+                raise HunterException(message) from e
+            self._logger.warning("%s: %s", message, e)
+            return
+
+        table = self._submissions.name
+        for plan in self._plans:
+            if not plan.full_scan:
+                continue
+
+            message = f"Hunter {plan.name} query scans the whole {table}"
+            if self._plan_check is PlanCheck.FAIL:
+                raise HunterException(message)
+            self._logger.warning(message)
+
+    def plans(self) -> List[QueryPlan]:
+        return self._plans
+
     def make_hash(self, data: str) -> str:
-        return self._hash_factory(data)
+        with span("hunter.hash"):
+            return self._hash_factory(data)
 
     def metadata(self) -> sa.MetaData:
         return self._metadata
@@ -128,10 +672,26 @@ class HunterService:
     def submissions(self) -> sa.Table:
         return self._submissions
 
+    def generations(self) -> sa.Table:
+        return self._generations
+
     def timeout(self) -> float:
         return self._timeout
 
-    def get_period(self, phone_hash: str) -> Optional[Period]:
+    def reliability_mode(self) -> ReliabilityMode:
+        return self._reliability_mode
+
+    def cache_version(self) -> int:
+        if self._reliability_mode is ReliabilityMode.RULES:
+            return RULES_CACHE_VERSION
+        return RELIABILITY_CACHE_VERSION
+
+    def add_rule(self, name: str, rule: "Rule") -> None:
+        if self._rules is None:
+            raise HunterException("Rules are evaluated in the rules mode only")
+        self._rules.add_rule(name, rule)
+
+    def period_query(self) -> sa.sql.Select:
         submissions = self.submissions()
 
         registered_at = sa.func.min(submissions.c.creation_datetime)
@@ -142,14 +702,13 @@ class HunterService:
             updated_at.label("updated_at"),
         )
 
-        query = sa.select(columns).where(submissions.c.tel == phone_hash)
-        registered_at, updated_at = self._bind.execute(query).fetchone()
-
-        if registered_at is not None:
-            return Period(registered_at, updated_at)
-        return None
+        return sa.select(
+            columns
+        ).where(
+            submissions.c.tel == sa.bindparam("phone_hash"),
+        )
 
-    def get_status(self, phone_hash: str) -> bool:
+    def status_query(self) -> sa.sql.Select:
         submissions = self.submissions()
 
         registered_at = sa.func.min(submissions.c.creation_datetime)
@@ -160,46 +719,317 @@ class HunterService:
         deltas = sa.select(
             [delta]
         ).where(
-            submissions.c.tel == phone_hash,
+            submissions.c.tel == sa.bindparam("phone_hash"),
         ).group_by(
             submissions.c.tel,
             submissions.c.phk1,
             submissions.c.dob,
         ).alias("deltas")
 
-        query = sa.select(
+        return sa.select(
             [deltas.c.delta]
         ).where(
             deltas.c.delta > self._days
         ).limit(1)
 
-        return self._bind.execute(query).scalar() is not None
+    # Set based variants of the queries above for a batch of phone hashes,
+    # e.g. to score offline phone lists (see `python -m vertical.score`).
+    def periods_query(self) -> sa.sql.Select:
+        submissions = self.submissions()
+
+        registered_at = sa.func.min(submissions.c.creation_datetime)
+        updated_at = sa.func.max(submissions.c.creation_datetime)
+
+        columns = (
+            submissions.c.tel,
+            registered_at.label("registered_at"),
+            updated_at.label("updated_at"),
+        )
+
+        phone_hashes = sa.bindparam("phone_hashes", expanding=True)
+
+        return sa.select(
+            columns
+        ).where(
+            submissions.c.tel.in_(phone_hashes),
+        ).group_by(
+            submissions.c.tel,
+        )
+
+    def statuses_query(self) -> sa.sql.Select:
+        submissions = self.submissions()
+
+        registered_at = sa.func.min(submissions.c.creation_datetime)
+        updated_at = sa.func.max(submissions.c.creation_datetime)
+
+        delta = (updated_at - registered_at).label("delta")
+
+        phone_hashes = sa.bindparam("phone_hashes", expanding=True)
+
+        deltas = sa.select(
+            [submissions.c.tel, delta]
+        ).where(
+            submissions.c.tel.in_(phone_hashes),
+        ).group_by(
+            submissions.c.tel,
+            submissions.c.phk1,
+            submissions.c.dob,
+        ).alias("deltas")
+
+        return sa.select(
+            [deltas.c.tel]
+        ).where(
+            deltas.c.delta > self._days
+        ).distinct()
+
+    # The rows the rule engine evaluates, fetched once for all the rules.
+    def submissions_query(self) -> sa.sql.Select:
+        submissions = self.submissions()
+
+        columns = (
+            submissions.c.tel,
+            submissions.c.phk1,
+            submissions.c.dob,
+            submissions.c.creation_datetime,
+        )
+
+        phone_hashes = sa.bindparam("phone_hashes", expanding=True)
+
+        return sa.select(
+            columns
+        ).where(
+            submissions.c.tel.in_(phone_hashes),
+        )
+
+    def generation_query(self) -> sa.sql.Select:
+        generations = self.generations()
+
+        return sa.select(
+            [generations.c.generation]
+        ).where(
+            generations.c.name == self._submissions.name,
+        )
+
+    def ping_query(self) -> sa.sql.Select:
+        return sa.select([sa.literal_column("1")])
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get_generation(self) -> int:
+        return self._bind.execute(self._generation_query).scalar() or 0
+
+    async def poll_generation(self) -> None:
+        generation = await self.run(self.get_generation)
+        if generation == self._generation:
+            return
+
+        self._reliabilities.clear()
+        self._generation = generation
+        self._logger.info("Hunter data generation is %d", generation)
+
+    async def poll_generation_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._generation_poll_interval)
+            try:
+                await self.poll_generation()
+            except Exception as e:
+                self._logger.warning(f"Could not poll data generation: {e}")
+
+    def get_period(self, phone_hash: str) -> Optional[Period]:
+        with span("hunter.period"):
+            result = self._bind.execute(
+                self._period_query,
+                phone_hash=phone_hash,
+            ).fetchone()
+
+        registered_at, updated_at = result
+
+        if registered_at is not None:
+            return Period(registered_at, updated_at)
+        return None
+
+    def get_status(self, phone_hash: str) -> bool:
+        with span("hunter.status"):
+            result = self._bind.execute(
+                self._status_query,
+                phone_hash=phone_hash,
+            )
+            return result.scalar() is not None
+
+    def get_reliabilities(
+        self,
+        phone_hashes: Sequence[str],
+    ) -> List[Reliability]:
+        if not phone_hashes:
+            return []
+
+        params = {"phone_hashes": list(phone_hashes)}
+
+        with self._bind.connect() as connection:
+            rows = connection.execute(self._statuses_query, params)
+            statuses = {phone_hash for phone_hash, in rows}
+
+            rows = connection.execute(self._periods_query, params)
+            periods = {
+                phone_hash: Period(registered_at, updated_at)
+                for phone_hash, registered_at, updated_at in rows
+            }
+
+        return [
+            Reliability(
+                status=phone_hash in statuses,
+                period=periods.get(phone_hash),
+            )
+            for phone_hash in phone_hashes
+        ]
+
+    def get_rule_reliabilities(
+        self,
+        phone_hashes: Sequence[str],
+    ) -> List[Reliability]:
+        if not phone_hashes:
+            return []
+
+        # A batch may verify the same phone more than once.
+        unique = list(dict.fromkeys(phone_hashes))
+        params = {"phone_hashes": unique}
+
+        with span("hunter.submissions"):
+            rows = self._bind.execute(self._submissions_query, params)
+            submissions = self._rules.submissions(unique, rows)
+
+        with span("hunter.rules"):
+            outcomes = self._rules.evaluate(submissions)
+
+        results = {}
+        for phone_hash, period, rules in zip(
+            unique,
+            submissions.periods(),
+            outcomes,
+        ):
+            results[phone_hash] = Reliability(
+                status=rules[STATUS_RULE],
+                period=None if period is None else Period(*period),
+                rules=rules,
+            )
+        return [results[phone_hash] for phone_hash in phone_hashes]
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        try:
+            return await self._executor.run(func, *args)
+        except ExecutorFull as e:
+            self._logger.warning(f"Hunter executor is full: {e}")
+            raise HunterException("Too many Hunter queries are queued")
+
+    def executor_stats(self) -> Dict[str, Any]:
+        return self._executor.stats()
+
+    def get_ping(self) -> bool:
+        with span("hunter.ping"):
+            return self._bind.execute(self._ping_query).scalar() == 1
+
+    async def ping(self) -> bool:
+        return await self.run(self.get_ping)
+
+    async def query_reliability(self, phone_hash: str) -> Reliability:
+        if self._rules is not None:
+            reliabilities = await self.query_reliabilities([phone_hash])
+            return reliabilities[0]
+
+        status, period = await asyncio.gather(
+            self.run(self.get_status, phone_hash),
+            self.run(self.get_period, phone_hash),
+        )
+        return Reliability(status=status, period=period)
+
+    async def query_reliabilities(
+        self,
+        phone_hashes: Sequence[str],
+    ) -> List[Reliability]:
+        if self._rules is not None:
+            return await self.run(self.get_rule_reliabilities, phone_hashes)
+        return await self.run(self.get_reliabilities, phone_hashes)
 
     async def verify(self, phone_number: str) -> Reliability:
         phone_hash = self.make_hash(phone_number)
 
-        gather = asyncio.gather(
-            run_in_threadpool(self.get_status, phone_hash),
-            run_in_threadpool(self.get_period, phone_hash),
-        )
+        key = bytes.fromhex(phone_hash)
+        reliability = self._reliabilities.get(key)
+        if reliability is not None:
+            return reliability
+
+        generation = self._generation
+
+        if self._coalescer is None:
+            query = self.query_reliability(phone_hash)
+        else:
+            query = self._coalescer.submit(phone_hash)
 
         self._logger.info("Started reliability query")
         started_at = time.perf_counter()
 
         try:
-            status, period = await asyncio.wait_for(
-                gather,
-                self.timeout(),
-            )
+            reliability = await asyncio.wait_for(query, self.timeout())
         except asyncio.TimeoutError:
             self._logger.warning("Hunter query time is up")
             raise HunterException("Hunted query exceeded the given timeout")
         else:
-            return Reliability(status=status, period=period)
+            if generation == self._generation:
+                self._reliabilities.set(key, reliability)
+            return reliability
         finally:
             elapsed = time.perf_counter() - started_at
             self._logger.info("Query execution time: %.4f ms", elapsed)
 
+    def make_hashes(self, phone_numbers: Sequence[str]) -> List[str]:
+        return [self._hash_factory(number) for number in phone_numbers]
+
+    async def verify_chunk(
+        self,
+        phone_numbers: Sequence[str],
+    ) -> List[Reliability]:
+        phone_hashes = await run_in_threadpool(self.make_hashes, phone_numbers)
+
+        keys = [bytes.fromhex(phone_hash) for phone_hash in phone_hashes]
+        reliabilities = [self._reliabilities.get(key) for key in keys]
+
+        missing = [
+            index
+            for index, reliability in enumerate(reliabilities)
+            if reliability is None
+        ]
+        if not missing:
+            return reliabilities
+
+        generation = self._generation
+
+        query = self.query_reliabilities(
+            [phone_hashes[index] for index in missing],
+        )
+
+        try:
+            queried = await asyncio.wait_for(query, self.timeout())
+        except asyncio.TimeoutError:
+            self._logger.warning("Hunter batch query time is up")
+            raise HunterException("Hunted query exceeded the given timeout")
+
+        for index, reliability in zip(missing, queried):
+            reliabilities[index] = reliability
+            if generation == self._generation:
+                self._reliabilities.set(keys[index], reliability)
+        return reliabilities
+
+    # Yields the reliabilities of every `chunk_size` phone numbers as soon
+    # as their batch query completes, so the results can be streamed.
+    async def verify_chunks(
+        self,
+        phone_numbers: Sequence[str],
+    ) -> AsyncIterator[List[Reliability]]:
+        for start in range(0, len(phone_numbers), self._chunk_size):
+            chunk = phone_numbers[start:start + self._chunk_size]
+            yield await self.verify_chunk(chunk)
+
     @classmethod
     def from_config(cls, config: HunterServiceConfig) -> "HunterService":
         return HunterServiceSchema().load(config)
@@ -212,6 +1042,37 @@ class HunterServiceSchema(Schema):
     table = fields.Str(required=True)
     timeout = fields.Float(required=True)
     logger = fields.Nested(LoggerSchema, required=True)
+    reliability_cache = fields.Nested(CacheSchema, missing=None)
+    plan_check = fields.Str(
+        missing=PlanCheck.WARN.value,
+        validate=validate.OneOf([check.value for check in PlanCheck]),
+    )
+    generation_poll_interval = fields.Float(missing=0)
+    chunk_size = fields.Int(
+        missing=500,
+        validate=validate.Range(min=1, max=MAX_CHUNK_SIZE),
+    )
+    coalesce_window = fields.Float(
+        missing=0,
+        validate=validate.Range(min=0),
+    )
+    coalesce_size = fields.Int(
+        missing=100,
+        validate=validate.Range(min=1, max=MAX_CHUNK_SIZE),
+    )
+    executor_workers = fields.Int(
+        missing=None,
+        allow_none=True,
+        validate=validate.Range(min=1),
+    )
+    executor_queue_size = fields.Int(
+        missing=50,
+        validate=validate.Range(min=0),
+    )
+    reliability_mode = fields.Str(
+        missing=ReliabilityMode.SQL.value,
+        validate=validate.OneOf([mode.value for mode in ReliabilityMode]),
+    )
 
     class Meta:
         unknown = EXCLUDE
@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import logging
+from http import HTTPStatus
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Final,
+    Optional,
+    Protocol,
+    TypedDict,
+)
+from uuid import UUID
+
+import attr
+import orjson
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
+from starlette.responses import Response
+
+from vertical import hdrs
+
+from .auth import IdempotencyKey
+from .cache import TTLCache
+from .log import LoggerConfig, LoggerSchema, app_logger
+from .media import is_msgpack, unpack
+from .responses import create_response
+
+__all__ = (
+    "MAX_KEY_LENGTH",
+    "IdempotencyException",
+    "InvalidIdempotencyKey",
+    "IdempotencyKeyReused",
+    "IdempotencyKeyInProgress",
+    "IdempotencyKeyStore",
+    "IdempotencyGuardConfig",
+    "IdempotencyGuard",
+    "IdempotencyGuardSchema",
+    "request_digest",
+)
+
+MAX_KEY_LENGTH: Final = 255
+
+# Responses of failed requests are not stored, so they are retried.
+MAX_STORED_STATUS: Final = HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+class IdempotencyException(Exception):
+    http_status = HTTPStatus.BAD_REQUEST
+
+    def render(self) -> str:
+        raise NotImplementedError()
+
+
+class InvalidIdempotencyKey(IdempotencyException):
+
+    def render(self) -> str:
+        return f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+
+
+class IdempotencyKeyReused(IdempotencyException):
+    http_status = HTTPStatus.UNPROCESSABLE_ENTITY
+
+    def render(self) -> str:
+        return "Idempotency-Key was used with another request body"
+
+
+class IdempotencyKeyInProgress(IdempotencyException):
+    http_status = HTTPStatus.CONFLICT
+
+    def render(self) -> str:
+        return "Request with this Idempotency-Key is in progress"
+
+
+# The part of the auth service that keeps the keys.
+class IdempotencyKeyStore(Protocol):
+
+    async def claim_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+        request_digest: str,
+        window: float,
+        lock_timeout: float,
+    ) -> Optional[IdempotencyKey]: ...
+
+    async def complete_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+        code: int,
+        body: Any,
+    ) -> None: ...
+
+    async def release_idempotency_key(
+        self,
+        contract_id: UUID,
+        key: str,
+    ) -> None: ...
+
+    async def purge_idempotency_keys(self, window: float) -> None: ...
+
+
+@attr.s(slots=True, frozen=True)
+class StoredResponse:
+    code: int = attr.ib()
+    content: Any = attr.ib()
+    request_digest: str = attr.ib()
+
+
+class IdempotencyGuardConfig(TypedDict, total=False):
+    window: float
+    lock_timeout: float
+    poll_interval: float
+    cache_size: int
+    logger: LoggerConfig
+
+
+def request_digest(content: Optional[bytes]) -> str:
+    return hashlib.sha256(content or b"").hexdigest()
+
+
+def response_content(response: Response) -> Any:
+    content_type = response.headers.get(hdrs.CONTENT_TYPE, "")
+    if is_msgpack(content_type):
+        return unpack(response.body)
+    return orjson.loads(response.body)
+
+
+# The first completed response of a key is stored in the auth database
+# and in the worker's cache. Duplicates in the same worker wait on the
+# running request, duplicates in other workers poll the stored key.
+class IdempotencyGuard:
+
+    __slots__ = (
+        "_auth_service",
+        "_window",
+        "_lock_timeout",
+        "_poll_interval",
+        "_logger",
+        "_responses",
+        "_running",
+        "_purger",
+    )
+
+    def __init__(
+        self,
+        auth_service: IdempotencyKeyStore,
+        window: float,
+        lock_timeout: float,
+        poll_interval: float,
+        logger: logging.Logger,
+        cache_size: int = 10000,
+    ):
+        self._auth_service = auth_service
+        self._window = window
+        self._lock_timeout = lock_timeout
+        self._poll_interval = poll_interval
+        self._logger = logger
+
+        self._responses = TTLCache(ttl=window, max_size=cache_size)
+        self._running: Dict[bytes, asyncio.Future] = {}
+        self._purger: Optional[asyncio.Task] = None
+
+    async def setup(self) -> None:
+        self._purger = asyncio.create_task(self.purge_loop())
+
+    async def cleanup(self) -> None:
+        if self._purger:
+            self._purger.cancel()
+
+    async def purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._window)
+            try:
+                await self._auth_service.purge_idempotency_keys(self._window)
+            except Exception as e:
+                self._logger.warning(f"Could not purge idempotency keys: {e}")
+
+    async def run(
+        self,
+        contract_id: UUID,
+        key: str,
+        digest: str,
+        call: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise InvalidIdempotencyKey()
+
+        cache_key = contract_id.bytes + key.encode("utf-8")
+
+        stored = self._responses.get(cache_key)
+        if stored is None and cache_key in self._running:
+            stored = await asyncio.shield(self._running[cache_key])
+        if stored is None:
+            stored = await self.claim(contract_id, key, digest)
+
+        if stored is not None:
+            if stored.request_digest != digest:
+                raise IdempotencyKeyReused()
+            return replay(stored)
+
+        running = asyncio.get_running_loop().create_future()
+        self._running[cache_key] = running
+        try:
+            response = await call()
+        except BaseException as e:
+            running.set_exception(e)
+            # Retrieved here, there may be no one waiting for it.
+            running.exception()
+            await self.release(contract_id, key)
+            raise
+        finally:
+            del self._running[cache_key]
+
+        stored = StoredResponse(
+            code=response.status_code,
+            content=response_content(response),
+            request_digest=digest,
+        )
+        running.set_result(stored)
+
+        if stored.code < MAX_STORED_STATUS:
+            self._responses.set(cache_key, stored)
+            await self._auth_service.complete_idempotency_key(
+                contract_id,
+                key,
+                stored.code,
+                stored.content,
+            )
+        else:
+            await self.release(contract_id, key)
+
+        return response
+
+    # Returns the stored response, or None once the key is claimed.
+    async def claim(
+        self,
+        contract_id: UUID,
+        key: str,
+        digest: str,
+    ) -> Optional[StoredResponse]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._lock_timeout
+
+        while True:
+            claimed = await self._auth_service.claim_idempotency_key(
+                contract_id,
+                key,
+                digest,
+                self._window,
+                self._lock_timeout,
+            )
+            if claimed and claimed.claimed:
+                return None
+            if claimed and claimed.is_completed():
+                return StoredResponse(
+                    code=claimed.code,
+                    content=claimed.body,
+                    request_digest=claimed.request_digest,
+                )
+
+            if loop.time() >= deadline:
+                raise IdempotencyKeyInProgress()
+            await asyncio.sleep(self._poll_interval)
+
+    async def release(self, contract_id: UUID, key: str) -> None:
+        try:
+            await self._auth_service.release_idempotency_key(contract_id, key)
+        except Exception as e:
+            self._logger.warning(f"Could not release idempotency key: {e}")
+
+    @classmethod
+    def from_config(
+        cls,
+        auth_service: IdempotencyKeyStore,
+        config: IdempotencyGuardConfig,
+    ) -> "IdempotencyGuard":
+        schema = IdempotencyGuardSchema(context={"auth_service": auth_service})
+        return schema.load(config)
+
+
+def replay(stored: StoredResponse) -> Response:
+    response = create_response(stored.content, stored.code)
+    response.headers[hdrs.IDEMPOTENT_REPLAYED] = "true"
+    return response
+
+
+class IdempotencyGuardSchema(Schema):
+    window = fields.Float(missing=3600, validate=validate.Range(min=1))
+    lock_timeout = fields.Float(missing=15, validate=validate.Range(min=0))
+    poll_interval = fields.Float(missing=0.05, validate=validate.Range(min=0))
+    cache_size = fields.Int(missing=10000, validate=validate.Range(min=1))
+    logger = fields.Nested(LoggerSchema, missing=lambda: app_logger)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @post_load
+    def release(self, data: Dict, **kwargs) -> IdempotencyGuard:
+        return IdempotencyGuard(self.context["auth_service"], **data)
@@ -4,7 +4,7 @@ from typing import Dict, TypedDict
 
 from marshmallow import EXCLUDE, Schema, fields, post_load
 
-from .context import REQUEST_ID
+from .context import REQUEST_ID, SPANS
 from .protocols import ResponseProtocol
 
 MISSING = "-"
@@ -13,6 +13,7 @@ app_logger = logging.getLogger("app")
 audit_logger = logging.getLogger("audit")
 access_logger = logging.getLogger("access")
 hunter_logger = logging.getLogger("hunter")
+maintenance_logger = logging.getLogger("maintenance")
 
 
 class LoggerConfig(TypedDict):
@@ -38,6 +39,8 @@ class AccessLogger:
         self._logger = logger
 
     def log(self, response: ResponseProtocol, request_time: float) -> None:
+        spans = SPANS.get()
+
         extra = {
             "request_time": round(request_time, 4),
             "request_id": response.request.identifier,
@@ -46,8 +49,9 @@ class AccessLogger:
             "user_agent": response.request.user_agent or MISSING,
             "method": response.request.method,
             "path": response.request.path,
-            "response_length": len(response.body),
+            "response_length": response.length,
             "response_code": response.code,
+            "spans": spans.render() if spans else MISSING,
         }
         self._logger.info("Access info", extra=extra)
 
@@ -91,6 +95,13 @@ CONFIG = {
             ],
             "propagate": False,
         },
+        maintenance_logger.name: {
+            "level": "INFO",
+            "handlers": [
+                "console",
+            ],
+            "propagate": False,
+        },
         "gunicorn.error": {
             "level": "INFO",
             "handlers": [
@@ -173,6 +184,7 @@ CONFIG = {
                 'response_length="%(response_length)d" '
                 'response_code="%(response_code)d" '
                 'request_time="%(request_time)s" '
+                'spans="%(spans)s" '
             ),
             "datefmt": "%Y.%m.%d %H:%M:%S",
         },
@@ -0,0 +1,59 @@
+from datetime import date
+from typing import Any, Final, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+__all__ = (
+    "JSON_MEDIA_TYPE",
+    "MSGPACK_MEDIA_TYPES",
+    "is_json",
+    "is_msgpack",
+    "accepted_msgpack",
+    "pack",
+    "unpack",
+)
+
+JSON_MEDIA_TYPE: Final = "application/json"
+MSGPACK_MEDIA_TYPES: Final = ("application/msgpack", "application/x-msgpack")
+
+
+def media_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def is_json(content_type: str) -> bool:
+    return content_type.startswith(JSON_MEDIA_TYPE)
+
+
+def is_msgpack(content_type: str) -> bool:
+    if msgpack is None:
+        return False
+    return media_type(content_type) in MSGPACK_MEDIA_TYPES
+
+
+# The MessagePack type named in the Accept header, answered with the same.
+def accepted_msgpack(accept: str) -> Optional[str]:
+    if msgpack is None:
+        return None
+    for msgpack_media_type in MSGPACK_MEDIA_TYPES:
+        if msgpack_media_type in accept:
+            return msgpack_media_type
+    return None
+
+
+# Dates are packed as strings, the way orjson serializes them.
+def default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Type is not MessagePack serializable: {type(value)}")
+
+
+def pack(content: Any) -> bytes:
+    return msgpack.packb(content, default=default)
+
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data)
@@ -1,24 +1,58 @@
 import time
-from typing import AsyncIterator, Sequence
+from types import AsyncGeneratorType
+from typing import AsyncIterator, Optional, Sequence, cast
+from uuid import UUID
 
 import orjson
 from starlette.applications import Starlette
+from starlette.background import BackgroundTask
 from starlette.middleware import base
 from starlette.requests import Request
 from starlette.responses import Response, StreamingResponse
 
 from vertical import hdrs
 
-from .adapters import RequestAdapter, ResponseAdapter
+from .adapters import RequestAdapter, ResponseAdapter, StreamedResponseAdapter
 from .auth import AuthService
-from .context import REQUEST_ID
+from .context import REQUEST_ID, RESPONSE_MEDIA_TYPE, SPANS
+from .health import PROBE_PATHS
 from .log import AccessLogger, access_logger, app_logger
-from .responses import bad_request, server_error, unsupported_media_type
+from .media import accepted_msgpack, is_json, is_msgpack, unpack
+from .protocols import ResponseProtocol
+from .responses import (
+    bad_request,
+    is_streamed,
+    server_error,
+    unsupported_media_type,
+)
+from .tracing import Spans, span
 from .utils import make_request_id
 
 __all__ = ("add_middlewares", )
 
 
+class TracingMiddleware(base.BaseHTTPMiddleware):
+
+    async def dispatch(
+        self,
+        request: Request,
+        handler: base.RequestResponseEndpoint,
+    ) -> Response:
+        spans = Spans()
+        token = SPANS.set(spans)
+
+        try:
+            response = await handler(request)
+        finally:
+            SPANS.reset(token)
+
+        identification = getattr(request.state, "identification", None)
+        if identification and identification.contract.client.is_admin():
+            response.headers[hdrs.SERVER_TIMING] = spans.render()
+
+        return response
+
+
 class RequestIdentifierMiddleware(base.BaseHTTPMiddleware):
 
     async def dispatch(
@@ -26,10 +60,13 @@ class RequestIdentifierMiddleware(base.BaseHTTPMiddleware):
         request: Request,
         handler: base.RequestResponseEndpoint,
     ) -> Response:
-        request_id = make_request_id()
+        # Every span covers the middleware's own work only, the time spent
+        # downstream is reported by the spans opened there.
+        with span("identifier"):
+            request_id = make_request_id()
 
-        token = REQUEST_ID.set(request_id)
-        request.state.identifier = request_id
+            token = REQUEST_ID.set(request_id)
+            request.state.identifier = request_id
 
         response = await handler(request)
         response.headers[hdrs.X_REQUEST_ID] = request_id
@@ -49,52 +86,96 @@ class ExceptionHandlerMiddleware(base.BaseHTTPMiddleware):
         try:
             return await handler(request)
         except Exception as e:
-            name = e.__class__.__name__
-            app_logger.error(f"Caught unhandled {name} exception: {e}")
-            return server_error()
+            with span("exceptions"):
+                name = e.__class__.__name__
+                app_logger.error(f"Caught unhandled {name} exception: {e}")
+                return server_error()
 
 
 class ContentTypeMiddleware(base.BaseHTTPMiddleware):
 
+    def __init__(
+        self,
+        app: base.ASGIApp,
+        dispatch: base.DispatchFunction = None,
+        *,
+        ignore_paths: Sequence[str] = None,
+    ):
+        super().__init__(app, dispatch)
+
+        self.ignore_paths = set(ignore_paths) if ignore_paths else set()
+
     async def dispatch(
         self,
         request: Request,
         handler: base.RequestResponseEndpoint,
     ) -> Response:
-        content_type = request.headers.get(hdrs.CONTENT_TYPE)
+        if request.url.path in self.ignore_paths:
+            return await handler(request)
 
-        if not content_type:
-            message = "Content-Type header not recognized"
-            app_logger.warning(message)
-            return bad_request(message)
+        with span("content_type"):
+            content_type = request.headers.get(hdrs.CONTENT_TYPE)
 
-        if not content_type.startswith("application/json"):
-            app_logger.warning(f"Unsupported Content-Type: {content_type}")
-            return unsupported_media_type()
+            if not content_type:
+                message = "Content-Type header not recognized"
+                app_logger.warning(message)
+                return bad_request(message)
 
-        return await handler(request)
+            if not is_json(content_type) and not is_msgpack(content_type):
+                app_logger.warning(f"Unsupported Content-Type: {content_type}")
+                return unsupported_media_type()
+
+            accept = request.headers.get(hdrs.ACCEPT, "")
+            token = RESPONSE_MEDIA_TYPE.set(accepted_msgpack(accept))
+
+        response = await handler(request)
+
+        RESPONSE_MEDIA_TYPE.reset(token)
+
+        return response
 
 
 class JsonParserMiddleware(base.BaseHTTPMiddleware):
 
+    def __init__(
+        self,
+        app: base.ASGIApp,
+        dispatch: base.DispatchFunction = None,
+        *,
+        ignore_paths: Sequence[str] = None,
+    ):
+        super().__init__(app, dispatch)
+
+        self.ignore_paths = set(ignore_paths) if ignore_paths else set()
+
     async def dispatch(
         self,
         request: Request,
         handler: base.RequestResponseEndpoint,
     ) -> Response:
-        body = await request.body()
-
-        try:
-            json = orjson.loads(body)
-        except ValueError:
-            if body:
-                message = "Could not parse request body"
-                app_logger.warning(message)
-                return bad_request(message)
-            json = {}
+        if request.url.path in self.ignore_paths:
+            return await handler(request)
 
-        request.state.body = body
-        request.state.json = json
+        with span("json_parser"):
+            body = await request.body()
+            content_type = request.headers.get(hdrs.CONTENT_TYPE, "")
+
+            try:
+                if body and is_msgpack(content_type):
+                    json = unpack(body)
+                    # Audited in the decoded form, as JSON.
+                    body = orjson.dumps(json)
+                else:
+                    json = orjson.loads(body)
+            except (TypeError, ValueError):
+                if body:
+                    message = "Could not parse request body"
+                    app_logger.warning(message)
+                    return bad_request(message)
+                json = {}
+
+            request.state.body = body
+            request.state.json = json
 
         return await handler(request)
 
@@ -126,19 +207,139 @@ class AccessMiddleware(base.BaseHTTPMiddleware):
         auth_service: AuthService = request.app.state.auth_service
 
         request_adapter = RequestAdapter(request)
+        if auth_service.is_consolidated():
+            return await self.dispatch_consolidated(
+                request,
+                request_adapter,
+                handler,
+                started_at,
+            )
+
         await auth_service.save_request(request_adapter)
 
-        streaming: StreamingResponse = await handler(request)  # type: ignore
-        response: Response = await resolve_response(streaming)
+        streaming: StreamingResponse
+        streaming = await handler(request)  # type: ignore
+        if is_streamed(streaming):
+            return self.stream(
+                request,
+                request_adapter,
+                streaming,
+                started_at,
+            )
+        with span("access"):
+            response: Response = await resolve_response(streaming)
 
         # TODO: we should try to do this in the background
         response_adapter = ResponseAdapter(request_adapter, response)
         await auth_service.save_response(response_adapter)
 
+        await self.finalize(request, response_adapter, started_at)
+
+        return response
+
+    async def dispatch_consolidated(
+        self,
+        request: Request,
+        request_adapter: RequestAdapter,
+        handler: base.RequestResponseEndpoint,
+        started_at: float,
+    ) -> Response:
+        auth_service: AuthService = request.app.state.auth_service
+
+        try:
+            streaming: StreamingResponse
+            streaming = await handler(request)  # type: ignore
+            if is_streamed(streaming):
+                return self.stream(
+                    request,
+                    request_adapter,
+                    streaming,
+                    started_at,
+                )
+            with span("access"):
+                response: Response = await resolve_response(streaming)
+        except Exception:
+            contract_id = get_contract_id(request)
+            await auth_service.save_audit(request_adapter, None, contract_id)
+            raise
+
+        response_adapter = ResponseAdapter(request_adapter, response)
+        contract_id = get_contract_id(request)
+        await auth_service.save_audit(
+            request_adapter,
+            response_adapter,
+            contract_id,
+        )
+
+        await self.finalize(request, response_adapter, started_at)
+
+        return response
+
+    # The chunks are passed through as they come and the response is saved
+    # after the last one was sent (or the client went away).
+    def stream(
+        self,
+        request: Request,
+        request_adapter: RequestAdapter,
+        streaming: StreamingResponse,
+        started_at: float,
+    ) -> Response:
+        auth_service: AuthService = request.app.state.auth_service
+        response_adapter = StreamedResponseAdapter(request_adapter, streaming)
+
+        async def digest(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+            try:
+                async for chunk in chunks:
+                    response_adapter.update(chunk)
+                    yield chunk
+            except Exception:
+                # The background task is skipped when the body fails.
+                await save()
+                raise
+
+        async def save() -> None:
+            if auth_service.is_consolidated():
+                await auth_service.save_audit(
+                    request_adapter,
+                    response_adapter,
+                    get_contract_id(request),
+                )
+            else:
+                await auth_service.save_response(response_adapter)
+
+            await self.finalize(request, response_adapter, started_at)
+
+        # Starlette types the body as an async generator object, which
+        # digest() returns.
+        streaming.body_iterator = cast(
+            AsyncGeneratorType,
+            digest(streaming.body_iterator),
+        )
+        streaming.background = BackgroundTask(save)
+        return streaming
+
+    async def finalize(
+        self,
+        request: Request,
+        response_adapter: ResponseProtocol,
+        started_at: float,
+    ) -> None:
         request_time = time.perf_counter() - started_at
         self.logger.log(response_adapter, request_time)
 
-        return response
+        contract_id = get_contract_id(request)
+        if contract_id:
+            auth_service: AuthService = request.app.state.auth_service
+            await auth_service.record_usage(
+                contract_id,
+                response_adapter.code,
+                request_time,
+            )
+
+
+def get_contract_id(request: Request) -> Optional[UUID]:
+    identification = getattr(request.state, "identification", None)
+    return identification.contract_id if identification else None
 
 
 async def read_bytes(generator: AsyncIterator[bytes]) -> bytes:
@@ -158,8 +359,12 @@ async def resolve_response(streaming: StreamingResponse) -> Response:
 
 
 def add_middlewares(app: Starlette) -> None:
-    app.add_middleware(AccessMiddleware, ignore_paths=["/ping", "/health"])
-    app.add_middleware(JsonParserMiddleware)
-    app.add_middleware(ContentTypeMiddleware)
+    app.add_middleware(
+        AccessMiddleware,
+        ignore_paths=["/ping", "/health", *PROBE_PATHS],
+    )
+    app.add_middleware(JsonParserMiddleware, ignore_paths=PROBE_PATHS)
+    app.add_middleware(ContentTypeMiddleware, ignore_paths=PROBE_PATHS)
     app.add_middleware(ExceptionHandlerMiddleware)
     app.add_middleware(RequestIdentifierMiddleware)
+    app.add_middleware(TracingMiddleware)
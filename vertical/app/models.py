@@ -1,22 +1,41 @@
 import re
-from typing import Dict, Final
+from typing import Dict, Final, List, Tuple
 
 import attr
-from marshmallow import Schema, ValidationError, fields, post_load
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validate,
+    validates,
+)
 
 __all__ = (
     "Phone",
     "PhoneSchema",
+    "PHONE_SCHEMA",
+    "PHONE_NUMBER_FORMAT",
+    "Phones",
+    "PhonesSchema",
+    "PHONES_SCHEMA",
+    "PHONES_LIMIT",
 )
 
 PHONE_NUMBER_FORMAT: Final = re.compile(r"7\d{10}")
 
+# Phone numbers per batch reliability request.
+PHONES_LIMIT: Final = 100000
+
+
+def phone_number_error() -> str:
+    pattern = PHONE_NUMBER_FORMAT.pattern
+    return f"Phone number does't match expected pattern: {pattern}."
+
 
 def validate_phone_number(number: str) -> None:
     if not PHONE_NUMBER_FORMAT.fullmatch(number):
-        pattern = PHONE_NUMBER_FORMAT.pattern
-        message = f"Phone number does't match expected pattern: {pattern}."
-        raise ValidationError(message)
+        raise ValidationError(phone_number_error())
 
 
 @attr.s(slots=True, frozen=True)
@@ -24,11 +43,16 @@ class Phone:
     number: str = attr.ib()
 
     def to_dict(self) -> Dict:
-        return PHONE_SCHEMA.dump(self)
+        return {
+            "number": self.number,
+        }
 
     @classmethod
     def from_dict(cls, data: Dict) -> "Phone":
-        return PHONE_SCHEMA.load(data)
+        try:
+            return decode_phone(data)
+        except (TypeError, ValueError):
+            return PHONE_SCHEMA.load(data)
 
 
 class PhoneSchema(Schema):
@@ -40,3 +64,59 @@ class PhoneSchema(Schema):
 
 
 PHONE_SCHEMA: Final = PhoneSchema()
+
+PHONE_FIELDS: Final = frozenset(PHONE_SCHEMA.fields)
+
+
+def decode_phone(data: Dict) -> Phone:
+    if type(data) is not dict or data.keys() != PHONE_FIELDS:
+        raise TypeError(data)
+
+    number = data["number"]
+    if type(number) is not str:
+        raise TypeError(number)
+
+    if not PHONE_NUMBER_FORMAT.fullmatch(number):
+        raise ValueError(number)
+
+    return Phone(number)
+
+
+@attr.s(slots=True, frozen=True)
+class Phones:
+    numbers: Tuple[str, ...] = attr.ib()
+
+    def to_dict(self) -> Dict:
+        return {
+            "numbers": list(self.numbers),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Phones":
+        return PHONES_SCHEMA.load(data)
+
+
+class PhonesSchema(Schema):
+    numbers = fields.List(
+        fields.Str(),
+        required=True,
+        validate=validate.Length(min=1, max=PHONES_LIMIT),
+    )
+
+    # Keyed by the position as a string, the same way as JSON object keys.
+    @validates("numbers")
+    def validate_numbers(self, numbers: List[str]) -> None:
+        errors = {
+            str(index): [phone_number_error()]
+            for index, number in enumerate(numbers)
+            if not PHONE_NUMBER_FORMAT.fullmatch(number)
+        }
+        if errors:
+            raise ValidationError(errors)
+
+    @post_load
+    def make_model(self, data: Dict, **kwargs) -> Phones:
+        return Phones(numbers=tuple(data["numbers"]))
+
+
+PHONES_SCHEMA: Final = PhonesSchema()
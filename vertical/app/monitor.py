@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import (
+    Any,
+    Coroutine,
+    Dict,
+    Final,
+    Generator,
+    List,
+    Optional,
+    TypedDict,
+    Union,
+)
+
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
+
+from .context import REQUEST_ID
+from .log import MISSING, LoggerConfig, LoggerSchema, app_logger
+
+__all__ = (
+    "LoopMonitorConfig",
+    "LoopMonitor",
+    "LoopMonitorSchema",
+    "percentile",
+)
+
+PERCENTILES: Final = (50, 90, 99)
+
+
+class LoopMonitorConfig(TypedDict, total=False):
+    interval: float
+    threshold: float
+    samples: int
+    logger: LoggerConfig
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    index = max(math.ceil(q / 100 * len(samples)) - 1, 0)
+    return samples[index]
+
+
+# A heartbeat callback measures how late the loop runs it, a watchdog
+# thread logs the loop thread's stack when the next beat is overdue.
+class LoopMonitor:
+
+    __slots__ = (
+        "_interval",
+        "_threshold",
+        "_samples",
+        "_logger",
+        "_loop",
+        "_loop_thread_id",
+        "_request_ids",
+        "_beat_at",
+        "_reported_at",
+        "_heartbeat",
+        "_watchdog",
+        "_stopped",
+    )
+
+    def __init__(
+        self,
+        interval: float,
+        threshold: float,
+        logger: logging.Logger,
+        samples: int = 1024,
+    ):
+        self._interval = interval
+        self._threshold = threshold
+        self._samples: deque = deque(maxlen=samples)
+        self._logger = logger
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = 0
+
+        # Request of every task, the watchdog can't read the task contexts.
+        self._request_ids: weakref.WeakKeyDictionary = \
+            weakref.WeakKeyDictionary()
+
+        self._beat_at = 0.0
+        self._reported_at = 0.0
+        self._heartbeat: Optional[asyncio.TimerHandle] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def setup(self) -> None:
+        if self._interval <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+
+        loop.set_task_factory(self.create_task)
+
+        self._beat_at = time.monotonic()
+        self._heartbeat = loop.call_later(self._interval, self.beat)
+
+        self._stopped.clear()
+        self._watchdog = threading.Thread(
+            target=self.watch,
+            name="vertical-loop-monitor",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def cleanup(self) -> None:
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._loop.set_task_factory(None)
+
+        self._stopped.set()
+        if self._watchdog:
+            self._watchdog.join()
+
+    # Newer Pythons pass the task context as a keyword argument.
+    def create_task(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        coro: Union[Generator[Any, None, Any], Coroutine[Any, Any, Any]],
+        **kwargs: Any,
+    ) -> asyncio.Future:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+
+        request_id = REQUEST_ID.get(None)
+        if request_id is not None:
+            self._request_ids[task] = request_id
+        return task
+
+    def beat(self) -> None:
+        now = time.monotonic()
+        self._samples.append(now - self._beat_at - self._interval)
+
+        self._beat_at = now
+        self._heartbeat = self._loop.call_later(self._interval, self.beat)
+
+    def lag(self) -> float:
+        return time.monotonic() - self._beat_at - self._interval
+
+    def watch(self) -> None:
+        while not self._stopped.wait(self._interval):
+            beat_at = self._beat_at
+            if beat_at == self._reported_at:
+                continue
+
+            lag = self.lag()
+            if lag > self._threshold:
+                self._reported_at = beat_at
+                self.report(lag)
+
+    def report(self, lag: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+
+        task = asyncio.current_task(self._loop)
+        request_id = self._request_ids.get(task, MISSING)
+
+        token = REQUEST_ID.set(request_id)
+        try:
+            self._logger.warning(
+                "Event loop is blocked for %.3f s:\n%s",
+                lag,
+                stack,
+            )
+        finally:
+            REQUEST_ID.reset(token)
+
+    def percentiles(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+
+        data: Dict[str, Any] = {"samples": len(samples)}
+        for q in PERCENTILES:
+            data[f"p{q}"] = round(percentile(samples, q), 4)
+        data["max"] = round(samples[-1] if samples else 0.0, 4)
+        return data
+
+    @classmethod
+    def from_config(cls, config: LoopMonitorConfig) -> "LoopMonitor":
+        return LoopMonitorSchema().load(config)
+
+
+class LoopMonitorSchema(Schema):
+    interval = fields.Float(missing=0, validate=validate.Range(min=0))
+    threshold = fields.Float(missing=0.25, validate=validate.Range(min=0))
+    samples = fields.Int(missing=1024, validate=validate.Range(min=1))
+    logger = fields.Nested(LoggerSchema, missing=lambda: app_logger)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @post_load
+    def release(self, data: Dict, **kwargs) -> LoopMonitor:
+        return LoopMonitor(**data)
@@ -7,14 +7,25 @@ class RequestProtocol(Protocol):
     identifier: str
     method: str
     path: str
-    body: Optional[str]
+    content: bytes
     remote_addr: Optional[str]
     referer: Optional[str]
     user_agent: Optional[str]
     authorization: Optional[str]
 
+    # The adapters decode the body from the content.
+    @property
+    def body(self) -> Optional[str]: ...
+
 
 class ResponseProtocol(Protocol):
     request: RequestProtocol
-    body: str
+    length: int
     code: int
+
+    # Streamed responses render the content once the stream is over.
+    @property
+    def content(self) -> bytes: ...
+
+    @property
+    def body(self) -> str: ...
@@ -0,0 +1,141 @@
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, Final, Optional, TypedDict
+from uuid import UUID
+
+from marshmallow import EXCLUDE, Schema, fields, post_load
+
+from .log import app_logger
+
+__all__ = (
+    "RateLimitExceeded",
+    "RateLimiterConfig",
+    "RateLimiter",
+    "RateLimiterSchema",
+)
+
+DEFAULT_PATH: Final = os.path.join(
+    tempfile.gettempdir(),
+    "vertical.ratelimit",
+)
+
+DEFAULT_SLOTS: Final = 4096
+
+MAX_PROBES: Final = 8
+
+# contract_id, tokens, updated_at
+SLOT: Final = struct.Struct("=16sdd")
+
+EMPTY: Final = bytes(16)
+
+monotonic = time.monotonic
+
+
+class RateLimitExceeded(Exception):
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+    def render(self) -> str:
+        return "Too many requests"
+
+
+class RateLimiterConfig(TypedDict, total=False):
+    path: str
+    slots: int
+
+
+# Token buckets shared by all the worker processes of a host: every bucket
+# lives in a fixed size slot of a memory mapped file and is guarded by
+# a POSIX record lock on that slot only.
+class RateLimiter:
+
+    __slots__ = (
+        "_fd",
+        "_mmap",
+        "_slots",
+    )
+
+    def __init__(self, path: str = DEFAULT_PATH, slots: int = DEFAULT_SLOTS):
+        size = slots * SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+
+        self._mmap = mmap.mmap(self._fd, size)
+        self._slots = slots
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    # Returns zero if a token was taken, otherwise the number
+    # of seconds until the next token is available.
+    def acquire(self, key: bytes, rate: float, burst: int) -> float:
+        start = int.from_bytes(key[:8], "little")
+
+        for probe in range(MAX_PROBES):
+            offset = (start + probe) % self._slots * SLOT.size
+
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                slot_key, tokens, updated_at = SLOT.unpack_from(
+                    self._mmap,
+                    offset,
+                )
+                now = monotonic()
+
+                if slot_key == EMPTY:
+                    tokens, updated_at = burst, now
+                elif slot_key != key:
+                    continue
+
+                elapsed = max(now - updated_at, 0.0)
+                tokens = min(tokens + elapsed * rate, burst)
+
+                if tokens >= 1:
+                    SLOT.pack_into(self._mmap, offset, key, tokens - 1, now)
+                    return 0.0
+
+                SLOT.pack_into(self._mmap, offset, key, tokens, now)
+                return (1 - tokens) / rate
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+        app_logger.warning("Rate limiter table is full")
+        return 0.0
+
+    def check(
+        self,
+        contract_id: UUID,
+        rate: Optional[float],
+        burst: Optional[int],
+    ) -> None:
+        if not rate:
+            return
+
+        retry_after = self.acquire(contract_id.bytes, rate, burst or 1)
+
+        if retry_after:
+            raise RateLimitExceeded(retry_after)
+
+    @classmethod
+    def from_config(cls, config: RateLimiterConfig) -> "RateLimiter":
+        return RateLimiterSchema().load(config)
+
+
+class RateLimiterSchema(Schema):
+    path = fields.Str(missing=DEFAULT_PATH)
+    slots = fields.Int(missing=DEFAULT_SLOTS)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @post_load
+    def make_limiter(self, data: Dict, **kwargs) -> RateLimiter:
+        return RateLimiter(**data)
@@ -1,20 +1,29 @@
 from http import HTTPStatus
-from typing import Any, Dict, Final
+from typing import Any, AsyncIterator, Dict, Final
 
 import orjson
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse, Response, StreamingResponse
 
 from vertical import hdrs
 
+from .context import RESPONSE_MEDIA_TYPE
+from .media import pack
+
 __all__ = (
+    "NDJSON_MEDIA_TYPE",
+    "is_streamed",
     "create_response",
     "ok",
+    "prerendered",
+    "ndjson",
     "bad_request",
     "unsupported_media_type",
     "validation_error",
     "server_error",
 )
 
+NDJSON_MEDIA_TYPE: Final = "application/x-ndjson"
+
 # TODO: fix SERVER duplicate in uvicorn
 HEADERS: Final = {
     hdrs.SERVER: "UCB Vertical v0.0.1",
@@ -31,8 +40,20 @@ class ORJSONResponse(JSONResponse):
         return orjson.dumps(content)
 
 
+class MsgpackResponse(Response):
+
+    def render(self, content: Any) -> bytes:
+        return pack(content)
+
+
 def create_response(content: Dict, http_status: int) -> Response:
     headers = HEADERS.copy()
+
+    media_type = RESPONSE_MEDIA_TYPE.get()
+    if media_type:
+        headers[hdrs.CONTENT_TYPE] = media_type
+        return MsgpackResponse(content, http_status, headers)
+
     return ORJSONResponse(content, http_status, headers)
 
 
@@ -44,6 +65,28 @@ def ok(data: Dict = None, message: str = None) -> Response:  # 200
     return create_response(content, HTTPStatus.OK)
 
 
+def prerendered(content: bytes, http_status: int) -> Response:
+    headers = HEADERS.copy()
+    media_type = ORJSONResponse.media_type
+    return Response(content, http_status, headers, media_type)
+
+
+def ndjson(rows: AsyncIterator[Dict]) -> Response:  # 200
+    headers = HEADERS.copy()
+    headers[hdrs.CONTENT_TYPE] = NDJSON_MEDIA_TYPE
+
+    async def render() -> AsyncIterator[bytes]:
+        async for row in rows:
+            yield orjson.dumps(row) + b"\n"
+
+    return StreamingResponse(render(), HTTPStatus.OK, headers)
+
+
+def is_streamed(response: Response) -> bool:
+    content_type = response.headers.get(hdrs.CONTENT_TYPE, "")
+    return content_type.startswith(NDJSON_MEDIA_TYPE)
+
+
 def bad_request(message: str) -> Response:  # 400
     content = {
         "message": message,
@@ -0,0 +1,166 @@
+from datetime import date, datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Final,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import attr
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = (
+    "Submissions",
+    "Rule",
+    "RuleEngine",
+    "group_bounds",
+    "span_rule",
+)
+
+SECONDS_PER_DAY: Final = 86400
+
+# tel, phk1, dob, creation_datetime
+Row = Tuple[str, str, str, date]
+
+# (first, last) submission dates of a phone
+Bounds = Optional[Tuple[date, date]]
+
+
+# Converting the date objects one by one is an order of magnitude faster
+# than making numpy parse them into a datetime64 array.
+def to_seconds(value: date) -> int:
+    seconds = value.toordinal() * SECONDS_PER_DAY
+    if isinstance(value, datetime):
+        seconds += value.hour * 3600 + value.minute * 60 + value.second
+    return seconds
+
+
+# Indexes of the earliest and the latest row of every group, the groups
+# are numbered by consecutive codes of `keys`.
+def group_bounds(keys: Any, values: Any) -> Tuple[Any, Any]:
+    if not len(keys):
+        return keys, keys
+
+    order = numpy.lexsort((values, keys))
+    starts = numpy.flatnonzero(numpy.diff(keys[order], prepend=-1))
+    ends = numpy.append(starts[1:], len(order)) - 1
+    return order[starts], order[ends]
+
+
+# Submission rows of a batch of phone hashes in columns, grouped once by
+# the phone and by the (tel, phk1, dob) person for all the rules.
+@attr.s(slots=True, frozen=True)
+class Submissions:
+    phone_hashes: Sequence[str] = attr.ib()
+    dates: Sequence[date] = attr.ib()
+    phones: Any = attr.ib()
+    persons: Any = attr.ib()
+    # Seconds since 0001-01-01.
+    created_at: Any = attr.ib()
+    phone_bounds: Tuple[Any, Any] = attr.ib()
+    person_bounds: Tuple[Any, Any] = attr.ib()
+
+    def size(self) -> int:
+        return len(self.phone_hashes)
+
+    def periods(self) -> List[Bounds]:
+        periods: List[Bounds] = [None] * len(self.phone_hashes)
+
+        first, last = self.phone_bounds
+        for phone, earliest, latest in zip(self.phones[first], first, last):
+            periods[phone] = (self.dates[earliest], self.dates[latest])
+        return periods
+
+    @classmethod
+    def from_rows(
+        cls,
+        phone_hashes: Sequence[str],
+        rows: Iterable[Row],
+    ) -> "Submissions":
+        indexes = {tel: i for i, tel in enumerate(phone_hashes)}
+        codes: Dict[Tuple[str, str, str], int] = {}
+
+        phone_codes, person_codes, dates, seconds = [], [], [], []
+        for tel, phk1, dob, created_at in rows:
+            phone_codes.append(indexes[tel])
+            person_codes.append(codes.setdefault((tel, phk1, dob), len(codes)))
+            dates.append(created_at)
+            seconds.append(to_seconds(created_at))
+
+        phones = numpy.array(phone_codes, dtype=numpy.intp)
+        persons = numpy.array(person_codes, dtype=numpy.intp)
+        created_seconds = numpy.array(seconds, dtype=numpy.int64)
+
+        return cls(
+            phone_hashes=phone_hashes,
+            dates=dates,
+            phones=phones,
+            persons=persons,
+            created_at=created_seconds,
+            phone_bounds=group_bounds(phones, created_seconds),
+            person_bounds=group_bounds(persons, created_seconds),
+        )
+
+
+# A boolean outcome for every phone hash of the submissions.
+Rule = Callable[[Submissions], Any]
+
+
+# Some person submitted the phone over a period longer than `days`, the
+# rule of the `status_query` of the Hunter service.
+def span_rule(days: int) -> Rule:
+    limit = days * SECONDS_PER_DAY
+
+    def rule(submissions: Submissions) -> Any:
+        first, last = submissions.person_bounds
+        spans = submissions.created_at[last] - submissions.created_at[first]
+
+        outcomes = numpy.zeros(submissions.size(), dtype=bool)
+        outcomes[submissions.phones[first[spans > limit]]] = True
+        return outcomes
+
+    return rule
+
+
+class RuleEngine:
+
+    __slots__ = (
+        "_rules",
+    )
+
+    def __init__(self) -> None:
+        if numpy is None:
+            raise RuntimeError("numpy is required for the rule engine")
+        self._rules: Dict[str, Rule] = {}
+
+    def add_rule(self, name: str, rule: Rule) -> None:
+        self._rules[name] = rule
+
+    def rules(self) -> List[str]:
+        return list(self._rules)
+
+    def submissions(
+        self,
+        phone_hashes: Sequence[str],
+        rows: Iterable[Row],
+    ) -> Submissions:
+        return Submissions.from_rows(phone_hashes, rows)
+
+    def evaluate(self, submissions: Submissions) -> List[Dict[str, bool]]:
+        outcomes = {
+            name: rule(submissions).tolist()
+            for name, rule in self._rules.items()
+        }
+        return [
+            {name: values[i] for name, values in outcomes.items()}
+            for i in range(submissions.size())
+        ]
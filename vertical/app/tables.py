@@ -0,0 +1,150 @@
+from typing import Optional
+
+from sqlalchemy import Column, ForeignKey, orm
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
+
+from vertical import hdrs
+
+from .auth import ADMIN_CLIENT_NAME, make_token_digest
+from .utils import make_uuid, now
+
+__all__ = (
+    "Model",
+    "Client",
+    "Contract",
+    "Request",
+    "Response",
+    "Identification",
+    "Audit",
+    "UsageDaily",
+    "IdempotencyKey",
+)
+
+# Declarative models of the auth database for the admin tools and tests,
+# the request path works with the plain models of the `auth` module.
+Model: DeclarativeMeta = declarative_base()
+
+
+class Client(Model):
+    __tablename__ = "clients"
+
+    id = Column("client_id", pg.UUID, primary_key=True, default=make_uuid)
+    name = Column(pg.VARCHAR)
+    created_at = Column(pg.TIMESTAMP, default=now)
+
+    def is_admin(self) -> bool:
+        return self.name == ADMIN_CLIENT_NAME
+
+
+class Contract(Model):
+    __tablename__ = "contracts"
+
+    id = Column("contract_id", pg.UUID, primary_key=True, default=make_uuid)
+    client_id = Column(pg.UUID, ForeignKey(Client.id))
+    token_digest = Column(pg.CHAR(64))
+    created_at = Column(pg.TIMESTAMP, default=now)
+    expired_at = Column(pg.TIMESTAMP, default=None)
+    revoked_at = Column(pg.TIMESTAMP, default=None)
+    rate_limit = Column(pg.DOUBLE_PRECISION, default=None)
+    rate_burst = Column(pg.INTEGER, default=None)
+
+    client = orm.relationship(Client)
+
+    # The plain token is never stored, it's only known right after issuing.
+    _token: Optional[str] = None
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token
+
+    @token.setter
+    def token(self, token: str) -> None:
+        self._token = token
+        self.token_digest = make_token_digest(token)
+
+    def is_expired(self) -> bool:
+        if self.expired_at is None or self.expired_at > now():
+            return False
+        return True
+
+    def is_revoked(self) -> bool:
+        if self.revoked_at is None or self.revoked_at > now():
+            return False
+        return True
+
+
+class Request(Model):
+    __tablename__ = "requests"
+
+    id = Column("request_id", pg.UUID, primary_key=True)
+    remote = Column(pg.VARCHAR)
+    method = Column(pg.VARCHAR)
+    path = Column(pg.VARCHAR)
+    body = Column(pg.JSONB)
+    created_at = Column(pg.TIMESTAMP)
+
+
+class Response(Model):
+    __tablename__ = "responses"
+
+    id = Column("request_id", None, ForeignKey(Request.id), primary_key=True)
+    body = Column(pg.JSONB)
+    code = Column(pg.SMALLINT)
+    created_at = Column(pg.TIMESTAMP)
+
+    request = orm.relationship(Request)
+
+
+class Identification(Model):
+    __tablename__ = "identifications"
+
+    id = Column("identification_id", pg.UUID, primary_key=True)
+    request_id = Column(None, ForeignKey(Request.id))
+    contract_id = Column(None, ForeignKey(Contract.id))
+    created_at = Column(pg.TIMESTAMP)
+
+    request = orm.relationship(Request)
+    contract = orm.relationship(Contract)
+
+
+class Audit(Model):
+    __tablename__ = "audits"
+
+    id = Column("request_id", pg.UUID, primary_key=True)
+    remote = Column(pg.INET)
+    remote_port = Column(pg.INTEGER)
+    method = Column(pg.ENUM(*hdrs.METHOD_ALL, name="http_method"))
+    path = Column(pg.VARCHAR)
+    request_body = Column(pg.BYTEA)
+    contract_id = Column(None, ForeignKey(Contract.id))
+    response_code = Column(pg.SMALLINT)
+    response_body = Column(pg.BYTEA)
+    created_at = Column(pg.TIMESTAMP)
+
+    contract = orm.relationship(Contract)
+
+
+class UsageDaily(Model):
+    __tablename__ = "usage_daily"
+
+    day = Column(pg.DATE, primary_key=True)
+    contract_id = Column(None, ForeignKey(Contract.id), primary_key=True)
+    status_class = Column(pg.SMALLINT, primary_key=True)
+    calls = Column(pg.BIGINT)
+    latency = Column(pg.DOUBLE_PRECISION)
+
+    contract = orm.relationship(Contract)
+
+
+class IdempotencyKey(Model):
+    __tablename__ = "idempotency_keys"
+
+    contract_id = Column(None, ForeignKey(Contract.id), primary_key=True)
+    key = Column(pg.VARCHAR(255), primary_key=True)
+    request_digest = Column(pg.CHAR(64))
+    code = Column(pg.SMALLINT)
+    body = Column(pg.JSONB)
+    created_at = Column(pg.TIMESTAMP)
+
+    contract = orm.relationship(Contract)
@@ -0,0 +1,79 @@
+import time
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .context import SPANS
+
+__all__ = (
+    "Spans",
+    "Span",
+    "span",
+)
+
+perf_counter = time.perf_counter
+
+
+class Spans:
+
+    __slots__ = ("_spans",)
+
+    def __init__(self) -> None:
+        self._spans: List[Tuple[str, float]] = []
+
+    def __iter__(self) -> Iterator[Tuple[str, float]]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def add(self, name: str, duration: float) -> None:
+        # list.append is atomic, spans may be closed from executor threads
+        self._spans.append((name, duration))
+
+    def render(self) -> str:
+        return ", ".join(
+            f"{name};dur={duration * 1000:.3f}"
+            for name, duration in self._spans
+        )
+
+
+class Span:
+
+    __slots__ = (
+        "_name",
+        "_spans",
+        "_started_at",
+    )
+
+    def __init__(self, name: str, spans: Spans):
+        self._name = name
+        self._spans = spans
+        self._started_at = 0.0
+
+    def __enter__(self) -> "Span":
+        self._started_at = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = perf_counter() - self._started_at
+        self._spans.add(self._name, elapsed)
+
+
+class NoopSpan:
+
+    __slots__ = ()
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def span(name: str) -> Union[Span, NoopSpan]:
+    spans: Optional[Spans] = SPANS.get()
+    if spans is None:
+        return NOOP_SPAN
+    return Span(name, spans)
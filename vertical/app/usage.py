@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Dict, Final, List, Optional, Tuple
+from uuid import UUID
+
+import attr
+from marshmallow import (
+    EXCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    post_load,
+    validates_schema,
+)
+
+from .utils import now
+
+__all__ = (
+    "UsageKey",
+    "UsageBuffer",
+    "UsageQuery",
+    "UsageQuerySchema",
+    "USAGE_QUERY_SCHEMA",
+    "status_class",
+)
+
+DATE_FORMAT: Final = "%Y.%m.%d"
+
+DEFAULT_PERIOD_DAYS: Final = 30
+
+# (contract_id, day, status_class)
+UsageKey = Tuple[UUID, date, int]
+
+
+def status_class(code: int) -> int:
+    return code // 100
+
+
+class UsageBuffer:
+
+    __slots__ = ("_counters",)
+
+    def __init__(self) -> None:
+        self._counters: Dict[UsageKey, List] = {}
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, contract_id: UUID, code: int, latency: float) -> None:
+        key = (contract_id, now().date(), status_class(code))
+
+        counter = self._counters.get(key)
+        if counter is None:
+            self._counters[key] = [1, latency]
+        else:
+            counter[0] += 1
+            counter[1] += latency
+
+    def merge(self, other: "UsageBuffer") -> None:
+        for key, (calls, latency) in other._counters.items():
+            counter = self._counters.setdefault(key, [0, 0.0])
+            counter[0] += calls
+            counter[1] += latency
+
+    def swap(self) -> "UsageBuffer":
+        swapped = UsageBuffer()
+        swapped._counters, self._counters = self._counters, {}
+        return swapped
+
+    def rows(self) -> List[Tuple[UUID, date, int, int, float]]:
+        return [
+            (contract_id, day, code_class, calls, latency)
+            for (contract_id, day, code_class), (calls, latency)
+            in self._counters.items()
+        ]
+
+
+@attr.s(slots=True, frozen=True)
+class UsageQuery:
+    since: date = attr.ib()
+    until: date = attr.ib()
+    contract_id: Optional[str] = attr.ib(default=None)
+
+
+class UsageQuerySchema(Schema):
+    since = fields.Date(DATE_FORMAT, missing=None)
+    until = fields.Date(DATE_FORMAT, missing=None)
+    contract_id = fields.UUID(missing=None)
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @validates_schema
+    def validate_period(self, data: Dict, **kwargs) -> None:
+        since, until = data.get("since"), data.get("until")
+        if since and until and since > until:
+            raise ValidationError("Must not be later than until", "since")
+
+    @post_load
+    def make_query(self, data: Dict, **kwargs) -> UsageQuery:
+        until = data["until"] or now().date()
+        since = data["since"] or date.fromordinal(
+            until.toordinal() - DEFAULT_PERIOD_DAYS + 1,
+        )
+        contract_id = data["contract_id"]
+
+        return UsageQuery(
+            since=since,
+            until=until,
+            contract_id=str(contract_id) if contract_id else None,
+        )
+
+
+USAGE_QUERY_SCHEMA: Final = UsageQuerySchema()
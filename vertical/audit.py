@@ -0,0 +1,80 @@
+import argparse
+import sys
+from typing import Dict, Optional, Sequence
+
+import orjson
+import sqlalchemy as sa
+from environs import Env
+
+from vertical.app.audit import decode_body
+
+__all__ = (
+    "lookup",
+)
+
+
+def lookup(bind: sa.engine.Engine, request_id: str) -> Optional[Dict]:
+    query = sa.text("""
+        SELECT
+            audits.request_id::TEXT
+            , host(audits.remote) AS remote
+            , audits.remote_port
+            , audits.method::TEXT
+            , audits.path
+            , audits.request_body
+            , audits.contract_id::TEXT
+            , audits.response_code
+            , audits.response_body
+            , audits.created_at
+        FROM audits
+        WHERE request_id = :request_id
+        LIMIT 1
+        ;
+    """)
+
+    record = bind.execute(query, request_id=request_id).first()
+    if not record:
+        return None
+
+    audit = dict(record)
+    audit["request_body"] = decode_body(audit["request_body"])
+    audit["response_body"] = decode_body(audit["response_body"])
+    return audit
+
+
+def main(argv: Sequence[str] = None) -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m vertical.audit",
+        description="Print a consolidated audit record with decoded bodies.",
+    )
+    parser.add_argument(
+        "request_id",
+        help="request identifier (X-Request-Id header)",
+    )
+    parser.add_argument(
+        "--url",
+        default=env.str("AUTH_DB_URL", None),
+        help="auth database url (default: $AUTH_DB_URL)",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("auth database url is required")
+
+    bind = sa.create_engine(args.url)
+    try:
+        audit = lookup(bind, args.request_id)
+    finally:
+        bind.dispose()
+
+    if audit is None:
+        sys.exit(f"Audit record {args.request_id} not found")
+
+    sys.stdout.buffer.write(orjson.dumps(audit))
+    sys.stdout.buffer.write(b"\n")
+
+
+if __name__ == "__main__":
+    main()
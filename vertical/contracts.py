@@ -0,0 +1,100 @@
+import argparse
+from datetime import datetime
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from environs import Env
+from sqlalchemy import orm
+
+from vertical.app.auth import make_token
+from vertical.app.tables import Client, Contract
+
+__all__ = (
+    "issue_contract",
+)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def issue_contract(
+    session: orm.Session,
+    client_name: str,
+    expired_at: Optional[datetime] = None,
+    rate_limit: Optional[float] = None,
+    rate_burst: Optional[int] = None,
+) -> Contract:
+    client = session.query(Client).filter(Client.name == client_name).first()
+    if client is None:
+        client = Client(name=client_name)
+
+    contract = Contract(
+        token=make_token(),
+        client=client,
+        expired_at=expired_at,
+        rate_limit=rate_limit,
+        rate_burst=rate_burst,
+    )
+    session.add(contract)
+    session.commit()
+
+    return contract
+
+
+def main(argv: Sequence[str] = None) -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m vertical.contracts",
+        description="Issue a new contract and print its access token.",
+    )
+    parser.add_argument(
+        "client",
+        help="client name, created if it doesn't exist yet",
+    )
+    parser.add_argument(
+        "--expires",
+        type=lambda value: datetime.strptime(value, DATE_FORMAT),
+        default=None,
+        help="contract expiration date (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="allowed requests per second (default: unlimited)",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=None,
+        help="requests allowed at once above the rate (default: 1)",
+    )
+    parser.add_argument(
+        "--url",
+        default=env.str("AUTH_DB_URL", None),
+        help="auth database url (default: $AUTH_DB_URL)",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("auth database url is required")
+
+    bind = sa.create_engine(args.url)
+    session = orm.Session(bind=bind)
+    try:
+        contract = issue_contract(
+            session,
+            args.client,
+            args.expires,
+            args.rate,
+            args.burst,
+        )
+        print(f"Contract: {contract.id}")
+        print(f"Token: {contract.token}")
+    finally:
+        session.close()
+        bind.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -60,6 +60,8 @@ EXPIRES = "Expires"
 FORWARDED = "Forwarded"
 FROM = "From"
 HOST = "Host"
+IDEMPOTENCY_KEY = "Idempotency-Key"
+IDEMPOTENT_REPLAYED = "Idempotent-Replayed"
 IF_MATCH = "If-Match"
 IF_MODIFIED_SINCE = "If-Modified-Since"
 IF_NONE_MATCH = "If-None-Match"
@@ -85,6 +87,7 @@ SEC_WEBSOCKET_EXTENSIONS = "Sec-WebSocket-Extensions"
 SEC_WEBSOCKET_KEY = "Sec-WebSocket-Key"
 SEC_WEBSOCKET_KEY1 = "Sec-WebSocket-Key1"
 SERVER = "Server"
+SERVER_TIMING = "Server-Timing"
 SET_COOKIE = "Set-Cookie"
 TE = "TE"
 TRAILER = "Trailer"
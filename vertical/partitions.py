@@ -0,0 +1,202 @@
+import argparse
+import re
+from datetime import date
+from typing import Final, List, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from environs import Env
+
+from vertical.app.log import maintenance_logger as logger
+from vertical.app.log import setup_logging
+
+__all__ = (
+    "AUDIT_TABLES",
+    "month_start",
+    "add_months",
+    "partition_name",
+    "list_partitions",
+    "create_partition",
+    "remove_partition",
+    "maintain",
+)
+
+AUDIT_TABLES: Final = (
+    "requests",
+    "responses",
+    "identifications",
+    "audits",
+)
+
+PARTITION_NAME: Final = re.compile(
+    r"(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})",
+)
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start:%Y_%m}"
+
+
+def list_partitions(
+    conn: sa.engine.Connection,
+    table: str,
+) -> List[Tuple[str, date]]:
+    query = sa.text("""
+        SELECT
+            child.relname
+        FROM
+            pg_inherits
+            JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE
+            parent.relname = :table
+        ;
+    """)
+
+    partitions = []
+    for name, in conn.execute(query, table=table):
+        match = PARTITION_NAME.fullmatch(name)
+        if match and match["table"] == table:
+            year, month = int(match["year"]), int(match["month"])
+            partitions.append((name, date(year, month, 1)))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(
+    conn: sa.engine.Connection,
+    table: str,
+    start: date,
+) -> str:
+    name = partition_name(table, start)
+    end = add_months(start, 1)
+
+    conn.execute(f"""
+        CREATE TABLE {name}
+            (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        ;
+    """)
+
+    # Rows which landed in the default partition while the range was missing
+    # have to be moved out first, otherwise the partition can't be attached.
+    conn.execute(sa.text(f"""
+        WITH moved AS (
+            DELETE FROM {table}_default
+            WHERE created_at >= :start AND created_at < :end
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        ;
+    """), start=start, end=end)
+
+    conn.execute(f"""
+        ALTER TABLE {table}
+            ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')
+        ;
+    """)
+
+    return name
+
+
+def remove_partition(
+    conn: sa.engine.Connection,
+    table: str,
+    name: str,
+    drop: bool,
+) -> None:
+    conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+    if drop:
+        conn.execute(f"DROP TABLE {name};")
+
+
+def maintain(
+    bind: sa.engine.Engine,
+    tables: Sequence[str] = AUDIT_TABLES,
+    premake: int = 3,
+    retention: Optional[int] = None,
+    drop: bool = False,
+    today: Optional[date] = None,
+) -> None:
+    current = month_start(today or date.today())
+
+    for table in tables:
+        with bind.begin() as conn:
+            partitions = list_partitions(conn, table)
+            existing = {start for _, start in partitions}
+
+            for months in range(premake + 1):
+                start = add_months(current, months)
+                if start not in existing:
+                    name = create_partition(conn, table, start)
+                    logger.info("Created partition %s", name)
+
+            if retention is None:
+                continue
+
+            cutoff = add_months(current, -retention)
+            for name, start in partitions:
+                if add_months(start, 1) <= cutoff:
+                    remove_partition(conn, table, name, drop)
+                    action = "Dropped" if drop else "Detached"
+                    logger.info("%s partition %s", action, name)
+
+
+def main(argv: Sequence[str] = None) -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m vertical.partitions",
+        description="Pre-create and retire monthly audit table partitions.",
+    )
+    parser.add_argument(
+        "--url",
+        default=env.str("AUTH_DB_URL", None),
+        help="auth database url (default: $AUTH_DB_URL)",
+    )
+    parser.add_argument(
+        "--premake",
+        type=int,
+        default=env.int("AUDIT_PARTITIONS_PREMAKE", 3),
+        help="number of future monthly partitions to keep ready",
+    )
+    parser.add_argument(
+        "--retention",
+        type=int,
+        default=env.int("AUDIT_RETENTION_MONTHS", None),
+        help="number of past months to keep attached (default: keep all)",
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        default=env.bool("AUDIT_RETENTION_DROP", False),
+        help="drop partitions past the retention instead of detaching them",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("auth database url is required")
+
+    setup_logging()
+
+    bind = sa.create_engine(args.url)
+    try:
+        maintain(
+            bind,
+            premake=args.premake,
+            retention=args.retention,
+            drop=args.drop,
+        )
+    finally:
+        bind.dispose()
+
+
+if __name__ == "__main__":
+    main()
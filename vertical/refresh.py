@@ -0,0 +1,120 @@
+import argparse
+import time
+from typing import Sequence
+
+import sqlalchemy as sa
+from environs import Env
+from sqlalchemy.dialects.postgresql import insert
+
+from vertical.app.hunter import make_generations_table
+from vertical.app.log import maintenance_logger as logger
+from vertical.app.log import setup_logging
+
+__all__ = (
+    "refresh",
+    "refresh_once",
+    "refresh_loop",
+)
+
+
+# The view is refreshed and its generation is bumped in one transaction,
+# so the new generation is never seen before the new data.
+def refresh(bind: sa.engine.Engine, schema: str, view: str) -> int:
+    metadata = sa.MetaData(schema=schema)
+    generations = make_generations_table(metadata)
+
+    upsert = insert(generations).values(
+        name=view,
+        generation=1,
+        refreshed_at=sa.func.now(),
+    )
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[generations.c.name],
+        set_={
+            "generation": generations.c.generation + 1,
+            "refreshed_at": upsert.excluded.refreshed_at,
+        },
+    ).returning(generations.c.generation)
+
+    with bind.begin() as conn:
+        conn.execute(f"""
+            REFRESH MATERIALIZED VIEW CONCURRENTLY {schema}.{view}
+            ;
+        """)
+        return conn.execute(upsert).scalar()
+
+
+def refresh_once(bind: sa.engine.Engine, schema: str, view: str) -> None:
+    started_at = time.monotonic()
+    generation = refresh(bind, schema, view)
+    elapsed = time.monotonic() - started_at
+
+    logger.info(
+        "Refreshed %s.%s to generation %d in %.1f s",
+        schema, view, generation, elapsed,
+    )
+
+
+def refresh_loop(
+    bind: sa.engine.Engine,
+    schema: str,
+    view: str,
+    interval: float,
+) -> None:
+    while True:
+        started_at = time.monotonic()
+        try:
+            refresh_once(bind, schema, view)
+        except sa.exc.DBAPIError as e:
+            logger.warning("Could not refresh %s.%s: %s", schema, view, e)
+
+        time.sleep(max(interval - (time.monotonic() - started_at), 0))
+
+
+def main(argv: Sequence[str] = None) -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m vertical.refresh",
+        description="Refresh the Hunter materialized view.",
+    )
+    parser.add_argument(
+        "--url",
+        default=env.str("HUNTER_DB_URL", None),
+        help="hunter database url (default: $HUNTER_DB_URL)",
+    )
+    parser.add_argument(
+        "--schema",
+        default=env.str("HUNTER_DB_SCHEMA", "yavert"),
+        help="hunter database schema",
+    )
+    parser.add_argument(
+        "--view",
+        default=env.str("HUNTER_DB_TABLE", "hundata"),
+        help="materialized view to refresh",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=env.float("HUNTER_REFRESH_INTERVAL", 0),
+        help="seconds between refreshes (default: refresh once and exit)",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("hunter database url is required")
+
+    setup_logging()
+
+    bind = sa.create_engine(args.url)
+    try:
+        if args.interval > 0:
+            refresh_loop(bind, args.schema, args.view, args.interval)
+        else:
+            refresh_once(bind, args.schema, args.view)
+    finally:
+        bind.dispose()
+
+
+if __name__ == "__main__":
+    main()
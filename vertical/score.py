@@ -0,0 +1,344 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import (
+    IO,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import orjson
+import sqlalchemy as sa
+from environs import Env
+
+from vertical.app.hunter import (
+    MAX_CHUNK_SIZE,
+    HunterService,
+    Reliability,
+    make_hash,
+)
+from vertical.app.log import hunter_logger
+from vertical.app.models import PHONE_NUMBER_FORMAT
+
+__all__ = (
+    "read_numbers",
+    "hash_numbers",
+    "score",
+    "Progress",
+    "write_csv",
+    "write_ndjson",
+)
+
+INVALID_NUMBER: Final = "Invalid phone number"
+
+CSV_HEADER: Final = (
+    "number",
+    "status",
+    "registered_at",
+    "updated_at",
+    "error",
+)
+
+# (phone number, reliability or None if the number is invalid)
+Result = Tuple[str, Optional[Reliability]]
+
+
+def read_numbers(file: IO[str], column: int, header: bool) -> Iterator[str]:
+    reader = csv.reader(file)
+    if header:
+        next(reader, None)
+
+    for row in reader:
+        yield row[column].strip() if len(row) > column else ""
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def hash_numbers(numbers: List[str]) -> List[str]:
+    return [make_hash(number) for number in numbers]
+
+
+# Chunks go through hashing and querying stages, at most `window` chunks
+# in each, so the memory use doesn't depend on the number of input rows.
+def score(
+    service: HunterService,
+    numbers: Iterable[str],
+    chunk_size: int,
+    hash_pool: Executor,
+    query_pool: Executor,
+    window: int,
+) -> Iterator[Result]:
+    hashing: deque = deque()
+    querying: deque = deque()
+
+    def query() -> None:
+        chunk, valid, hashed = hashing.popleft()
+        queried = query_pool.submit(
+            service.get_reliabilities,
+            hashed.result(),
+        )
+        querying.append((chunk, valid, queried))
+
+    def results() -> Iterator[Result]:
+        chunk, valid, queried = querying.popleft()
+        reliabilities = iter(queried.result())
+        for number, is_valid in zip(chunk, valid):
+            yield number, next(reliabilities) if is_valid else None
+
+    for chunk in chunked(numbers, chunk_size):
+        valid = [bool(PHONE_NUMBER_FORMAT.fullmatch(n)) for n in chunk]
+        valid_numbers = list(itertools.compress(chunk, valid))
+
+        hashed = hash_pool.submit(hash_numbers, valid_numbers)
+        hashing.append((chunk, valid, hashed))
+
+        if len(hashing) > window:
+            query()
+        if len(querying) > window:
+            yield from results()
+
+    while hashing:
+        query()
+    while querying:
+        yield from results()
+
+
+def write_csv(file: IO[str], results: Iterable[Result]) -> None:
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADER)
+
+    for number, reliability in results:
+        if reliability is None:
+            writer.writerow((number, "", "", "", INVALID_NUMBER))
+        elif reliability.period is None:
+            writer.writerow((number, reliability.status, "", "", ""))
+        else:
+            period = reliability.period.to_dict()
+            writer.writerow((
+                number,
+                reliability.status,
+                period["registered_at"],
+                period["updated_at"],
+                "",
+            ))
+
+
+def write_ndjson(file: IO[str], results: Iterable[Result]) -> None:
+    for number, reliability in results:
+        if reliability is None:
+            data = {"number": number, "error": INVALID_NUMBER}
+        else:
+            data = {"number": number, **reliability.to_dict()}
+        file.write(orjson.dumps(data).decode())
+        file.write("\n")
+
+
+WRITERS: Final = {
+    "csv": write_csv,
+    "ndjson": write_ndjson,
+}
+
+
+# Reported to stderr, the results may be written to stdout.
+class Progress:
+
+    __slots__ = (
+        "rows",
+        "_interval",
+        "_started_at",
+        "_reported_at",
+    )
+
+    def __init__(self, interval: float):
+        self.rows = 0
+        self._interval = interval
+        self._started_at = self._reported_at = time.monotonic()
+
+    def track(self, results: Iterable[Result]) -> Iterator[Result]:
+        for result in results:
+            yield result
+
+            self.rows += 1
+            if 0 < self._interval <= time.monotonic() - self._reported_at:
+                self.report()
+
+    def report(self) -> None:
+        self._reported_at = time.monotonic()
+
+        elapsed = self._reported_at - self._started_at
+        rate = self.rows / elapsed if elapsed > 0 else 0
+        print(f"Scored {self.rows} rows, {rate:.0f} rows/s", file=sys.stderr)
+
+
+def run(
+    service: HunterService,
+    source: IO[str],
+    target: IO[str],
+    output_format: str,
+    column: int,
+    header: bool,
+    chunk_size: int,
+    processes: int,
+    connections: int,
+    progress_interval: float,
+) -> int:
+    progress = Progress(progress_interval)
+
+    with ProcessPoolExecutor(processes) as hash_pool, \
+            ThreadPoolExecutor(connections) as query_pool:
+        results = score(
+            service,
+            read_numbers(source, column, header),
+            chunk_size=chunk_size,
+            hash_pool=hash_pool,
+            query_pool=query_pool,
+            window=max(processes, connections) * 2,
+        )
+
+        WRITERS[output_format](target, progress.track(results))
+
+    progress.report()
+    return progress.rows
+
+
+def main(argv: Sequence[str] = None) -> None:
+    env = Env()
+
+    parser = argparse.ArgumentParser(
+        prog="python -m vertical.score",
+        description="Score phone numbers of a CSV file with the Hunter data.",
+    )
+    parser.add_argument(
+        "input",
+        type=argparse.FileType("r"),
+        help="CSV file with phone numbers, '-' for stdin",
+    )
+    parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="results file (default: stdout)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(WRITERS),
+        default="csv",
+        help="results format",
+    )
+    parser.add_argument(
+        "--column",
+        type=int,
+        default=0,
+        help="zero based index of the phone number column",
+    )
+    parser.add_argument(
+        "--header",
+        action="store_true",
+        help="skip the first line of the input file",
+    )
+    parser.add_argument(
+        "--url",
+        default=env.str("HUNTER_DB_URL", None),
+        help="hunter database url (default: $HUNTER_DB_URL)",
+    )
+    parser.add_argument(
+        "--schema",
+        default=env.str("HUNTER_DB_SCHEMA", "yavert"),
+        help="hunter database schema",
+    )
+    parser.add_argument(
+        "--table",
+        default=env.str("HUNTER_DB_TABLE", "hundata"),
+        help="hunter table",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=env.int("HUNTER_DELTA_DAYS", 180),
+        help="submissions period making a phone number unreliable",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=500,
+        help=f"phone numbers per query (at most {MAX_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of hashing processes",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=2,
+        help="number of hunter database connections",
+    )
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=5,
+        help="seconds between progress reports, 0 to disable",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        parser.error("hunter database url is required")
+    if not 0 < args.chunk_size <= MAX_CHUNK_SIZE:
+        parser.error(f"chunk size must be in 1..{MAX_CHUNK_SIZE}")
+    if args.processes < 1 or args.connections < 1:
+        parser.error("processes and connections must be positive")
+
+    bind = sa.create_engine(
+        args.url,
+        pool_size=args.connections,
+        max_overflow=0,
+    )
+    service = HunterService(
+        days=args.days,
+        bind=bind,
+        schema=args.schema,
+        table=args.table,
+        timeout=0,
+        logger=hunter_logger,
+    )
+
+    try:
+        run(
+            service,
+            source=args.input,
+            target=args.output,
+            output_format=args.format,
+            column=args.column,
+            header=args.header,
+            chunk_size=args.chunk_size,
+            processes=args.processes,
+            connections=args.connections,
+            progress_interval=args.progress,
+        )
+    finally:
+        bind.dispose()
+        args.output.flush()
+
+
+if __name__ == "__main__":
+    main()